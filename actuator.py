@@ -0,0 +1,257 @@
+# actuator.py
+"""
+Jalur kontrol langsung ke kontroler pompa nutrisi (tanpa menunggu MySQL + polling di sisi kontroler).
+
+ACT_KIND:
+  ""      -> nonaktif: setpoint hanya lewat set_current() di DB (perilaku lama)
+  mqtt    -> publish JSON ke ACT_MQTT_TOPIC (QoS ACT_MQTT_QOS); sukses = PUBACK broker (butuh paho-mqtt)
+  serial  -> baris "NPK <device_id> <n> <p> <k>\n" ke ACT_SERIAL_PORT; sukses = balasan diawali
+             ACT_SERIAL_ACK (kosong = tanpa menunggu balasan) (butuh pyserial)
+  http    -> POST JSON ke ACT_HTTP_URL (kontroler lokal); sukses = status 2xx
+Payload JSON: {"device_id", "n", "p", "k", "reason", "ts"}.
+
+Gagal / timeout (ACT_TIMEOUT_SEC) -> fallback set_current() di DB. ACT_DB_WRITE=always -> DB tetap
+ditulis setelah aktuasi sukses (setpoint absolut, aman terkirim dua kali).
+
+Perintah diproses thread sendiri; per device hanya setpoint terbaru yang dikirim (yang lama ditimpa).
+Latency diukur dari frame kamera yang memicu (t_detect, perf_counter) sampai ack aktuator:
+  act.latency_ms (terakhir), act.latency_p50_ms / act.latency_p95_ms (200 terakhir),
+  act.queue_ms, act.sent, act.failed, act.fallback_db, act.coalesced
+"""
+import json
+import time
+import threading
+from collections import deque
+from typing import Callable, Deque, Dict, NamedTuple, Optional
+
+import requests
+
+from config import AppConfig
+from db_client import set_current
+from metrics import METRICS
+
+KINDS = ("mqtt", "serial", "http")
+
+
+class Command(NamedTuple):
+    device_id: int
+    n: int
+    p: int
+    k: int
+    reason: str      # malnutrisi | recover
+    t_detect: float  # perf_counter frame pemicu
+    t_queued: float
+    cfg: AppConfig   # config device (DB fallback)
+
+
+def _payload(cmd: Command) -> Dict:
+    return {"device_id": cmd.device_id, "n": cmd.n, "p": cmd.p, "k": cmd.k, "reason": cmd.reason, "ts": time.time()}
+
+
+# ===================== IMPLEMENTASI =====================
+class MqttActuator:
+    name = "mqtt"
+
+    def __init__(self, cfg: AppConfig):
+        import paho.mqtt.client as mqtt
+
+        self.cfg = cfg
+        self.mqtt = mqtt
+        kwargs = {"client_id": f"aikentang-{cfg.DEVICE_ID}-act"}
+        if hasattr(mqtt, "CallbackAPIVersion"):  # paho-mqtt >= 2.0
+            self.client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, **kwargs)
+        else:
+            self.client = mqtt.Client(**kwargs)
+        if cfg.ACT_MQTT_USER:
+            self.client.username_pw_set(cfg.ACT_MQTT_USER, cfg.ACT_MQTT_PASS)
+        # koneksi + reconnect di thread network paho; publish saat putus langsung gagal -> fallback DB
+        self.client.connect_async(cfg.ACT_MQTT_HOST, cfg.ACT_MQTT_PORT, keepalive=30)
+        self.client.loop_start()
+
+    def send(self, cmd: Command):
+        topic = self.cfg.ACT_MQTT_TOPIC.format(device_id=cmd.device_id)
+        info = self.client.publish(topic, json.dumps(_payload(cmd)), qos=self.cfg.ACT_MQTT_QOS)
+        if info.rc != self.mqtt.MQTT_ERR_SUCCESS:
+            raise RuntimeError(f"publish {topic} gagal: {self.mqtt.error_string(info.rc)}")
+        if self.cfg.ACT_MQTT_QOS > 0:
+            info.wait_for_publish(timeout=self.cfg.ACT_TIMEOUT_SEC)
+            if not info.is_published():
+                raise TimeoutError(f"tidak ada PUBACK untuk {topic} dalam {self.cfg.ACT_TIMEOUT_SEC}s")
+
+    def close(self):
+        self.client.loop_stop()
+        self.client.disconnect()
+
+
+class SerialActuator:
+    name = "serial"
+
+    def __init__(self, cfg: AppConfig):
+        import serial
+
+        self.cfg = cfg
+        self.serial = serial
+        self.port = None
+
+    def _open(self):
+        if self.port is None:
+            self.port = self.serial.Serial(
+                self.cfg.ACT_SERIAL_PORT, self.cfg.ACT_SERIAL_BAUD, timeout=self.cfg.ACT_TIMEOUT_SEC,
+                write_timeout=self.cfg.ACT_TIMEOUT_SEC,
+            )
+        return self.port
+
+    def send(self, cmd: Command):
+        try:
+            port = self._open()
+            port.reset_input_buffer()
+            port.write(f"NPK {cmd.device_id} {cmd.n} {cmd.p} {cmd.k}\n".encode("ascii"))
+            port.flush()
+            if self.cfg.ACT_SERIAL_ACK:
+                reply = port.readline().decode("ascii", "replace").strip()
+                if not reply.startswith(self.cfg.ACT_SERIAL_ACK):
+                    raise RuntimeError(f"balasan kontroler: {reply or '(timeout)'}")
+        except self.serial.SerialException:
+            self.close()  # port dibuka ulang di perintah berikutnya (USB dicabut / reset)
+            raise
+
+    def close(self):
+        if self.port is not None:
+            try:
+                self.port.close()
+            except Exception:
+                pass
+            self.port = None
+
+
+class HttpActuator:
+    name = "http"
+
+    def __init__(self, cfg: AppConfig):
+        self.cfg = cfg
+        self.session = requests.Session()  # keep-alive ke kontroler lokal
+
+    def send(self, cmd: Command):
+        r = self.session.post(self.cfg.ACT_HTTP_URL, json=_payload(cmd), timeout=self.cfg.ACT_TIMEOUT_SEC)
+        r.raise_for_status()
+
+    def close(self):
+        self.session.close()
+
+
+def make_actuator(cfg: AppConfig):
+    kind = cfg.ACT_KIND
+    if kind == "mqtt":
+        return MqttActuator(cfg)
+    if kind == "serial":
+        return SerialActuator(cfg)
+    if kind == "http":
+        return HttpActuator(cfg)
+    raise ValueError(f"ACT_KIND tidak dikenal: {kind} (pilih {KINDS})")
+
+
+# ===================== DISPATCHER =====================
+class ActuatorDispatcher:
+    """
+    command() non-blocking (dipanggil thread video); satu thread mengirim ke aktuator lalu fallback DB.
+    Satu instance bisa dipakai banyak device (multi_device).
+    """
+    def __init__(self, cfg: AppConfig, log: Optional[Callable[[str], None]] = None, actuator=None):
+        self.cfg = cfg
+        self._log = log or (lambda msg: None)
+        self.actuator = actuator
+        self._pending: Dict[int, Command] = {}
+        self._cond = threading.Condition()
+        self._latencies: Deque[float] = deque(maxlen=200)
+        self.stop_event = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self.actuator is None:
+            try:
+                self.actuator = make_actuator(self.cfg)
+            except Exception as e:
+                # library / port tidak ada -> semua perintah lewat DB
+                self._log(f"[ACT] ERROR init {self.cfg.ACT_KIND}: {e} -> fallback DB saja")
+        self.thread = threading.Thread(target=self._run, name="actuator", daemon=True)
+        self.thread.start()
+        if self.actuator is not None:
+            self._log(f"[ACT] {self.actuator.name} aktif (timeout={self.cfg.ACT_TIMEOUT_SEC}s, "
+                      f"db={self.cfg.ACT_DB_WRITE})")
+
+    def stop(self, timeout: float = 5.0):
+        # perintah yang masih antre tetap dikirim dulu
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self._pending and time.monotonic() < deadline:
+                self._cond.wait(0.05)
+            self.stop_event.set()
+            self._cond.notify_all()
+        if self.thread is not None:
+            self.thread.join(timeout=timeout)
+        if self.actuator is not None:
+            try:
+                self.actuator.close()
+            except Exception:
+                pass
+
+    def command(self, cfg: AppConfig, device_id: int, n: int, p: int, k: int, reason: str,
+                t_detect: Optional[float] = None) -> bool:
+        now = time.perf_counter()
+        cmd = Command(device_id, n, p, k, reason, now if t_detect is None else t_detect, now, cfg)
+        with self._cond:
+            if self.stop_event.is_set():
+                return False
+            if device_id in self._pending:
+                METRICS.inc("act.coalesced")
+            self._pending[device_id] = cmd
+            self._cond.notify()
+        return True
+
+    # ---------- thread ----------
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self.stop_event.is_set():
+                    self._cond.wait()
+                if not self._pending:
+                    return
+                _, cmd = self._pending.popitem()
+            self._execute(cmd)
+            with self._cond:
+                self._cond.notify_all()  # stop() menunggu antrean kosong
+
+    def _execute(self, cmd: Command):
+        t_start = time.perf_counter()
+        METRICS.set("act.queue_ms", round((t_start - cmd.t_queued) * 1000.0, 1))
+        label = f"dev{cmd.device_id} {cmd.reason} npk=({cmd.n},{cmd.p},{cmd.k})"
+        ok = False
+        if self.actuator is not None:
+            try:
+                self.actuator.send(cmd)
+                ok = True
+                latency = (time.perf_counter() - cmd.t_detect) * 1000.0
+                self._record_latency(latency)
+                METRICS.inc("act.sent")
+                self._log(f"[ACT] {self.actuator.name} {label} ok ({latency:.0f}ms sejak frame pemicu)")
+            except Exception as e:
+                METRICS.inc("act.failed")
+                self._log(f"[ACT] ERROR {self.actuator.name} {label}: {e} -> fallback DB")
+
+        if ok and self.cfg.ACT_DB_WRITE != "always":
+            return
+        try:
+            affected = set_current(cmd.cfg, cmd.device_id, cmd.n, cmd.p, cmd.k)
+            if not ok:
+                METRICS.inc("act.fallback_db")
+                METRICS.set("act.db_latency_ms", round((time.perf_counter() - cmd.t_detect) * 1000.0, 1))
+            self._log(f"[DB] {label} -> set current (affected={affected})")
+        except Exception as e:
+            self._log(f"[DB] ERROR {label} set current: {e}")
+
+    def _record_latency(self, ms: float):
+        self._latencies.append(ms)
+        s = sorted(self._latencies)
+        METRICS.set("act.latency_ms", round(ms, 1))
+        METRICS.set("act.latency_p50_ms", round(s[len(s) // 2], 1))
+        METRICS.set("act.latency_p95_ms", round(s[int(0.95 * (len(s) - 1))], 1))
@@ -1,22 +1,28 @@
 import archive.streamlit as st
 from ultralytics import YOLO
 import os
+import sys
 from PIL import Image
 import cv2 
 import numpy as np
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import AppConfig
+from inference import results_to_detections, draw_detections
+from result_cache import open_cache, hash_bytes, model_fingerprint, cache_key
+
 # --- KONFIGURASI MODEL ---
 PATH_MODEL_1 = "model_1.pt"  # Untuk umur <= 15 hari
 PATH_MODEL_2 = "model_2.pt"  # Untuk umur > 15 hari
 # -------------------------
 
 
-@st.cache_resource  # Meng-cache model agar tidak di-load ulang setiap kali
-def load_model(umur):
-    """
-    Memilih path model berdasarkan umur (tanpa menampilkan log ke UI), 
-    memvalidasi keberadaan file, dan me-load model YOLO yang di-cache.
-    """
+@st.cache_resource  # Satu koneksi cache hasil (dipakai bersama batch tool / benchmark)
+def get_result_cache():
+    return open_cache(AppConfig())
+
+
+def model_path_for(umur):
     path_to_check = ""
     model_name_placeholder = ""
     
@@ -34,8 +40,14 @@ def load_model(umur):
     else:
         # Jika tidak ada, gunakan model placeholder standar
         final_model_path = model_name_placeholder
+    return final_model_path
+
 
-    # Muat model YOLO
+@st.cache_resource  # Meng-cache model agar tidak di-load ulang setiap kali
+def load_model(final_model_path):
+    """
+    Me-load model YOLO yang di-cache (path dari model_path_for(umur)).
+    """
     try:
         model = YOLO(final_model_path)
         return model
@@ -84,20 +96,30 @@ with output_col:
         with st.spinner("Sedang memproses, harap tunggu..."):
             try:
                 # 3. Muat model yang sesuai (menggunakan cache)
-                model = load_model(umur_tanaman)
+                model_path = model_path_for(umur_tanaman)
+                model = load_model(model_path)
                 
                 if model:
-                    # 4. Jalankan prediksi
-                    image_np = np.array(image)
-                    results = model.predict(image_np)
+                    # 4. Jalankan prediksi (hasil di-cache per isi gambar + file model)
+                    #    decode BGR dari bytes yang sama dengan batch_infer (cv2) -> key cache = tensor input yang sama
+                    data = uploaded_file.getvalue()
+                    image_bgr = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+                    result_cache = get_result_cache()
+                    key = cache_key(hash_bytes(data), model_fingerprint(model_path))
+                    detections = result_cache.get(key)
+                    if detections is None:
+                        results = model.predict(image_bgr)
+                        detections = results_to_detections(results[0], model.names)
+                        result_cache.put(key, detections)
                     
-                    # Cek apakah ada hasil dan ada box
-                    if results and results[0].boxes and len(results[0].boxes) > 0:
+                    # Cek apakah ada box
+                    if detections:
                         st.subheader("Hasil Prediksi")
                         
-                        # 5. Ambil gambar hasil (dengan bounding box)
-                        result_plot_bgr = results[0].plot()
-                        result_plot_rgb = cv2.cvtColor(result_plot_bgr, cv2.COLOR_BGR2RGB)
+                        # 5. Gambar bounding box (warna BGR -> gambar di kanvas BGR)
+                        canvas_bgr = image_bgr.copy()
+                        draw_detections(canvas_bgr, detections, AppConfig().DEAD_CLASS_NAME)
+                        result_plot_rgb = cv2.cvtColor(canvas_bgr, cv2.COLOR_BGR2RGB)
                         
                         # Tampilkan gambar hasil
                         st.image(result_plot_rgb, caption="Gambar hasil deteksi.", use_container_width=True)
@@ -105,9 +127,7 @@ with output_col:
 
                         # 6. Tampilkan ringkasan sederhana di bawah hasil
                         st.subheader("Ringkasan Deteksi")
-                        boxes = results[0].boxes
-                        class_indices = boxes.cls.int().tolist()
-                        class_names = [results[0].names[i] for i in class_indices]
+                        class_names = [d.name for d in detections]
                         
                         counts = {}
                         for name in class_names:
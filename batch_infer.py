@@ -0,0 +1,370 @@
+# batch_infer.py
+"""
+Batch inferensi foto arsip (folder / file) -> CSV / JSONL / Parquet.
+
+- Decode gambar paralel di thread pool (cv2.imread melepas GIL) dengan prefetch beberapa batch.
+- predict() dipanggil per batch (--batch-size).
+- Model dipilih per gambar dengan aturan MODEL_AGE_SWITCH_DAYS (sama seperti app),
+  umur diambil dari path (--umur-regex) atau --umur.
+- --resume: path yang sudah ada di output di-skip.
+- --cache: hasil per (isi gambar, file model, setting) disimpan di result cache bersama.
+- --cascade: box dead dikonfirmasi CASCADE_MODEL (tanpa rate limit / cache region).
+- --replicas N: N replika model (worker_pool, core/device sendiri); tiap batch dibagi ke replika,
+  hasil disambung sesuai urutan gambar.
+
+Contoh:
+  python batch_infer.py /data/foto --out hasil.csv --umur 20
+  python batch_infer.py /data/foto --out hasil.jsonl --umur-regex "hari[_-]?(\\d+)" --resume
+  python batch_infer.py /data/foto --out hasil_parquet/ --format parquet --batch-size 16
+"""
+import os
+import re
+import csv
+import sys
+import json
+import time
+import argparse
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+from typing import Dict, Iterator, List, Optional, Set
+
+from config import AppConfig, model_path_for_age
+from inference import infer_params
+
+IMAGE_EXTS = (".jpg", ".jpeg", ".png", ".bmp", ".webp")
+
+FIELDS = [
+    "path", "umur", "model", "width", "height", "n_boxes", "counts",
+    "best_dead_conf", "dead", "detections", "infer_ms", "error",
+]
+
+
+def iter_images(inputs: List[str]) -> Iterator[str]:
+    for inp in inputs:
+        if os.path.isfile(inp):
+            yield inp
+            continue
+        for root, dirs, files in os.walk(inp):
+            dirs.sort()
+            for fn in sorted(files):
+                if fn.lower().endswith(IMAGE_EXTS):
+                    yield os.path.join(root, fn)
+
+
+def umur_for_path(path: str, pattern: Optional["re.Pattern"], default: int) -> int:
+    if pattern is not None:
+        m = pattern.search(path)
+        if m:
+            return int(m.group(1))
+    return default
+
+
+def decode(path: str, with_hash: bool = False):
+    import cv2
+
+    if not with_hash:
+        return None, cv2.imread(path, cv2.IMREAD_COLOR)
+
+    import numpy as np
+    from result_cache import hash_bytes
+
+    # hash dari bytes file yang sama dengan yang di-decode (key cache = isi file)
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError:
+        return None, None
+    return hash_bytes(data), cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+
+
+# ===================== OUTPUT =====================
+class ResultWriter:
+    def __init__(self, out: str, fmt: str, resume: bool):
+        self.out = out
+        self.fmt = fmt
+        self.done: Set[str] = self._read_done() if resume else set()
+        self._f = None
+        self._csv = None
+        self._parquet_rows: List[Dict] = []
+        self._part = 0
+
+        if fmt == "parquet":
+            os.makedirs(out, exist_ok=True)
+            self._part = len([fn for fn in os.listdir(out) if fn.endswith(".parquet")])
+            return
+        append = resume and os.path.exists(out)
+        self._f = open(out, "a" if append else "w", newline="", encoding="utf-8")
+        if fmt == "csv":
+            self._csv = csv.DictWriter(self._f, fieldnames=FIELDS)
+            if not append or os.path.getsize(out) == 0:
+                self._csv.writeheader()
+
+    def _read_done(self) -> Set[str]:
+        done: Set[str] = set()
+        if not os.path.exists(self.out):
+            return done
+        if self.fmt == "parquet":
+            import pyarrow.parquet as pq
+
+            for fn in os.listdir(self.out):
+                if fn.endswith(".parquet"):
+                    table = pq.read_table(os.path.join(self.out, fn), columns=["path", "error"])
+                    done.update(path for path, err in zip(table.column("path").to_pylist(),
+                                                          table.column("error").to_pylist()) if not err)
+        elif self.fmt == "csv":
+            with open(self.out, newline="", encoding="utf-8") as f:
+                done.update(row["path"] for row in csv.DictReader(f) if not row.get("error"))
+        else:
+            with open(self.out, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        row = json.loads(line)
+                    except ValueError:
+                        continue  # baris terakhir terpotong (proses di-kill)
+                    if not row.get("error"):
+                        done.add(row["path"])
+        return done
+
+    def write(self, rows: List[Dict]):
+        if self.fmt == "parquet":
+            self._parquet_rows.extend(rows)
+            if len(self._parquet_rows) >= 5000:
+                self._flush_parquet()
+            return
+        for row in rows:
+            if self._csv is not None:
+                self._csv.writerow(row)
+            else:
+                self._f.write(json.dumps(row) + "\n")
+        self._f.flush()
+
+    def _flush_parquet(self):
+        if not self._parquet_rows:
+            return
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        # schema eksplisit: part yang isinya cuma baris error tetap bertipe sama (None -> null)
+        schema = pa.schema([
+            ("path", pa.string()), ("umur", pa.int64()), ("model", pa.string()),
+            ("width", pa.int64()), ("height", pa.int64()), ("n_boxes", pa.int64()),
+            ("counts", pa.string()), ("best_dead_conf", pa.float64()), ("dead", pa.bool_()),
+            ("detections", pa.string()), ("infer_ms", pa.float64()), ("error", pa.string()),
+        ])
+        table = pa.Table.from_pylist(self._parquet_rows, schema=schema)
+        pq.write_table(table, os.path.join(self.out, f"part-{self._part:05d}.parquet"))
+        self._part += 1
+        self._parquet_rows = []
+
+    def close(self):
+        if self.fmt == "parquet":
+            self._flush_parquet()
+        elif self._f is not None:
+            self._f.close()
+
+
+# ===================== INFERENCE =====================
+def make_row(cfg: AppConfig, path: str, umur: int, model_path: str, img, dets, infer_ms: float) -> Dict:
+    counts: Dict[str, int] = {}
+    best_dead = 0.0
+    for d in dets:
+        counts[d.name] = counts.get(d.name, 0) + 1
+        if d.name == cfg.DEAD_CLASS_NAME and d.confirmed:
+            best_dead = max(best_dead, d.conf)
+    return {
+        "path": path,
+        "umur": umur,
+        "model": model_path,
+        "width": int(img.shape[1]),
+        "height": int(img.shape[0]),
+        "n_boxes": len(dets),
+        "counts": json.dumps(counts),
+        "best_dead_conf": round(best_dead, 4),
+        "dead": best_dead >= cfg.DEAD_CONF,
+        "detections": json.dumps([
+            {"name": d.name, "conf": round(d.conf, 4), "xyxy": [round(v, 1) for v in d.xyxy],
+             **({} if d.confirmed else {"confirmed": False})}
+            for d in dets
+        ]),
+        "infer_ms": round(infer_ms, 2),
+        "error": "",
+    }
+
+
+def error_row(path: str, umur: int, model_path: str, err: str) -> Dict:
+    # None (bukan "") untuk kolom yang tidak ada: CSV tetap kosong, parquet jadi null bukan salah tipe
+    row = dict.fromkeys(FIELDS)
+    row.update({"path": path, "umur": umur, "model": model_path, "error": err})
+    return row
+
+
+class BackendCache:
+    def __init__(self, cfg: AppConfig, use_server: bool, cascade: bool = False):
+        # POOL_REPLICAS > 1 -> tiap model jadi WorkerPool; batch dibagi ke replika (predict_batch)
+        self.cfg = cfg
+        self.use_server = use_server
+        self.cascade = cascade
+        self.backends = {}
+        self._client = None
+
+    def get(self, model_path: str):
+        backend = self.backends.get(model_path)
+        if backend is None:
+            if self.use_server:
+                from inference_server import InferenceClient, RemoteBackend
+
+                if self._client is None:
+                    self._client = InferenceClient(self.cfg.INFER_SERVER_ADDR, self.cfg.INFER_SERVER_AUTHKEY)
+                backend = RemoteBackend(self._client, model_path, infer_params(self.cfg))
+            elif self.cfg.POOL_REPLICAS > 1:
+                from worker_pool import build_pool
+
+                backend = build_pool(self.cfg, model_path, infer_params(self.cfg), log=print)
+            else:
+                from inference import load_backend
+
+                backend = load_backend(model_path, infer_params(self.cfg))
+            if self.cascade:
+                from cascade import build_cascade
+
+                backend = build_cascade(self.cfg, backend, self._client, realtime=False)
+            self.backends[model_path] = backend
+        return backend
+
+    def close(self):
+        for backend in self.backends.values():
+            inner = getattr(backend, "primary", backend)  # cascade membungkus pool
+            if hasattr(inner, "close"):
+                inner.close()
+
+
+def run(cfg: AppConfig, args) -> int:
+    pattern = re.compile(args.umur_regex, re.IGNORECASE) if args.umur_regex else None
+    writer = ResultWriter(args.out, args.format, args.resume)
+
+    # kelompokkan per model supaya satu batch = satu model
+    groups: "OrderedDict[str, List[tuple]]" = OrderedDict()
+    skipped = 0
+    for path in iter_images(args.inputs):
+        if path in writer.done:
+            skipped += 1
+            continue
+        umur = umur_for_path(path, pattern, args.umur)
+        groups.setdefault(model_path_for_age(cfg, umur), []).append((path, umur))
+
+    total = sum(len(v) for v in groups.values())
+    print(f"[BATCH] {total} gambar ({skipped} di-skip, resume), {len(groups)} model", flush=True)
+
+    backends = BackendCache(cfg, args.server, args.cascade)
+    cache = None
+    if args.cache:
+        from result_cache import open_cache, model_fingerprint, cache_key
+
+        cache = open_cache(cfg)
+    bs = max(1, args.batch_size)
+    done = 0
+    t_start = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=args.decode_workers) as pool:
+        for model_path, items in groups.items():
+            backend = backends.get(model_path)
+            if cache is not None:
+                model_fp = model_fingerprint(model_path)
+                params = getattr(backend, "params", {})
+            batches = [items[i:i + bs] for i in range(0, len(items), bs)]
+
+            # prefetch: decode beberapa batch di depan selagi model memproses batch sekarang
+            pending = deque()
+            it = iter(batches)
+            for batch in it:
+                pending.append((batch, [pool.submit(decode, p, cache is not None) for p, _ in batch]))
+                if len(pending) > args.prefetch:
+                    break
+
+            while pending:
+                batch, futs = pending.popleft()
+                nxt = next(it, None)
+                if nxt is not None:
+                    pending.append((nxt, [pool.submit(decode, p, cache is not None) for p, _ in nxt]))
+
+                decoded = [f.result() for f in futs]
+                rows = [
+                    error_row(p, u, model_path, "decode failed")
+                    for (p, u), (_, img) in zip(batch, decoded) if img is None
+                ]
+                ok = []
+                for item, (img_hash, img) in zip(batch, decoded):
+                    if img is None:
+                        continue
+                    key = cache_key(img_hash, model_fp, params) if cache is not None else None
+                    dets = cache.get(key) if cache is not None else None
+                    if dets is not None:
+                        rows.append(make_row(cfg, item[0], item[1], model_path, img, dets, 0.0))
+                    else:
+                        ok.append((item, img, key))
+
+                if ok:
+                    t0 = time.perf_counter()
+                    try:
+                        results = backend.predict_batch([img for _, img, _ in ok])
+                        per_img_ms = (time.perf_counter() - t0) * 1000 / len(ok)
+                        for ((p, u), img, key), dets in zip(ok, results):
+                            rows.append(make_row(cfg, p, u, model_path, img, dets, per_img_ms))
+                            if cache is not None:
+                                cache.put(key, dets)
+                    except Exception as e:
+                        rows += [error_row(p, u, model_path, f"predict failed: {e}") for (p, u), _, _ in ok]
+
+                writer.write(rows)
+                done += len(batch)
+                elapsed = time.perf_counter() - t_start
+                print(f"[BATCH] {done}/{total} ({done / max(elapsed, 1e-6):.1f} img/s)", flush=True)
+
+    writer.close()
+    backends.close()
+    if cache is not None:
+        st = cache.stats()
+        print(f"[CACHE] hits={st['hits']} misses={st['misses']} entries={st['entries']} ({st['bytes'] / 1e6:.1f}MB)")
+        cache.close()
+    return done
+
+
+def main():
+    cfg = AppConfig()
+    ap = argparse.ArgumentParser(description="Batch inferensi foto kentang -> CSV/JSONL/Parquet")
+    ap.add_argument("inputs", nargs="+", help="folder atau file gambar")
+    ap.add_argument("--out", required=True, help="file .csv/.jsonl, atau folder untuk parquet")
+    ap.add_argument("--format", choices=["csv", "jsonl", "parquet"], default=None,
+                    help="default: dari ekstensi --out")
+    ap.add_argument("--umur", type=int, default=10, help="umur default (hari) kalau tidak ada di path")
+    ap.add_argument("--umur-regex", default=r"(?:umur|hari|day)[_\- ]?(\d+)",
+                    help="regex (group 1 = umur hari) yang dicari di path; '' untuk menonaktifkan")
+    ap.add_argument("--batch-size", type=int, default=8)
+    ap.add_argument("--decode-workers", type=int, default=os.cpu_count() or 4)
+    ap.add_argument("--prefetch", type=int, default=2, help="jumlah batch yang di-decode di depan")
+    ap.add_argument("--replicas", type=int, default=cfg.POOL_REPLICAS,
+                    help="replika model (worker_pool); batch dibagi rata ke replika")
+    ap.add_argument("--pool-mode", choices=["thread", "process"], default=cfg.POOL_MODE)
+    ap.add_argument("--resume", action="store_true")
+    ap.add_argument("--server", action="store_true", help="pakai inference server (INFER_SERVER_ADDR)")
+    ap.add_argument("--cache", action="store_true", help="pakai result cache (CACHE_PATH) untuk gambar yang sama")
+    ap.add_argument("--cascade", action="store_true", help="konfirmasi box dead dengan CASCADE_MODEL")
+    args = ap.parse_args()
+
+    if args.format is None:
+        ext = os.path.splitext(args.out)[1].lower()
+        args.format = {".csv": "csv", ".jsonl": "jsonl", ".json": "jsonl"}.get(ext, "parquet")
+    if args.server and not cfg.INFER_SERVER_ADDR:
+        sys.exit("--server butuh INFER_SERVER_ADDR")
+    if args.cascade and not cfg.CASCADE_MODEL:
+        sys.exit("--cascade butuh CASCADE_MODEL")
+
+    cfg = replace(cfg, POOL_REPLICAS=max(1, args.replicas), POOL_MODE=args.pool_mode)
+    t0 = time.perf_counter()
+    n = run(cfg, args)
+    print(f"[BATCH] selesai: {n} gambar dalam {time.perf_counter() - t0:.1f}s -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
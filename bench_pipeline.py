@@ -0,0 +1,177 @@
+# bench_pipeline.py
+"""
+Benchmark overhead per frame pipeline VideoWorker di luar model (testkit: kamera sintetis,
+FakeBackend, FakeDb SQLite, TelegramStub lokal) -> bisa jalan di PC Linux / CI tanpa Jetson.
+
+Yang diukur: interval antar read() kamera dengan fps=0 (kamera tidak pernah menunggu) =
+preprocess + anotasi + state machine + recorder/history/stream + konversi QImage GUI.
+FakeBackend latency 0 -> angka ini murni overhead di sekitar model.
+
+Budget (exit code 1 kalau dilanggar):
+  --budget-p95-ms : p95 interval per frame
+  --min-fps       : throughput rata-rata
+
+--replicas N: FakeBackend dibungkus WorkerPool N replika (pipelining berurutan); pakai --latency-ms > 0
+untuk melihat throughput melewati satu instance.
+
+Contoh:
+  python bench_pipeline.py
+  python bench_pipeline.py --latency-ms 40 --replicas 4 --min-fps 60
+  python bench_pipeline.py --frames 2000 --width 1920 --height 1080 --rec --hist --budget-p95-ms 25
+  python bench_pipeline.py --json > bench.json
+
+CI: tests/test_bench_pipeline.py (pytest) menjalankan bench() dan meng-assert trigger/recover + budget p95.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import threading
+import statistics
+from dataclasses import replace
+
+from PyQt5 import QtCore
+
+from config import AppConfig
+from db_uploader import DetectionUploader
+from metrics import METRICS
+from stream_server import StreamHub
+from telegram_sender import TelegramSender
+from testkit import HEALTHY, FakeBackend, FakeDb, SyntheticCapture, TelegramStub, dead_box
+
+
+def percentile(values, q: float) -> float:
+    s = sorted(values)
+    return s[min(len(s) - 1, int(round(q / 100.0 * (len(s) - 1))))]
+
+
+def run_bench(cfg: AppConfig, args, tg: TelegramSender) -> dict:
+    from video_worker import VideoWorker
+
+    cap = SyntheticCapture(args.width, args.height, fps=0, seed=args.seed, max_frames=args.frames + args.warmup)
+
+    class BenchWorker(VideoWorker):
+        def _open_camera(self):
+            return cap, "synthetic"
+
+    # normal <-> dead bergantian (per jumlah frame, deterministik) -> trigger MALNUTRISI + RECOVER ikut jalan
+    # replika hanya melihat tiap N frame -> fase per replika dipendekkan supaya fase global tetap sama
+    n = max(1, args.replicas)
+    phase = max(1, args.phase_frames // n)
+    script = [(phase, [HEALTHY]), (phase, [HEALTHY, dead_box(cfg.DEAD_CLASS_NAME)])]
+    if n > 1:
+        from functools import partial
+        from worker_pool import WorkerPool
+
+        backend = WorkerPool([partial(FakeBackend, cfg, script=script, unit="frame", latency_ms=args.latency_ms)] * n,
+                             mode=args.pool_mode)
+    else:
+        backend = FakeBackend(cfg, script=script, unit="frame", latency_ms=args.latency_ms)
+    uploader = DetectionUploader(cfg, log=lambda m: None)
+    worker = BenchWorker(cfg, backend, tg, uploader=uploader, stream_hub=StreamHub() if args.stream else None,
+                         headless=args.headless)
+    # GUI palsu: QImage disalin (seperti QPixmap.fromImage) lalu di-ack; tanpa event loop -> direct
+    worker.frame_updated.connect(lambda img: (img.copy(), worker.frame_consumed()), QtCore.Qt.DirectConnection)
+
+    uploader.start()
+    t = threading.Thread(target=worker.run, daemon=True)
+    t.start()
+    while t.is_alive() and not cap.exhausted:
+        time.sleep(0.05)
+    worker.running = False
+    t.join(timeout=10)
+    uploader.stop()
+    if n > 1:
+        backend.close()
+
+    ts = cap.read_ts[args.warmup:]
+    intervals = [(b - a) * 1000.0 for a, b in zip(ts, ts[1:])]
+    if not intervals:
+        raise RuntimeError("tidak ada frame terukur (worker berhenti lebih awal?)")
+    return {
+        "frames": len(intervals),
+        "resolution": f"{args.width}x{args.height}",
+        "fps": round(len(intervals) / max(ts[-1] - ts[0], 1e-9), 1),
+        "p50_ms": round(statistics.median(intervals), 3),
+        "p95_ms": round(percentile(intervals, 95), 3),
+        "p99_ms": round(percentile(intervals, 99), 3),
+        "max_ms": round(max(intervals), 3),
+        "ui_dropped": METRICS.get("video.ui_dropped"),
+    }
+
+
+def build_parser() -> argparse.ArgumentParser:
+    ap = argparse.ArgumentParser(description="Benchmark overhead per frame VideoWorker (tanpa model/hardware)")
+    ap.add_argument("--frames", type=int, default=600)
+    ap.add_argument("--warmup", type=int, default=30, help="frame awal yang tidak diukur")
+    ap.add_argument("--width", type=int, default=1280)
+    ap.add_argument("--height", type=int, default=720)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--phase-frames", type=int, default=60)
+    ap.add_argument("--latency-ms", type=float, default=0.0, help="simulasi waktu inferensi")
+    ap.add_argument("--replicas", type=int, default=1, help="WorkerPool N replika FakeBackend")
+    ap.add_argument("--pool-mode", choices=["thread", "process"], default="thread")
+    ap.add_argument("--rec", action="store_true", help="event recorder aktif")
+    ap.add_argument("--hist", action="store_true", help="detection history aktif")
+    ap.add_argument("--stream", action="store_true", help="publish ke StreamHub (MJPEG)")
+    ap.add_argument("--headless", action="store_true", help="tanpa konversi QImage (mode multi-device)")
+    ap.add_argument("--budget-p95-ms", type=float, default=20.0)
+    ap.add_argument("--min-fps", type=float, default=0.0)
+    ap.add_argument("--json", action="store_true")
+    return ap
+
+
+def bench(args) -> dict:
+    """Satu run lengkap (FakeDb + TelegramStub); dipakai CLI dan tests/test_bench_pipeline.py."""
+    tmp = tempfile.mkdtemp(prefix="bench_")
+    base = AppConfig()
+    with FakeDb(thresholds={base.DEVICE_ID: (10, 20, 30)}).installed() as db, TelegramStub() as stub:
+        cfg = replace(
+            base,
+            TG_API_BASE=stub.base_url, TG_BOT_TOKEN="bench", TG_CHAT_ID="1", TG_COOLDOWN_SEC=0,
+            DB_UPLOAD_ENABLED=True, FRAME_BUS_NAME="", CFG_LIVE_ENABLED=False,
+            REC_ENABLED=args.rec, REC_DIR=os.path.join(tmp, "rec"),
+            HIST_ENABLED=args.hist, HIST_DIR=os.path.join(tmp, "hist"),
+            # satu trigger per fase dead, recover di fase normal (0 = recover+trigger ulang tiap 5 frame)
+            DEAD_HITS_REQUIRED=5, RECOVER_AFTER_SEC=0.2, DB_COOLDOWN_SEC=0,
+        )
+        tg = TelegramSender(cfg)
+        tg.start()
+        result = run_bench(cfg, args, tg)
+        tg.q.join()
+        tg.stop()
+        result["db_calls"] = dict(db.calls)
+        result["tg_photos"] = len(stub.photos)
+        events = sorted(db.rows("detection_state_events"), key=lambda r: r["event_ts"])
+        result["states"] = [r["state"] for r in events]
+        result["current"] = db.current(base.DEVICE_ID)
+    return result
+
+
+def main():
+    args = build_parser().parse_args()
+    result = bench(args)
+
+    failed = []
+    if result["p95_ms"] > args.budget_p95_ms:
+        failed.append(f"p95 {result['p95_ms']}ms > {args.budget_p95_ms}ms")
+    if args.min_fps and result["fps"] < args.min_fps:
+        failed.append(f"fps {result['fps']} < {args.min_fps}")
+    result["pass"] = not failed
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print(
+            f"[BENCH] {result['frames']} frame {result['resolution']}: {result['fps']} fps, "
+            f"p50={result['p50_ms']}ms p95={result['p95_ms']}ms p99={result['p99_ms']}ms max={result['max_ms']}ms"
+        )
+        print(f"[BENCH] db={result['db_calls']} tg_photos={result['tg_photos']} ui_dropped={result['ui_dropped']}")
+        print("[BENCH] PASS" if not failed else "[BENCH] FAIL: " + "; ".join(failed))
+    sys.exit(0 if not failed else 1)
+
+
+if __name__ == "__main__":
+    main()
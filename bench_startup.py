@@ -0,0 +1,96 @@
+# bench_startup.py
+"""
+Benchmark cold start main.py.
+
+Tiap run = proses baru (python main.py dengan BOOT_BENCH=1, app keluar sendiri setelah model siap).
+Yang diukur:
+  window_shown -> waktu sampai window tampil (blank-screen period)
+  model_ready  -> waktu sampai model selesai load + warm-up
+  eager_import -> waktu `import video_worker, ultralytics` di proses baru
+                  (= blank-screen sebelum lazy import, karena dulu di-import sebelum window dibuat)
+
+Contoh:
+  python bench_startup.py --runs 5
+  QT_QPA_PLATFORM=offscreen python bench_startup.py --runs 3   # tanpa display
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def run_app(timeout: float) -> dict:
+    env = dict(os.environ, BOOT_BENCH="1")
+    proc = subprocess.run(
+        [sys.executable, os.path.join(HERE, "main.py")],
+        cwd=HERE, env=env, capture_output=True, text=True, timeout=timeout,
+    )
+    events = {}
+    for line in proc.stdout.splitlines():
+        try:
+            ev = json.loads(line)
+        except ValueError:
+            continue
+        events[ev.pop("event")] = ev
+    if "model_failed" in events:
+        raise RuntimeError(events["model_failed"]["error"])
+    if "model_ready" not in events:
+        raise RuntimeError(f"main.py exit={proc.returncode}: {proc.stderr.strip()[-500:]}")
+    return events
+
+
+def eager_import_ms(timeout: float) -> float:
+    code = (
+        "import time; t=time.perf_counter(); import video_worker, ultralytics; "
+        "print((time.perf_counter()-t)*1000)"
+    )
+    out = subprocess.run(
+        [sys.executable, "-c", code], cwd=HERE, capture_output=True, text=True, timeout=timeout, check=True,
+    )
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def summarize(name: str, values):
+    if not values:
+        return
+    print(
+        f"{name:<14} median={statistics.median(values):8.0f}ms  "
+        f"min={min(values):8.0f}ms  max={max(values):8.0f}ms  (n={len(values)})"
+    )
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Cold start benchmark untuk main.py")
+    ap.add_argument("--runs", type=int, default=3)
+    ap.add_argument("--timeout", type=float, default=600)
+    args = ap.parse_args()
+
+    shown, ready, imp, load, warm, eager = [], [], [], [], [], []
+    for i in range(args.runs):
+        t0 = time.perf_counter()
+        ev = run_app(args.timeout)
+        shown.append(ev["window_shown"]["ms"])
+        ready.append(ev["model_ready"]["ms"])
+        imp.append(ev["model_ready"]["import_ms"])
+        load.append(ev["model_ready"]["load_ms"])
+        warm.append(ev["model_ready"]["warmup_ms"])
+        eager.append(eager_import_ms(args.timeout))
+        print(f"run {i + 1}/{args.runs}: shown={shown[-1]:.0f}ms ready={ready[-1]:.0f}ms "
+              f"(wall {(time.perf_counter() - t0):.1f}s)")
+
+    print()
+    summarize("window_shown", shown)
+    summarize("model_ready", ready)
+    summarize("  import", imp)
+    summarize("  load", load)
+    summarize("  warmup", warm)
+    summarize("eager_import", eager)
+
+
+if __name__ == "__main__":
+    main()
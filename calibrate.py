@@ -0,0 +1,455 @@
+# calibrate.py
+"""
+Kalibrasi DEAD_CONF + DEAD_HITS_REQUIRED per model dari data berlabel / rekaman lapangan.
+Hasilnya file CALIB_DIR/<nama model>.json yang dimuat runtime sebagai layer "calibration" di LiveConfig
+(menimpa nilai .env saat start, tetap kalah dari override .env runtime / DB).
+
+Sumber data (boleh digabung, minimal satu):
+  --images DIR --labels DIR -> gambar + label YOLO; model dijalankan (pakai result cache)
+                               -> kurva precision/recall box & frame kelas dead per conf
+  --clips DIR               -> sidecar EventRecorder (.jsonl). Label per klip: key "label" di baris header
+                               atau --clip-labels CSV (stem,label). 1/true/dead = dead beneran,
+                               0/false = alarm palsu; klip tanpa label di-skip.
+  --negative-history DIR    -> DetectionHistory (HIST_DIR) periode yang sudah dicek tidak ada tanaman mati
+                               (--since/--until) -> laju alarm palsu per hari
+
+Debounce disimulasikan sama seperti VideoWorker: frame dengan box dead (confirmed, conf >= c) -> hits+1,
+selain itu hits-1 (min 0); alarm saat hits >= H; recover setelah RECOVER_AFTER_SEC tanpa dead.
+Frame di-resample ke --fps: hits dihitung per frame yang diinferensi, jadi rekomendasi hanya berlaku di fps itu
+(fps lebih rendah / model lebih murah -> kalibrasi ulang di fps / model tersebut).
+
+Rekomendasi: (c, H) yang memenuhi --target-fa-per-day (history), --max-neg-clip-alarm (klip negatif) dan
+--min-precision (precision frame gambar), lalu klip positif terdeteksi paling banyak (tanpa klip positif: recall frame gambar), waktu-ke-alarm terkecil
+(median, dihitung dari awal klip termasuk pre-roll), conf terbesar, H terkecil.
+Gambar saja (tanpa klip / history) hanya mengkalibrasi DEAD_CONF.
+
+Batas: conf di bawah INFER_CONF (floor model) tidak bisa dievaluasi; history hanya menyimpan best_dead_conf
+>= DEAD_CONF saat direkam (--history-conf) -> grid conf dipotong di situ.
+
+Contoh:
+  python calibrate.py --umur 10 --clips recordings/ --negative-history history/ --since 2026-09-01 --fps 10
+  python calibrate.py --model model_2.pt --images data/val/images --labels data/val/labels --dry-run
+"""
+import os
+import sys
+import csv
+import json
+import time
+import argparse
+import datetime
+import dataclasses
+import statistics
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+from config import AppConfig, calibration_path, model_path_for_age
+
+POSITIVE = ("1", "true", "yes", "ya", "dead", "positive", "pos")
+NEGATIVE = ("0", "false", "no", "tidak", "false_alarm", "negative", "neg")
+HISTORY_GAP_SEC = 5.0  # jeda antar frame lebih dari ini (aplikasi mati) tidak dihitung durasi
+
+
+class Track(NamedTuple):
+    name: str
+    kind: str          # clip | history
+    ts: np.ndarray     # detik, naik
+    score: np.ndarray  # conf box dead (confirmed) terbaik per frame, 0 = tidak ada
+    positive: bool
+
+
+def _label(value) -> Optional[bool]:
+    v = str(value).strip().lower()
+    if v in POSITIVE:
+        return True
+    if v in NEGATIVE:
+        return False
+    return None
+
+
+def _parse_date(value: str) -> float:
+    return time.mktime(datetime.datetime.strptime(value, "%Y-%m-%d").timetuple()) if value else 0.0
+
+
+# ===================== INPUT =====================
+def load_clips(folder: str, labels_csv: str, dead_class: str) -> List[Track]:
+    labels: Dict[str, Optional[bool]] = {}
+    if labels_csv:
+        with open(labels_csv, "r", encoding="utf-8", newline="") as f:
+            for row in csv.reader(f):
+                if len(row) >= 2:
+                    labels[os.path.splitext(os.path.basename(row[0].strip()))[0]] = _label(row[1])
+
+    out, skipped = [], 0
+    for root, _, names in os.walk(folder):
+        for fn in sorted(names):
+            if not fn.endswith(".jsonl"):
+                continue
+            stem = os.path.splitext(fn)[0]
+            ts, score, header = [], [], None
+            with open(os.path.join(root, fn), "r", encoding="utf-8") as f:
+                for line in f:
+                    rec = json.loads(line)
+                    if header is None:
+                        header = rec
+                        continue
+                    best = 0.0
+                    for d in rec.get("detections") or []:
+                        if d.get("name") == dead_class and d.get("confirmed", True):
+                            best = max(best, float(d.get("conf", 0.0)))
+                    ts.append(float(rec["ts"]))
+                    score.append(best)
+            label = labels.get(stem, _label((header or {}).get("label", "")))
+            if label is None or not ts:
+                skipped += 1
+                continue
+            out.append(Track(stem, "clip", np.asarray(ts), np.asarray(score), label))
+    if skipped:
+        print(f"[CALIB] {skipped} klip tanpa label / kosong di-skip", flush=True)
+    return out
+
+
+def load_history(cfg: AppConfig, folder: str, since: float, until: float) -> List[Track]:
+    from detection_history import DetectionHistory
+
+    hist = DetectionHistory(dataclasses.replace(cfg, HIST_DIR=folder))
+    rows = hist.query(since, until or time.time(), "raw")
+    if rows.size == 0:
+        return []
+    ts = rows["ts"].astype(np.float64)
+    order = np.argsort(ts, kind="stable")
+    return [Track(folder, "history", ts[order], rows["best_dead_conf"].astype(np.float64)[order], False)]
+
+
+def resample(seq: Track, fps: float) -> Track:
+    """Ambil frame pertama tiap slot 1/fps (mensimulasikan inferensi di fps lebih rendah)."""
+    if fps <= 0 or seq.ts.size == 0:
+        return seq
+    _, idx = np.unique(np.floor(seq.ts * fps), return_index=True)
+    return seq._replace(ts=seq.ts[idx], score=seq.score[idx])
+
+
+def source_fps(seqs: Sequence[Track]) -> float:
+    dts = np.concatenate([np.diff(s.ts) for s in seqs if s.ts.size > 1] or [np.zeros(0)])
+    dts = dts[(dts > 0) & (dts <= HISTORY_GAP_SEC)]
+    return float(1.0 / np.median(dts)) if dts.size else 0.0
+
+
+def duration_sec(seq: Track) -> float:
+    dts = np.diff(seq.ts)
+    return float(dts[dts <= HISTORY_GAP_SEC].sum())
+
+
+# ===================== SIMULASI DEBOUNCE =====================
+def simulate(seq: Track, conf: float, hits_grid: Sequence[int], recover_sec: float) -> Dict[int, tuple]:
+    """
+    Return {H: (jumlah alarm, detik dari awal sekuens ke alarm pertama / None)} untuk satu conf.
+
+    hits tanpa reset: h_t = max(0, h_{t-1} +/- 1) = S_t - min(0, min S_k) (Lindley) -> satu kali vektor per conf.
+    Setelah recover hits di-reset ke 0; walk baru itu sama dengan h begitu h menyentuh 0, jadi hanya
+    potongan sampai titik itu yang dihitung ulang (total <= n frame per H).
+    """
+    n = seq.ts.size
+    dead = seq.score >= conf
+    step = np.where(dead, 1, -1)
+    s = np.cumsum(step)
+    h = s - np.minimum(0, np.minimum.accumulate(s))
+    idx = np.arange(n)
+
+    # recover: frame pertama dengan jeda >= recover_sec sejak dead terakhir
+    last_dead = np.maximum.accumulate(np.where(dead, seq.ts, -np.inf))
+    ok = (seq.ts - last_dead) >= recover_sec
+    next_ok = np.minimum.accumulate(np.where(ok, idx, n)[::-1])[::-1]
+    next_zero = np.minimum.accumulate(np.where(h == 0, idx, n)[::-1])[::-1]
+
+    # hits naik tepat ke H hanya di frame dead -> kelompokkan frame dead per nilai h
+    dead_idx = np.flatnonzero(dead)
+    hv = h[dead_idx]
+    order = np.argsort(hv, kind="stable")
+    hv_sorted, idx_sorted = hv[order], dead_idx[order]
+
+    def first_alarm(pos: int, H: int, cross: np.ndarray) -> int:
+        z = int(next_zero[pos])
+        w = np.cumsum(step[pos:z + 1])
+        w = w - np.minimum(0, np.minimum.accumulate(w))
+        hit = np.flatnonzero(w >= H)
+        if hit.size:
+            return pos + int(hit[0])
+        j = np.searchsorted(cross, z, "right")
+        return int(cross[j]) if j < cross.size else n
+
+    out = {}
+    for H in hits_grid:
+        lo, hi = np.searchsorted(hv_sorted, H, "left"), np.searchsorted(hv_sorted, H, "right")
+        cross = idx_sorted[lo:hi]  # urut naik (argsort stable)
+        alarms, first, pos = 0, None, 0
+        while pos < n:
+            t = first_alarm(pos, H, cross)
+            if t >= n:
+                break
+            alarms += 1
+            if first is None:
+                first = float(seq.ts[t] - seq.ts[0])
+            pos = int(next_ok[t]) + 1
+        out[H] = (alarms, first)
+    return out
+
+
+def evaluate(seqs: Sequence[Track], confs: Sequence[float], hits_grid: Sequence[int],
+             recover_sec: float, neg_days: float) -> List[Dict]:
+    pos = [s for s in seqs if s.positive]
+    neg_clips = [s for s in seqs if s.kind == "clip" and not s.positive]
+    history = [s for s in seqs if s.kind == "history"]
+    rows = []
+    for c in confs:
+        res = {id(s): simulate(s, c, hits_grid, recover_sec) for s in seqs}
+        for H in hits_grid:
+            hit_pos = [res[id(s)][H] for s in pos if res[id(s)][H][0] > 0]
+            alarm_neg = sum(1 for s in neg_clips if res[id(s)][H][0] > 0)
+            fa_hist = sum(res[id(s)][H][0] for s in history)
+            latencies = [r[1] for r in hit_pos]
+            rows.append({
+                "conf": round(c, 3),
+                "hits": H,
+                "recall_clips": len(hit_pos) / len(pos) if pos else None,
+                "latency_p50_s": round(statistics.median(latencies), 2) if latencies else None,
+                "neg_clip_alarm": alarm_neg / len(neg_clips) if neg_clips else None,
+                "event_precision": (len(hit_pos) / (len(hit_pos) + alarm_neg)) if (hit_pos or alarm_neg) else None,
+                "fa_per_day": round(fa_hist / neg_days, 3) if neg_days > 0 else None,
+            })
+    return rows
+
+
+# ===================== GAMBAR BERLABEL =====================
+def image_pr(cfg: AppConfig, model_path: str, images: str, labels: str, confs: Sequence[float],
+             match_iou: float, max_frames: int, use_cache: bool) -> Dict:
+    from inference import infer_params
+    from sweep_infer import BackendFactory, load_frames, load_labels, reference_dets, score
+
+    frames = load_frames([images], 1, max_frames)
+    if not frames:
+        sys.exit(f"tidak ada gambar di {images}")
+    factory = BackendFactory(cfg, model_path, bool(cfg.INFER_SERVER_ADDR))
+    names = factory.make({}).names
+    inv = {v: k for k, v in names.items()}
+    if cfg.DEAD_CLASS_NAME not in inv:
+        sys.exit(f"model {model_path} tidak punya kelas '{cfg.DEAD_CLASS_NAME}'")
+    truth = load_labels(labels, frames, inv[cfg.DEAD_CLASS_NAME])
+    dets = reference_dets(cfg, factory, frames, infer_params(cfg), use_cache)
+    dead = [[d for d in ds if d.name == cfg.DEAD_CLASS_NAME] for ds in dets]
+
+    curve = []
+    for c in confs:
+        preds = [[d.xyxy for d in ds if d.conf >= c] for ds in dead]
+        row = score(truth, preds, match_iou)
+        flagged = [i for i, p in enumerate(preds) if p]
+        point = {
+            "conf": round(c, 3),
+            "precision": row["precision"],
+            "recall": row["recall"],
+            "frame_precision": sum(1 for i in flagged if truth[i]) / len(flagged) if flagged else None,
+            "frame_recall": row["frame_recall"],
+        }
+        # NaN (tidak ada prediksi / truth) -> None supaya file kalibrasi JSON valid
+        curve.append({k: (None if v != v else v) for k, v in point.items()})
+    return {
+        "images": len(frames),
+        "dead_boxes": sum(len(t) for t in truth),
+        "dead_frames": sum(1 for t in truth if t),
+        "curve": curve,
+    }
+
+
+# ===================== REKOMENDASI =====================
+def recommend(rows: List[Dict], pr: Optional[Dict], target_fa: float, max_neg_clip: float,
+              min_precision: float) -> Optional[Dict]:
+    curve = {p["conf"]: p for p in (pr or {}).get("curve", [])}
+
+    def feasible(r):
+        precision = curve.get(r["conf"], {}).get("frame_precision")
+        return ((r["fa_per_day"] is None or r["fa_per_day"] <= target_fa)
+                and (r["neg_clip_alarm"] is None or r["neg_clip_alarm"] <= max_neg_clip)
+                and (precision is None or precision >= min_precision))
+
+    def rank(r):
+        recall = r["recall_clips"]
+        if recall is None:
+            recall = curve.get(r["conf"], {}).get("frame_recall") or 0.0
+        latency = r["latency_p50_s"] if r["latency_p50_s"] is not None else float("inf")
+        return (-recall, latency, -r["conf"], r["hits"] or 0)
+
+    ok = [r for r in rows if feasible(r)]
+    if ok:
+        return dict(min(ok, key=rank), feasible=True)
+    if not rows:
+        return None
+    # tidak ada yang memenuhi target -> alarm palsu paling sedikit
+    return dict(min(rows, key=lambda r: (r["fa_per_day"] or 0.0, r["neg_clip_alarm"] or 0.0, rank(r))),
+                feasible=False)
+
+
+def _grid(value: str, cast) -> List:
+    """'a:b:step' atau 'a,b,c'."""
+    if ":" in value:
+        parts = [float(v) for v in value.split(":")]
+        start, stop = parts[0], parts[1]
+        step = parts[2] if len(parts) > 2 else 1.0
+        return [cast(round(v, 6)) for v in np.arange(start, stop + step / 2, step)]
+    return [cast(v) for v in value.split(",") if v.strip()]
+
+
+def _fmt(v, spec: str) -> str:
+    return "-".rjust(int(spec.split(".")[0])) if v is None else format(v, spec)
+
+
+def main():
+    cfg = AppConfig()
+    ap = argparse.ArgumentParser(description="Kalibrasi DEAD_CONF / DEAD_HITS_REQUIRED per model")
+    ap.add_argument("--model", default=None, help="default: model untuk --umur")
+    ap.add_argument("--umur", type=int, default=10)
+    ap.add_argument("--images", default="", help="folder gambar berlabel")
+    ap.add_argument("--labels", default="", help="folder label YOLO untuk --images")
+    ap.add_argument("--clips", default="", help="folder rekaman EventRecorder (sidecar .jsonl)")
+    ap.add_argument("--clip-labels", default="", help="CSV stem,label untuk klip")
+    ap.add_argument("--negative-history", default="", help="HIST_DIR periode tanpa tanaman mati")
+    ap.add_argument("--since", default="", help="awal periode history (YYYY-MM-DD)")
+    ap.add_argument("--until", default="", help="akhir periode history (YYYY-MM-DD, eksklusif)")
+    ap.add_argument("--history-conf", type=float, default=cfg.DEAD_CONF,
+                    help="DEAD_CONF saat history direkam (conf di bawahnya tidak tersimpan)")
+    ap.add_argument("--fps", type=float, default=0.0, help="fps inferensi yang disimulasikan (0 = fps sumber)")
+    ap.add_argument("--conf-grid", default="0.05:0.95:0.05")
+    ap.add_argument("--hits-grid", default="1:60")
+    ap.add_argument("--recover-sec", type=float, default=float(cfg.RECOVER_AFTER_SEC))
+    ap.add_argument("--target-fa-per-day", type=float, default=1.0)
+    ap.add_argument("--max-neg-clip-alarm", type=float, default=0.1,
+                    help="fraksi klip alarm-palsu yang masih boleh memicu")
+    ap.add_argument("--min-precision", type=float, default=0.9, help="precision frame minimum (--images)")
+    ap.add_argument("--match-iou", type=float, default=0.5)
+    ap.add_argument("--max-frames", type=int, default=2000)
+    ap.add_argument("--no-cache", action="store_true", help="jangan pakai result cache untuk --images")
+    ap.add_argument("--out-dir", default=cfg.CALIB_DIR)
+    ap.add_argument("--csv", default="", help="tulis grid (conf x hits) ke CSV")
+    ap.add_argument("--dry-run", action="store_true", help="tampilkan saja, jangan tulis file kalibrasi")
+    args = ap.parse_args()
+
+    if not (args.images or args.clips or args.negative_history):
+        sys.exit("butuh minimal satu sumber: --images/--labels, --clips, --negative-history")
+    if args.images and not args.labels:
+        sys.exit("--images butuh --labels")
+    model_path = args.model or model_path_for_age(cfg, args.umur)
+
+    floor = cfg.INFER_CONF
+    if args.negative_history:
+        floor = max(floor, args.history_conf)
+    confs = [c for c in _grid(args.conf_grid, float) if c >= floor - 1e-9]
+    hits_grid = sorted(set(h for h in _grid(args.hits_grid, int) if h >= 1))
+    if not confs:
+        sys.exit(f"grid conf kosong (floor {floor}: INFER_CONF / --history-conf)")
+
+    pr = None
+    if args.images:
+        pr = image_pr(cfg, model_path, args.images, args.labels, confs, args.match_iou, args.max_frames,
+                      not args.no_cache)
+        print(f"[CALIB] gambar: {pr['images']}, box dead={pr['dead_boxes']} di {pr['dead_frames']} gambar",
+              flush=True)
+
+    seqs: List[Track] = []
+    if args.clips:
+        seqs += load_clips(args.clips, args.clip_labels, cfg.DEAD_CLASS_NAME)
+    if args.negative_history:
+        seqs += load_history(cfg, args.negative_history, _parse_date(args.since), _parse_date(args.until))
+    fps_src = source_fps(seqs)
+    if args.fps > 0 and fps_src and args.fps > fps_src * 1.05:
+        print(f"[CALIB] WARNING --fps {args.fps} > fps sumber {fps_src:.1f}; frame tidak bisa ditambah", flush=True)
+    seqs = [resample(s, args.fps) for s in seqs]
+    fps = args.fps if args.fps > 0 else round(fps_src, 1)
+
+    neg_days = sum(duration_sec(s) for s in seqs if s.kind == "history") / 86400.0
+    n_pos = sum(1 for s in seqs if s.positive)
+    n_neg = sum(1 for s in seqs if s.kind == "clip" and not s.positive)
+    print(f"[CALIB] model={model_path} fps={fps} klip positif={n_pos} negatif={n_neg} "
+          f"history={neg_days * 24:.1f} jam, conf {confs[0]}..{confs[-1]}, hits {hits_grid[0]}..{hits_grid[-1]}",
+          flush=True)
+
+    # tanpa data berurutan waktu (gambar saja) debounce tidak bisa dievaluasi -> hanya DEAD_CONF
+    rows = evaluate(seqs, confs, hits_grid, args.recover_sec, neg_days) if seqs else [
+        {"conf": round(c, 3), "hits": None, "recall_clips": None, "latency_p50_s": None, "neg_clip_alarm": None,
+         "event_precision": None, "fa_per_day": None}
+        for c in confs
+    ]
+    best = recommend(rows, pr, args.target_fa_per_day, args.max_neg_clip_alarm, args.min_precision)
+
+    if pr is not None:
+        print()
+        print(f"{'conf':>5} {'prec':>6} {'recall':>7} {'frameP':>7} {'frameR':>7}")
+        for p in pr["curve"]:
+            print(f"{p['conf']:5.2f} {_fmt(p['precision'], '6.3f')} {_fmt(p['recall'], '7.3f')} "
+                  f"{_fmt(p['frame_precision'], '7.3f')} {_fmt(p['frame_recall'], '7.3f')}")
+    if seqs:
+        # per conf: H terkecil yang memenuhi target (titik operasi paling sensitif)
+        print()
+        print(f"{'conf':>5} {'hits':>5} {'FA/hari':>8} {'negKlip':>8} {'recall':>7} {'lat_s':>6} {'eventP':>7}")
+        for c in confs:
+            cand = [r for r in rows if r["conf"] == round(c, 3)
+                    and (r["fa_per_day"] is None or r["fa_per_day"] <= args.target_fa_per_day)
+                    and (r["neg_clip_alarm"] is None or r["neg_clip_alarm"] <= args.max_neg_clip_alarm)]
+            if not cand:
+                print(f"{c:5.2f}     - (target tidak tercapai di hits <= {hits_grid[-1]})")
+                continue
+            r = cand[0]
+            print(f"{r['conf']:5.2f} {r['hits']:5d} {_fmt(r['fa_per_day'], '8.2f')} "
+                  f"{_fmt(r['neg_clip_alarm'], '8.2f')} {_fmt(r['recall_clips'], '7.2f')} "
+                  f"{_fmt(r['latency_p50_s'], '6.1f')} {_fmt(r['event_precision'], '7.2f')}")
+
+    if args.csv:
+        with open(args.csv, "w", newline="", encoding="utf-8") as f:
+            w = csv.DictWriter(f, fieldnames=list(rows[0].keys()))
+            w.writeheader()
+            w.writerows(rows)
+        print(f"[CALIB] grid -> {args.csv}")
+
+    if best is None:
+        sys.exit("tidak ada kombinasi yang bisa dievaluasi")
+    print()
+    overrides = {"DEAD_CONF": best["conf"]}
+    if best["hits"] is not None:
+        overrides["DEAD_HITS_REQUIRED"] = best["hits"]
+    print(f"[CALIB] rekomendasi: {' '.join(f'{k}={v}' for k, v in overrides.items())}"
+          + ("" if best["feasible"] else "  (TARGET TIDAK TERCAPAI: alarm palsu paling sedikit)"))
+    if best["hits"] is None:
+        print("[CALIB] DEAD_HITS_REQUIRED tidak dikalibrasi (butuh --clips / --negative-history)")
+    if args.dry_run:
+        return
+
+    from inference import infer_params
+    from result_cache import model_fingerprint
+
+    doc = {
+        "model": os.path.basename(model_path),
+        "model_fp": model_fingerprint(model_path),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "dead_class": cfg.DEAD_CLASS_NAME,
+        "infer_params": infer_params(cfg),
+        "fps": fps,
+        "recover_after_sec": args.recover_sec,
+        "target_fa_per_day": args.target_fa_per_day,
+        "max_neg_clip_alarm": args.max_neg_clip_alarm,
+        "feasible": best["feasible"],
+        "overrides": overrides,
+        "expected": {k: v for k, v in best.items() if k not in ("conf", "hits", "feasible")},
+        "data": {"clips_pos": n_pos, "clips_neg": n_neg, "history_hours": round(neg_days * 24, 2),
+                 **({k: pr[k] for k in ("images", "dead_boxes", "dead_frames")} if pr else {})},
+        "pr_curve": pr["curve"] if pr else [],
+        "grid": rows,
+    }
+    os.makedirs(args.out_dir, exist_ok=True)
+    path = calibration_path(dataclasses.replace(cfg, CALIB_DIR=args.out_dir), model_path)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(doc, f, indent=1, allow_nan=False)
+    os.replace(tmp, path)
+    print(f"[CALIB] -> {path}")
+
+
+if __name__ == "__main__":
+    main()
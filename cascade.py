@@ -0,0 +1,248 @@
+# cascade.py
+"""
+Cascade: model kecil jalan tiap frame, box `dead` dikonfirmasi model kedua (lebih besar /
+classifier crop) sebelum dihitung sebagai hit. Box lain tidak disentuh.
+
+Model konfirmasi (CASCADE_MODEL):
+  detect   -> detector besar (mis. yolov8s.pt) dijalankan di crop box (+ padding);
+              skor = conf tertinggi kelas dead di crop. Bisa lewat inference server.
+  classify -> classifier crop (mis. *-cls.pt); skor = probabilitas kelas dead.
+
+Biaya dibatasi:
+  - CASCADE_MAX_PER_SEC : token bucket jumlah crop yang dikonfirmasi per detik
+  - cache per region    : hasil konfirmasi dipakai ulang untuk box yang overlap (IoU >= CASCADE_IOU)
+                          selama CASCADE_CACHE_SEC (tanaman praktis diam)
+  - CASCADE_TRUST_CONF  : box dengan conf >= ini langsung dianggap terkonfirmasi
+  - DEAD_CONF           : box di bawah ini tidak pernah dihitung hit oleh worker -> tidak dicek
+Box yang tidak sempat dicek (budget habis) -> confirmed=CASCADE_ACCEPT_UNVERIFIED.
+"""
+import os
+import time
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config import AppConfig
+from inference import Detection
+from metrics import METRICS
+
+Box = Tuple[float, float, float, float]
+
+
+def iou(a: Box, b: Box) -> float:
+    ix1, iy1 = max(a[0], b[0]), max(a[1], b[1])
+    ix2, iy2 = min(a[2], b[2]), min(a[3], b[3])
+    inter = max(0.0, ix2 - ix1) * max(0.0, iy2 - iy1)
+    if inter <= 0:
+        return 0.0
+    area_a = (a[2] - a[0]) * (a[3] - a[1])
+    area_b = (b[2] - b[0]) * (b[3] - b[1])
+    return inter / max(area_a + area_b - inter, 1e-6)
+
+
+def crop_box(frame: np.ndarray, xyxy: Box, pad: float) -> np.ndarray:
+    h, w = frame.shape[:2]
+    x1, y1, x2, y2 = xyxy
+    px, py = (x2 - x1) * pad, (y2 - y1) * pad
+    x1, y1 = int(max(0, x1 - px)), int(max(0, y1 - py))
+    x2, y2 = int(min(w, x2 + px)), int(min(h, y2 + py))
+    return frame[y1:max(y2, y1 + 1), x1:max(x2, x1 + 1)]
+
+
+class DetectorConfirmer:
+    def __init__(self, backend, dead_class_name: str):
+        self.backend = backend
+        self.dead_class_name = dead_class_name
+        self.path = backend.path
+
+    def score(self, crops: Sequence[np.ndarray]) -> List[float]:
+        return [
+            max((d.conf for d in dets if d.name == self.dead_class_name), default=0.0)
+            for dets in self.backend.predict_batch(list(crops))
+        ]
+
+
+class ClassifierConfirmer:
+    def __init__(self, model, dead_class_name: str, path: str = ""):
+        self.model = model
+        self.path = path
+        inv = {v: k for k, v in model.names.items()}
+        if dead_class_name not in inv:
+            raise ValueError(f"classifier {path} tidak punya kelas '{dead_class_name}' ({model.names})")
+        self.dead_idx = inv[dead_class_name]
+
+    def score(self, crops: Sequence[np.ndarray]) -> List[float]:
+        results = self.model.predict(list(crops), verbose=False)
+        return [float(r.probs.data[self.dead_idx]) for r in results]
+
+
+class CascadeBackend:
+    """Interface sama dengan backend lain (.names, .path, predict, predict_batch)."""
+    def __init__(
+        self,
+        primary,
+        confirmer,
+        dead_class_name: str,
+        conf: float = 0.5,
+        max_per_sec: float = 2.0,
+        cache_sec: float = 5.0,
+        iou_thr: float = 0.5,
+        pad: float = 0.25,
+        trust_conf: float = 1.01,
+        accept_unverified: bool = False,
+        dead_conf: float = 0.0,
+    ):
+        self.primary = primary
+        self.confirmer = confirmer
+        self.dead_class_name = dead_class_name
+        self.conf = conf
+        self.max_per_sec = max_per_sec
+        self.cache_sec = cache_sec
+        self.iou_thr = iou_thr
+        self.pad = pad
+        self.trust_conf = trust_conf
+        self.accept_unverified = accept_unverified
+        self.dead_conf = dead_conf  # ikut DEAD_CONF live (VideoWorker._refresh_config)
+
+        self._tokens = max(1.0, max_per_sec)
+        self._tokens_ts = time.monotonic()
+        self._cache: List[Tuple[Box, bool, float]] = []  # (xyxy, confirmed, ts)
+        self._lock = threading.Lock()
+
+    @property
+    def names(self) -> Dict[int, str]:
+        return self.primary.names
+
+    @property
+    def path(self) -> str:
+        return self.primary.path
+
+    @property
+    def supports_imgsz(self) -> bool:
+        return bool(getattr(self.primary, "supports_imgsz", False))
+
+    @property
+    def params(self) -> Dict:
+        # ikut key result cache: hasil cascade beda dengan hasil model primary saja
+        return {
+            **getattr(self.primary, "params", {}),
+            "cascade": os.path.basename(self.confirmer.path),
+            "cascade_conf": self.conf,
+            "cascade_pad": self.pad,
+            "cascade_min_conf": self.dead_conf,
+        }
+
+    def predict(self, frame, **kw) -> List[Detection]:
+        return self._confirm(frame, self.primary.predict(frame, **kw))
+
+    def predict_batch(self, frames: Sequence) -> List[List[Detection]]:
+        return [self._confirm(f, dets) for f, dets in zip(frames, self.primary.predict_batch(frames))]
+
+    # ---------- budget + cache ----------
+    def _take_token(self, now: float) -> bool:
+        if self.max_per_sec <= 0:
+            return True
+        cap = max(1.0, self.max_per_sec)
+        self._tokens = min(cap, self._tokens + (now - self._tokens_ts) * self.max_per_sec)
+        self._tokens_ts = now
+        if self._tokens >= 1.0:
+            self._tokens -= 1.0
+            return True
+        return False
+
+    def _lookup(self, xyxy: Box) -> Optional[bool]:
+        best, best_iou = None, self.iou_thr
+        for box, ok, _ in self._cache:
+            v = iou(box, xyxy)
+            if v >= best_iou:
+                best, best_iou = ok, v
+        return best
+
+    def _confirm(self, frame, dets: List[Detection]) -> List[Detection]:
+        if not any(d.name == self.dead_class_name for d in dets):
+            return dets
+        now = time.monotonic()
+        out = list(dets)
+        todo: List[int] = []
+        with self._lock:
+            if self.cache_sec > 0:
+                self._cache = [e for e in self._cache if now - e[2] < self.cache_sec]
+            for i, d in enumerate(dets):
+                if d.name != self.dead_class_name or d.conf >= self.trust_conf or d.conf < self.dead_conf:
+                    continue
+                hit = self._lookup(d.xyxy) if self.cache_sec > 0 else None
+                if hit is not None:
+                    out[i] = d._replace(confirmed=hit)
+                    METRICS.inc("cascade.cache_hits")
+                elif self._take_token(now):
+                    todo.append(i)
+                else:
+                    out[i] = d._replace(confirmed=self.accept_unverified)
+                    METRICS.inc("cascade.skipped")
+
+        if not todo:
+            return out
+
+        t0 = time.perf_counter()
+        scores = self.confirmer.score([crop_box(frame, dets[i].xyxy, self.pad) for i in todo])
+        METRICS.set("cascade.confirm_ms", round((time.perf_counter() - t0) * 1000, 2))
+        METRICS.inc("cascade.confirm_calls", len(todo))
+
+        with self._lock:
+            for i, s in zip(todo, scores):
+                ok = s >= self.conf
+                out[i] = dets[i]._replace(confirmed=ok)
+                if not ok:
+                    METRICS.inc("cascade.rejected")
+                if self.cache_sec > 0:
+                    self._cache.append((dets[i].xyxy, ok, now))
+        return out
+
+
+def load_confirmer(cfg: AppConfig, client=None):
+    """Model konfirmasi dari CASCADE_MODEL; detector lewat inference server kalau `client` ada."""
+    path = cfg.CASCADE_MODEL
+    kind = cfg.CASCADE_KIND
+    if kind == "auto":
+        kind = "classify" if "-cls" in os.path.basename(path) else "detect"
+
+    if kind == "detect" and client is not None:
+        from inference_server import RemoteBackend
+
+        return DetectorConfirmer(RemoteBackend(client, path), cfg.DEAD_CLASS_NAME)
+
+    from ultralytics import YOLO
+
+    model = YOLO(path)
+    if kind == "classify":
+        return ClassifierConfirmer(model, cfg.DEAD_CLASS_NAME, path)
+    from inference import YoloBackend
+
+    return DetectorConfirmer(YoloBackend(model, path), cfg.DEAD_CLASS_NAME)
+
+
+def build_cascade(cfg: AppConfig, primary, client=None, realtime: bool = True, confirmer=None):
+    """
+    primary apa adanya kalau CASCADE_MODEL kosong.
+    realtime=False (batch): tanpa rate limit dan tanpa cache region (tiap gambar beda).
+    confirmer: model konfirmasi yang sudah di-load (dipakai bersama beberapa cascade).
+    """
+    if not cfg.CASCADE_MODEL:
+        return primary
+    if confirmer is None:
+        confirmer = load_confirmer(cfg, client)
+        confirmer.score([np.zeros((64, 64, 3), dtype=np.uint8)])  # warm-up
+    return CascadeBackend(
+        primary,
+        confirmer,
+        cfg.DEAD_CLASS_NAME,
+        conf=cfg.CASCADE_CONF,
+        max_per_sec=cfg.CASCADE_MAX_PER_SEC if realtime else 0.0,
+        cache_sec=cfg.CASCADE_CACHE_SEC if realtime else 0.0,
+        iou_thr=cfg.CASCADE_IOU,
+        pad=cfg.CASCADE_PAD,
+        trust_conf=cfg.CASCADE_TRUST_CONF,
+        accept_unverified=cfg.CASCADE_ACCEPT_UNVERIFIED,
+        dead_conf=cfg.DEAD_CONF,
+    )
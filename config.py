@@ -1,9 +1,15 @@
 import os
-from dataclasses import dataclass
+from dataclasses import dataclass, fields
+from typing import Dict, Tuple
 from dotenv import load_dotenv
 
 load_dotenv()
 
+
+def _env_bool(name: str, default: str = "0") -> bool:
+    return os.getenv(name, default).strip().lower() in ("1", "true", "yes", "on")
+
+
 @dataclass(frozen=True)
 class AppConfig:
     # DB
@@ -19,6 +25,38 @@ class AppConfig:
     PATH_MODEL_2: str = os.getenv("PATH_MODEL_2", "model_2.pt")
     MODEL_AGE_SWITCH_DAYS: int = int(os.getenv("MODEL_AGE_SWITCH_DAYS", "15"))
 
+    # Parameter inferensi (default = default ultralytics; lihat inference.infer_params)
+    INFER_IMGSZ: int = int(os.getenv("INFER_IMGSZ", "0"))  # 0 = ukuran training model
+    INFER_CONF: float = float(os.getenv("INFER_CONF", "0.25"))  # floor conf semua kelas (<= DEAD_CONF!)
+    INFER_IOU: float = float(os.getenv("INFER_IOU", "0.7"))  # NMS IoU
+    INFER_MAX_DET: int = int(os.getenv("INFER_MAX_DET", "300"))
+    INFER_CLASSES: str = os.getenv("INFER_CLASSES", "").strip()  # "dead,healthy" / "0,1"; kosong = semua
+    INFER_HALF: bool = _env_bool("INFER_HALF", "0")  # FP16 (CUDA/Jetson)
+
+    # Inference server (kosong = model di-load in-process)
+    INFER_SERVER_ADDR: str = os.getenv("INFER_SERVER_ADDR", "").strip()  # host:port | /path/ke.sock
+    # wajib di-set kalau INFER_SERVER_ADDR bukan UNIX socket / loopback (manager meng-unpickle request)
+    INFER_SERVER_AUTHKEY: str = os.getenv("INFER_SERVER_AUTHKEY", "")
+    INFER_SERVER_WORKERS: int = int(os.getenv("INFER_SERVER_WORKERS", "1"))
+
+    # Pool replika model in-process (worker_pool.py); 1 = satu instance seperti biasa
+    POOL_REPLICAS: int = int(os.getenv("POOL_REPLICAS", "1"))
+    POOL_MODE: str = os.getenv("POOL_MODE", "thread").strip().lower()  # thread | process
+    POOL_CORES: str = os.getenv("POOL_CORES", "auto").strip()  # auto | "" (tanpa pin) | "0-3;4-7"
+    POOL_DEVICES: str = os.getenv("POOL_DEVICES", "").strip()  # "cuda:0,cuda:1" diputar per replika
+    POOL_MAX_INFLIGHT: int = int(os.getenv("POOL_MAX_INFLIGHT", "0"))  # frame di jalan; 0 = jumlah replika
+
+    # Cascade: box dead dikonfirmasi model kedua (kosong = nonaktif)
+    CASCADE_MODEL: str = os.getenv("CASCADE_MODEL", "").strip()
+    CASCADE_KIND: str = os.getenv("CASCADE_KIND", "auto").strip().lower()  # auto | detect | classify
+    CASCADE_CONF: float = float(os.getenv("CASCADE_CONF", "0.5"))
+    CASCADE_MAX_PER_SEC: float = float(os.getenv("CASCADE_MAX_PER_SEC", "2"))  # 0 = tanpa batas
+    CASCADE_CACHE_SEC: float = float(os.getenv("CASCADE_CACHE_SEC", "5"))
+    CASCADE_IOU: float = float(os.getenv("CASCADE_IOU", "0.5"))
+    CASCADE_PAD: float = float(os.getenv("CASCADE_PAD", "0.25"))
+    CASCADE_TRUST_CONF: float = float(os.getenv("CASCADE_TRUST_CONF", "1.01"))  # > 1 = selalu dicek
+    CASCADE_ACCEPT_UNVERIFIED: bool = _env_bool("CASCADE_ACCEPT_UNVERIFIED", "0")
+
     # Detection
     DEAD_CLASS_NAME: str = os.getenv("DEAD_CLASS_NAME", "dead")
     DEAD_CONF: float = float(os.getenv("DEAD_CONF", "0.35"))
@@ -26,10 +64,188 @@ class AppConfig:
     RECOVER_AFTER_SEC: int = int(os.getenv("RECOVER_AFTER_SEC", "30"))
     DB_COOLDOWN_SEC: int = int(os.getenv("DB_COOLDOWN_SEC", "5"))
 
+    # Kalibrasi per model (calibrate.py): CALIB_DIR/<nama model>.json menimpa DEAD_CONF / DEAD_HITS_REQUIRED
+    CALIB_ENABLED: bool = _env_bool("CALIB_ENABLED", "1")
+    CALIB_DIR: str = os.getenv("CALIB_DIR", "calibration")
+
     # Telegram
     TG_BOT_TOKEN: str = os.getenv("TELEGRAM_BOT_TOKEN", "").strip()
     TG_CHAT_ID: str = os.getenv("TELEGRAM_CHAT_ID", "").strip()
     TG_COOLDOWN_SEC: int = int(os.getenv("TELEGRAM_COOLDOWN_SEC", "10"))
+    TG_API_BASE: str = os.getenv("TG_API_BASE", "https://api.telegram.org").rstrip("/")  # stub lokal (testkit)
+
+    # Event recorder (klip pre/post-trigger)
+    REC_ENABLED: bool = _env_bool("REC_ENABLED", "0")
+    REC_DIR: str = os.getenv("REC_DIR", "recordings")
+    REC_FORMAT: str = os.getenv("REC_FORMAT", "mjpeg")  # mjpeg | avi | mp4
+    REC_PRE_SEC: float = float(os.getenv("REC_PRE_SEC", "10"))
+    REC_POST_SEC: float = float(os.getenv("REC_POST_SEC", "10"))
+    REC_FPS: float = float(os.getenv("REC_FPS", "10"))
+    REC_MAX_WIDTH: int = int(os.getenv("REC_MAX_WIDTH", "960"))
+    REC_JPEG_QUALITY: int = int(os.getenv("REC_JPEG_QUALITY", "70"))
+    REC_MAX_MB: int = int(os.getenv("REC_MAX_MB", "64"))
+
+    # Detection history (lokal, array-backed + rollup menit/jam)
+    HIST_ENABLED: bool = _env_bool("HIST_ENABLED", "0")
+    HIST_DIR: str = os.getenv("HIST_DIR", "history")
+    HIST_MAX_CLASSES: int = int(os.getenv("HIST_MAX_CLASSES", "8"))
+    HIST_FLUSH_SEC: float = float(os.getenv("HIST_FLUSH_SEC", "10"))
+    HIST_RAW_KEEP_DAYS: int = int(os.getenv("HIST_RAW_KEEP_DAYS", "7"))
+    HIST_MINUTE_KEEP_DAYS: int = int(os.getenv("HIST_MINUTE_KEEP_DAYS", "180"))
+
+    # Upload rollup + state event ke MySQL (butuh HIST_ENABLED untuk rollup)
+    DB_UPLOAD_ENABLED: bool = _env_bool("DB_UPLOAD_ENABLED", "0")
+    DB_BATCH_SIZE: int = int(os.getenv("DB_BATCH_SIZE", "200"))
+    DB_FLUSH_SEC: float = float(os.getenv("DB_FLUSH_SEC", "60"))
+    DB_PENDING_MAX: int = int(os.getenv("DB_PENDING_MAX", "20000"))
+
+    # Result cache inferensi (batch tool / Streamlit / benchmark replay)
+    CACHE_PATH: str = os.getenv("CACHE_PATH", "cache/results.sqlite")
+    CACHE_MAX_MB: int = int(os.getenv("CACHE_MAX_MB", "512"))
+
+    # Frame bus shared memory (kosong = nonaktif)
+    FRAME_BUS_NAME: str = os.getenv("FRAME_BUS_NAME", "").strip()
+    FRAME_BUS_SLOTS: int = int(os.getenv("FRAME_BUS_SLOTS", "4"))
+
+    # Detection bus (record biner per inferensi): folder UNIX datagram / ipc:// tcp:// ZeroMQ; kosong = nonaktif
+    DET_BUS_ADDR: str = os.getenv("DET_BUS_ADDR", "").strip()
+
+    # Remote viewing (MJPEG over HTTP)
+    STREAM_ENABLED: bool = _env_bool("STREAM_ENABLED", "0")
+    STREAM_HOST: str = os.getenv("STREAM_HOST", "127.0.0.1")  # tanpa auth; 0.0.0.0 = semua interface
+    STREAM_PORT: int = int(os.getenv("STREAM_PORT", "8080"))
+    STREAM_MAX_FPS: float = float(os.getenv("STREAM_MAX_FPS", "15"))
+
+    # Live config (override dari .env / configurations.data_configuration tanpa restart)
+    CFG_LIVE_ENABLED: bool = _env_bool("CFG_LIVE_ENABLED", "1")
+    CFG_POLL_SEC: float = float(os.getenv("CFG_POLL_SEC", "30"))
+    CFG_ENV_PATH: str = os.getenv("CFG_ENV_PATH", ".env")
+
+    # Capture (GStreamer): csi | v4l2 | file | test
+    CAM_SOURCE: str = os.getenv("CAM_SOURCE", "csi").strip().lower()
+    CAM_SENSOR_ID: int = int(os.getenv("CAM_SENSOR_ID", "0"))
+    CAM_DEVICE: str = os.getenv("CAM_DEVICE", "/dev/video0")
+    CAM_FILE: str = os.getenv("CAM_FILE", "")
+    CAM_MJPEG: bool = _env_bool("CAM_MJPEG", "0")
+    CAM_FORMAT: str = os.getenv("CAM_FORMAT", "BGR").strip()  # BGR | BGRx (tanpa videoconvert)
+    CAM_DUAL_STREAM: bool = _env_bool("CAM_DUAL_STREAM", "0")  # tee: ukuran model + ukuran display
+    CAM_SHM_PATH: str = os.getenv("CAM_SHM_PATH", "/tmp/aikentang_display")
+
+    # Preprocessing (crop/resize/mirror satu pass; 0 = ukuran asli)
+    CAM_CROP: str = os.getenv("CAM_CROP", "").strip()  # "x,y,w,h" di frame ter-mirror, kosong = full
+    DISPLAY_MAX_WIDTH: int = int(os.getenv("DISPLAY_MAX_WIDTH", "0"))
+    PRE_MODEL_SIZE: int = int(os.getenv("PRE_MODEL_SIZE", "0"))  # sisi terpanjang input model, mis. 640
+
+    # Multi-device (multi_device.py: satu host, banyak device)
+    DEVICES_FILE: str = os.getenv("DEVICES_FILE", "devices.json")
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "4"))
+    TG_DEVICE_COOLDOWN_SEC: float = float(os.getenv("TG_DEVICE_COOLDOWN_SEC", "300"))
+    DEVICE_RESTART_SEC: float = float(os.getenv("DEVICE_RESTART_SEC", "30"))
+
+    # Memory budget (uptime berminggu di device RAM kecil)
+    MEM_FRAME_POOL: int = int(os.getenv("MEM_FRAME_POOL", "4"))  # buffer frame ter-anotasi yang dipakai bergiliran
+    MEM_MAX_UI_PENDING: int = int(os.getenv("MEM_MAX_UI_PENDING", "2"))  # frame yang boleh antre di GUI
+    MEM_SAMPLE_SEC: float = float(os.getenv("MEM_SAMPLE_SEC", "60"))
+    MEM_BUDGET_MB: int = int(os.getenv("MEM_BUDGET_MB", "0"))  # 0 = tanpa batas; lewat -> gc + trim cache
+    MEM_TRACEMALLOC: bool = _env_bool("MEM_TRACEMALLOC", "0")
+    LOG_MAX_LINES: int = int(os.getenv("LOG_MAX_LINES", "2000"))
+    UI_STATS_SEC: float = float(os.getenv("UI_STATS_SEC", "0.5"))  # interval update area stats GUI
+
+    # Profiling on-demand (profiler.py; tombol Profile / kill -USR1)
+    PROFILE_DIR: str = os.getenv("PROFILE_DIR", "profiles")
+    PROFILE_MODE: str = os.getenv("PROFILE_MODE", "sample")  # sample | cprofile
+    PROFILE_SEC: float = float(os.getenv("PROFILE_SEC", "30"))
+    PROFILE_INTERVAL_MS: float = float(os.getenv("PROFILE_INTERVAL_MS", "5"))  # periode sampler
+    PROFILE_TOP: int = int(os.getenv("PROFILE_TOP", "30"))
+
+    # Degradasi bertahap saat beban tinggi (load_controller.py)
+    LOAD_ENABLED: bool = _env_bool("LOAD_ENABLED", "0")
+    LOAD_TARGET_MS: float = float(os.getenv("LOAD_TARGET_MS", "100"))  # waktu proses per frame yang dikejar
+    LOAD_EWMA_ALPHA: float = float(os.getenv("LOAD_EWMA_ALPHA", "0.1"))
+    LOAD_HIGH: float = float(os.getenv("LOAD_HIGH", "1.0"))  # turun level kalau ewma > target*HIGH
+    LOAD_LOW: float = float(os.getenv("LOAD_LOW", "0.6"))    # naik level kalau ewma < target*LOW
+    LOAD_DOWN_SEC: float = float(os.getenv("LOAD_DOWN_SEC", "3"))
+    LOAD_UP_SEC: float = float(os.getenv("LOAD_UP_SEC", "15"))
+    LOAD_IMGSZ_STEPS: str = os.getenv("LOAD_IMGSZ_STEPS", "512,416,320")
+    LOAD_MAX_SKIP: int = int(os.getenv("LOAD_MAX_SKIP", "2"))
+    LOAD_FALLBACK_MODEL: str = os.getenv("LOAD_FALLBACK_MODEL", "").strip()  # mis. yolov8n.pt
+    LOAD_DISPLAY_FPS: str = os.getenv("LOAD_DISPLAY_FPS", "10,5")
+
+    # I/O asyncio (io_service.py): DB set_current/threshold, Telegram, polling live config di satu loop
+    IO_ENABLED: bool = _env_bool("IO_ENABLED", "1")  # 0 = TelegramSender thread + DB sinkron seperti dulu
+    IO_DB_DRIVER: str = os.getenv("IO_DB_DRIVER", "auto").strip().lower()      # auto | aiomysql | thread
+    IO_HTTP_DRIVER: str = os.getenv("IO_HTTP_DRIVER", "auto").strip().lower()  # auto | aiohttp | thread
+    IO_MAX_PENDING: int = int(os.getenv("IO_MAX_PENDING", "100"))
+    IO_EXECUTOR_WORKERS: int = int(os.getenv("IO_EXECUTOR_WORKERS", "4"))  # driver thread + tugas sinkron
+
+    # Aktuator langsung ke kontroler pompa (actuator.py); kosong = setpoint hanya lewat DB
+    ACT_KIND: str = os.getenv("ACT_KIND", "").strip().lower()  # "" | mqtt | serial | http
+    ACT_TIMEOUT_SEC: float = float(os.getenv("ACT_TIMEOUT_SEC", "2"))
+    ACT_DB_WRITE: str = os.getenv("ACT_DB_WRITE", "fallback").strip().lower()  # fallback | always
+    ACT_MQTT_HOST: str = os.getenv("ACT_MQTT_HOST", "127.0.0.1")
+    ACT_MQTT_PORT: int = int(os.getenv("ACT_MQTT_PORT", "1883"))
+    ACT_MQTT_USER: str = os.getenv("ACT_MQTT_USER", "")
+    ACT_MQTT_PASS: str = os.getenv("ACT_MQTT_PASS", "")
+    ACT_MQTT_TOPIC: str = os.getenv("ACT_MQTT_TOPIC", "aikentang/{device_id}/npk")
+    ACT_MQTT_QOS: int = int(os.getenv("ACT_MQTT_QOS", "1"))
+    ACT_SERIAL_PORT: str = os.getenv("ACT_SERIAL_PORT", "/dev/ttyUSB0")
+    ACT_SERIAL_BAUD: int = int(os.getenv("ACT_SERIAL_BAUD", "115200"))
+    ACT_SERIAL_ACK: str = os.getenv("ACT_SERIAL_ACK", "OK")  # kosong = tidak menunggu balasan
+    ACT_HTTP_URL: str = os.getenv("ACT_HTTP_URL", "http://127.0.0.1:8090/npk")
 
     def telegram_enabled(self) -> bool:
         return bool(self.TG_BOT_TOKEN) and bool(self.TG_CHAT_ID)
+
+
+def model_path_for_age(cfg: AppConfig, umur_hari: int) -> str:
+    """Model 1 untuk umur <= MODEL_AGE_SWITCH_DAYS, model 2 setelahnya (fallback ke YOLO standar)."""
+    if umur_hari <= cfg.MODEL_AGE_SWITCH_DAYS:
+        return cfg.PATH_MODEL_1 if os.path.exists(cfg.PATH_MODEL_1) else "yolov8n.pt"
+    return cfg.PATH_MODEL_2 if os.path.exists(cfg.PATH_MODEL_2) else "yolov8s.pt"
+
+
+def calibration_path(cfg: AppConfig, model_path: str) -> str:
+    """File kalibrasi untuk model: CALIB_DIR/<nama file model tanpa ekstensi>.json."""
+    return os.path.join(cfg.CALIB_DIR, os.path.splitext(os.path.basename(model_path))[0] + ".json")
+
+
+# Field yang boleh diubah saat runtime (tanpa restart kamera / reload model)
+LIVE_KEYS: Tuple[str, ...] = (
+    "DEAD_CONF",
+    "DEAD_HITS_REQUIRED",
+    "RECOVER_AFTER_SEC",
+    "DB_COOLDOWN_SEC",
+    "TG_COOLDOWN_SEC",
+)
+
+# nama env var yang beda dengan nama field
+ENV_NAMES: Dict[str, str] = {
+    "TG_BOT_TOKEN": "TELEGRAM_BOT_TOKEN",
+    "TG_CHAT_ID": "TELEGRAM_CHAT_ID",
+    "TG_COOLDOWN_SEC": "TELEGRAM_COOLDOWN_SEC",
+}
+
+
+def coerce_overrides(raw: Dict[str, object], keys: Tuple[str, ...] = LIVE_KEYS) -> Dict[str, object]:
+    """
+    Filter + konversi tipe override (nama field / nama env, case-insensitive).
+    Nilai yang tidak valid di-skip.
+    """
+    types = {f.name: f.type for f in fields(AppConfig)}
+    by_name = {k.upper(): k for k in keys}
+    by_name.update({ENV_NAMES[k]: k for k in keys if k in ENV_NAMES})
+
+    out: Dict[str, object] = {}
+    for name, value in raw.items():
+        key = by_name.get(str(name).upper())
+        if key is None or value is None:
+            continue
+        typ = types[key]
+        try:
+            if typ is bool:
+                out[key] = value if isinstance(value, bool) else str(value).strip().lower() in ("1", "true", "yes", "on")
+            else:
+                out[key] = typ(value)
+        except (TypeError, ValueError):
+            continue
+    return out
@@ -1,5 +1,10 @@
+import json
+import time
+import queue
+import threading
+from contextlib import contextmanager
 import pymysql
-from typing import Dict
+from typing import Dict, Iterator, List, Optional, Tuple
 from config import AppConfig
 
 def _connect(cfg: AppConfig):
@@ -13,12 +18,127 @@ def _connect(cfg: AppConfig):
         cursorclass=pymysql.cursors.DictCursor,
     )
 
+
+class DbPool:
+    """
+    Pool koneksi bersama (mode multi-device): maksimal `size` koneksi terbuka berapapun
+    jumlah device/thread. Koneksi idle di-ping sebelum dipakai ulang; koneksi yang error dibuang.
+    """
+    def __init__(self, cfg: AppConfig, size: int = 4, acquire_timeout: float = 10.0, ping_after_sec: float = 60.0):
+        self.cfg = cfg
+        self.size = max(1, int(size))
+        self.acquire_timeout = acquire_timeout
+        self.ping_after_sec = ping_after_sec
+        self._idle: "queue.LifoQueue[tuple]" = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(self.size)
+        self.in_use = 0
+        self.opened = 0
+        self.waits = 0
+
+    @contextmanager
+    def connection(self) -> Iterator["pymysql.connections.Connection"]:
+        if not self._slots.acquire(blocking=False):
+            self.waits += 1
+            if not self._slots.acquire(timeout=self.acquire_timeout):
+                raise RuntimeError(f"DB pool penuh ({self.size} koneksi dipakai)")
+        conn = None
+        try:
+            try:
+                conn, last_used = self._idle.get_nowait()
+                if time.monotonic() - last_used > self.ping_after_sec:
+                    conn.ping(reconnect=True)
+            except queue.Empty:
+                conn = _connect(self.cfg)
+                self.opened += 1
+            self.in_use += 1
+            try:
+                yield conn
+            finally:
+                self.in_use -= 1
+            # sukses -> kembali ke pool; kalau query error, koneksi dibuang (state tidak jelas)
+            self._idle.put((conn, time.monotonic()))
+            conn = None
+        finally:
+            if conn is not None:
+                conn.close()
+            self._slots.release()
+
+    def stats(self) -> Dict[str, int]:
+        return {"size": self.size, "in_use": self.in_use, "idle": self._idle.qsize(),
+                "opened": self.opened, "waits": self.waits}
+
+    def close(self):
+        while True:
+            try:
+                conn, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+
+_POOL: Optional[DbPool] = None
+
+
+def use_pool(pool: Optional[DbPool]):
+    """Pasang pool bersama untuk semua query di modul ini (None = koneksi per query)."""
+    global _POOL
+    _POOL = pool
+
+
+def pool_active() -> bool:
+    return _POOL is not None
+
+
+@contextmanager
+def _connection(cfg: AppConfig) -> Iterator["pymysql.connections.Connection"]:
+    pool = _POOL
+    if pool is not None:
+        with pool.connection() as conn:
+            yield conn
+        return
+    conn = _connect(cfg)
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+THRESHOLD_SQL = """
+SELECT
+  JSON_UNQUOTE(JSON_EXTRACT(data_configuration, '$.device_configuration.threshold.n')) AS tn,
+  JSON_UNQUOTE(JSON_EXTRACT(data_configuration, '$.device_configuration.threshold.p')) AS tp,
+  JSON_UNQUOTE(JSON_EXTRACT(data_configuration, '$.device_configuration.threshold.k')) AS tk
+FROM configurations
+WHERE device_id = %s
+  AND is_active = 1
+  AND deleted_at IS NULL
+ORDER BY id DESC
+LIMIT 1;
+"""
+
+
+def threshold_from_row(row: Optional[Dict]) -> Dict[str, int]:
+    if not row:
+        raise RuntimeError("Threshold tidak ditemukan (cek configurations.is_active=1).")
+    return {
+        "n": int(row["tn"]) if row["tn"] is not None else 0,
+        "p": int(row["tp"]) if row["tp"] is not None else 0,
+        "k": int(row["tk"]) if row["tk"] is not None else 0,
+    }
+
+
 def get_threshold(cfg: AppConfig, device_id: int) -> Dict[str, int]:
+    with _connection(cfg) as conn:
+        with conn.cursor() as cur:
+            cur.execute(THRESHOLD_SQL, (device_id,))
+            return threshold_from_row(cur.fetchone())
+
+def get_config_version(cfg: AppConfig, device_id: int) -> Optional[Tuple[int, float]]:
+    """(id, updated_at epoch) config aktif. Query ringan untuk polling perubahan."""
     sql = """
-    SELECT
-      JSON_UNQUOTE(JSON_EXTRACT(data_configuration, '$.device_configuration.threshold.n')) AS tn,
-      JSON_UNQUOTE(JSON_EXTRACT(data_configuration, '$.device_configuration.threshold.p')) AS tp,
-      JSON_UNQUOTE(JSON_EXTRACT(data_configuration, '$.device_configuration.threshold.k')) AS tk
+    SELECT id, UNIX_TIMESTAMP(updated_at) AS v
     FROM configurations
     WHERE device_id = %s
       AND is_active = 1
@@ -26,40 +146,136 @@ def get_threshold(cfg: AppConfig, device_id: int) -> Dict[str, int]:
     ORDER BY id DESC
     LIMIT 1;
     """
-    conn = _connect(cfg)
-    try:
+    with _connection(cfg) as conn:
         with conn.cursor() as cur:
             cur.execute(sql, (device_id,))
             row = cur.fetchone()
             if not row:
-                raise RuntimeError("Threshold tidak ditemukan (cek configurations.is_active=1).")
-            return {
-                "n": int(row["tn"]) if row["tn"] is not None else 0,
-                "p": int(row["tp"]) if row["tp"] is not None else 0,
-                "k": int(row["tk"]) if row["tk"] is not None else 0,
-            }
-    finally:
-        conn.close()
+                return None
+            return int(row["id"]), float(row["v"] or 0)
 
-def set_current(cfg: AppConfig, device_id: int, n: int, p: int, k: int) -> int:
+
+def get_data_configuration(cfg: AppConfig, device_id: int) -> Dict:
     sql = """
-    UPDATE configurations
-    SET data_configuration =
-      JSON_SET(
-        data_configuration,
-        '$.device_configuration.current.n', %s,
-        '$.device_configuration.current.p', %s,
-        '$.device_configuration.current.k', %s
-      ),
-      updated_at = NOW()
+    SELECT data_configuration
+    FROM configurations
     WHERE device_id = %s
       AND is_active = 1
-      AND deleted_at IS NULL;
+      AND deleted_at IS NULL
+    ORDER BY id DESC
+    LIMIT 1;
     """
-    conn = _connect(cfg)
-    try:
+    with _connection(cfg) as conn:
         with conn.cursor() as cur:
-            cur.execute(sql, (n, p, k, device_id))
+            cur.execute(sql, (device_id,))
+            row = cur.fetchone()
+            if not row or not row["data_configuration"]:
+                return {}
+            data = row["data_configuration"]
+            return json.loads(data) if isinstance(data, (str, bytes)) else dict(data)
+
+
+# SQL dipakai juga oleh io_service (aiomysql)
+SET_CURRENT_SQL = """
+UPDATE configurations
+SET data_configuration =
+  JSON_SET(
+    data_configuration,
+    '$.device_configuration.current.n', %s,
+    '$.device_configuration.current.p', %s,
+    '$.device_configuration.current.k', %s
+  ),
+  updated_at = NOW()
+WHERE device_id = %s
+  AND is_active = 1
+  AND deleted_at IS NULL;
+"""
+
+
+def set_current(cfg: AppConfig, device_id: int, n: int, p: int, k: int) -> int:
+    with _connection(cfg) as conn:
+        with conn.cursor() as cur:
+            cur.execute(SET_CURRENT_SQL, (n, p, k, device_id))
             return cur.rowcount
-    finally:
-        conn.close()
+
+
+# ===================== DETECTION ROLLUPS / STATE EVENTS =====================
+# Primary key = idempotency key: batch yang di-retry cukup overwrite baris yang sama.
+DETECTION_TABLES_DDL = (
+    """
+    CREATE TABLE IF NOT EXISTS detection_rollups (
+      device_id INT NOT NULL,
+      bucket_ts DATETIME NOT NULL,
+      period_sec INT NOT NULL DEFAULT 60,
+      frames INT UNSIGNED NOT NULL,
+      dead_frames INT UNSIGNED NOT NULL,
+      malnutrisi_frames INT UNSIGNED NOT NULL,
+      best_dead_conf FLOAT NOT NULL,
+      last_state VARCHAR(16) NOT NULL,
+      counts JSON NULL,
+      created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+      PRIMARY KEY (device_id, bucket_ts, period_sec)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS detection_state_events (
+      device_id INT NOT NULL,
+      event_ts DATETIME(3) NOT NULL,
+      state VARCHAR(16) NOT NULL,
+      hits INT NOT NULL DEFAULT 0,
+      conf_best FLOAT NOT NULL DEFAULT 0,
+      created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+      PRIMARY KEY (device_id, event_ts, state)
+    )
+    """,
+)
+
+
+def ensure_detection_tables(cfg: AppConfig):
+    with _connection(cfg) as conn:
+        with conn.cursor() as cur:
+            for ddl in DETECTION_TABLES_DDL:
+                cur.execute(ddl)
+
+
+def insert_rollups(cfg: AppConfig, rows: List[Tuple]) -> int:
+    """
+    rows: (device_id, bucket_ts: datetime, period_sec, frames, dead_frames,
+           malnutrisi_frames, best_dead_conf, last_state, counts_json)
+    pymysql menggabung executemany INSERT ... VALUES jadi satu multi-row INSERT.
+    Baris = total bucket (DetectionHistory menggabung bagian sebelum restart), jadi overwrite aman di-retry.
+    """
+    if not rows:
+        return 0
+    sql = """
+    INSERT INTO detection_rollups
+      (device_id, bucket_ts, period_sec, frames, dead_frames, malnutrisi_frames,
+       best_dead_conf, last_state, counts)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+      frames = VALUES(frames),
+      dead_frames = VALUES(dead_frames),
+      malnutrisi_frames = VALUES(malnutrisi_frames),
+      best_dead_conf = VALUES(best_dead_conf),
+      last_state = VALUES(last_state),
+      counts = VALUES(counts)
+    """
+    with _connection(cfg) as conn:
+        with conn.cursor() as cur:
+            return cur.executemany(sql, rows) or 0
+
+
+def insert_state_events(cfg: AppConfig, rows: List[Tuple]) -> int:
+    """rows: (device_id, event_ts: datetime, state, hits, conf_best)"""
+    if not rows:
+        return 0
+    sql = """
+    INSERT INTO detection_state_events (device_id, event_ts, state, hits, conf_best)
+    VALUES (%s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+      hits = VALUES(hits),
+      conf_best = VALUES(conf_best)
+    """
+    with _connection(cfg) as conn:
+        with conn.cursor() as cur:
+            return cur.executemany(sql, rows) or 0
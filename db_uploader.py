@@ -0,0 +1,143 @@
+# db_uploader.py
+import time
+import json
+import threading
+import queue
+from collections import deque
+from datetime import datetime
+from typing import Callable, List, Optional, Sequence
+
+from config import AppConfig
+from db_client import ensure_detection_tables, insert_rollups, insert_state_events
+
+
+class DetectionUploader:
+    """
+    Kirim rollup per menit + transisi state ke MySQL secara batch (background thread).
+
+    - enqueue_*() non-blocking, aman dipanggil dari thread video / flush history.
+    - Flush saat pending >= DB_BATCH_SIZE atau tiap DB_FLUSH_SEC.
+    - Gagal kirim -> batch tetap di pending (dibatasi DB_PENDING_MAX, yang paling lama dibuang)
+      lalu di-retry. PK di tabel tujuan membuat retry tidak menggandakan baris.
+    """
+    def __init__(self, cfg: AppConfig, log: Optional[Callable[[str], None]] = None, queue_size: int = 1000):
+        self.cfg = cfg
+        self._log = log or (lambda msg: None)
+        self.q: "queue.Queue[tuple[str, tuple]]" = queue.Queue(maxsize=queue_size)
+
+        self.pending = {
+            "rollup": deque(maxlen=cfg.DB_PENDING_MAX),
+            "event": deque(maxlen=cfg.DB_PENDING_MAX),
+        }
+        self.last_flush_ts = 0.0
+        self.retry_after_ts = 0.0
+        self.fail_count = 0
+        self.tables_ready = False
+
+        self.stop_event = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if not self.cfg.DB_UPLOAD_ENABLED:
+            return
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join(timeout=10)
+
+    # ---------- producers ----------
+    def _put(self, kind: str, row: tuple) -> bool:
+        if not self.cfg.DB_UPLOAD_ENABLED:
+            return False
+        try:
+            self.q.put_nowait((kind, row))
+            return True
+        except queue.Full:
+            return False
+
+    def enqueue_rollups(self, rollups, classes: Sequence[str], period_sec: int = 60, device_id: Optional[int] = None):
+        """rollups: structured array dari DetectionHistory (rollup_dtype)."""
+        from detection_history import STATE_NAMES  # lazy (numpy): modul ini di-import main.py saat boot
+
+        device_id = self.cfg.DEVICE_ID if device_id is None else device_id
+        for r in rollups:
+            counts = {name: int(n) for name, n in zip(classes, r["counts"]) if n}
+            self._put("rollup", (
+                device_id,
+                datetime.fromtimestamp(int(r["bucket"])),
+                period_sec,
+                int(r["frames"]),
+                int(r["dead_frames"]),
+                int(r["malnutrisi_frames"]),
+                round(float(r["best_dead_conf"]), 4),
+                STATE_NAMES.get(int(r["last_state"]), "unknown"),
+                json.dumps(counts),
+            ))
+
+    def enqueue_state_event(self, ts: float, state: str, hits: int = 0, conf_best: float = 0.0,
+                            device_id: Optional[int] = None) -> bool:
+        device_id = self.cfg.DEVICE_ID if device_id is None else device_id
+        # presisi ms supaya key (device_id, event_ts, state) stabil saat retry
+        event_ts = datetime.fromtimestamp(round(ts, 3))
+        return self._put("event", (device_id, event_ts, state, int(hits), round(float(conf_best), 4)))
+
+    # ---------- worker ----------
+    def _pending_count(self) -> int:
+        return sum(len(d) for d in self.pending.values())
+
+    def _run(self):
+        while True:
+            stopping = self.stop_event.is_set()
+            try:
+                kind, row = self.q.get(timeout=0.5)
+                self.pending[kind].append(row)
+                self.q.task_done()
+                # drain yang sudah antre tanpa menunggu (semua, kalau sedang stop)
+                while stopping or self._pending_count() < self.cfg.DB_BATCH_SIZE:
+                    kind, row = self.q.get_nowait()
+                    self.pending[kind].append(row)
+                    self.q.task_done()
+            except queue.Empty:
+                pass
+
+            now = time.time()
+            due = (
+                self._pending_count() >= self.cfg.DB_BATCH_SIZE
+                or (now - self.last_flush_ts) >= self.cfg.DB_FLUSH_SEC
+                or stopping
+            )
+            if due and self._pending_count() and (now >= self.retry_after_ts or stopping):
+                self._flush()
+                self.last_flush_ts = now
+
+            if stopping:
+                return
+
+    def _take(self, kind: str) -> List[tuple]:
+        d = self.pending[kind]
+        return [d[i] for i in range(min(len(d), self.cfg.DB_BATCH_SIZE))]
+
+    def _flush(self):
+        try:
+            if not self.tables_ready:
+                ensure_detection_tables(self.cfg)
+                self.tables_ready = True
+            for kind, send in (("event", insert_state_events), ("rollup", insert_rollups)):
+                while self.pending[kind]:
+                    batch = self._take(kind)
+                    send(self.cfg, batch)
+                    for _ in batch:
+                        self.pending[kind].popleft()
+            if self.fail_count:
+                self._log(f"[DB] upload recovered after {self.fail_count} failure(s)")
+            self.fail_count = 0
+        except Exception as e:
+            self.fail_count += 1
+            backoff = min(300.0, self.cfg.DB_FLUSH_SEC * (2 ** min(self.fail_count, 5)))
+            self.retry_after_ts = time.time() + backoff
+            self._log(
+                f"[DB] ERROR upload batch ({self._pending_count()} pending, retry in {backoff:.0f}s): {e}"
+            )
@@ -0,0 +1,322 @@
+# detection_bus.py
+"""
+Detection bus: satu record biner per inferensi -> konsumen lokal (kontroler nutrisi, logger, dashboard)
+tanpa polling MySQL dan tanpa kerja tambahan di thread video.
+
+Transport (DET_BUS_ADDR):
+  /tmp/aikentang_det         -> UNIX datagram. Tiap subscriber bind socket di folder ini; publisher
+                                mengirim (sendto non-blocking) ke semua socket yang ada. Subscriber mati
+                                (socket basi) dihapus otomatis; antrean subscriber penuh -> record di-drop
+                                (panjang antrean: sysctl net.unix.max_dgram_qlen, default 10-512).
+  ipc://... / tcp://...      -> ZeroMQ XPUB (butuh pyzmq). Jumlah subscriber dilacak dari pesan
+                                subscribe XPUB. Multipart [b"dev<id>", record].
+Tidak ada subscriber -> publish() langsung return (record bahkan tidak di-pack).
+
+Record (little-endian, struct):
+  header 40 B : magic u32, version u8, state u8, flags u16 (bit0 dead_detected), device_id u32,
+                seq u64 (per device), ts f64, best_dead_conf f32, dead_hits u16, n_dets u16,
+                width u16, height u16
+  det 24 B    : cls u16, flags u16 (bit0 confirmed, bit1 kelas dead), conf f32, x1 y1 x2 y2 f32
+  state       : kode detection_history.STATE_CODES (1 normal, 2 malnutrisi, 3 no_plant)
+
+Monitor cepat:
+  python detection_bus.py --addr /tmp/aikentang_det
+"""
+import os
+import time
+import errno
+import socket
+import struct
+import argparse
+import threading
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+from detection_history import STATE_CODES, STATE_NAMES
+from inference import Detection
+from metrics import METRICS
+
+try:
+    import zmq
+except ImportError:  # opsional, hanya untuk alamat ipc:// / tcp://
+    zmq = None
+
+MAGIC = 0x42544544  # "DETB"
+VERSION = 1
+HEADER = struct.Struct("<IBBHIQdfHHHH")
+DET = struct.Struct("<HHf4f")
+MAX_DETS = 255  # record <= ~6 KB, muat di satu datagram
+
+DEAD_FLAG = 0x1
+DET_CONFIRMED = 0x1
+DET_DEAD = 0x2
+
+SCAN_SEC = 1.0  # interval cek subscriber baru (UNIX)
+
+
+class DetectionRecord(NamedTuple):
+    device_id: int
+    seq: int
+    ts: float
+    state: str
+    dead_detected: bool
+    best_dead_conf: float
+    dead_hits: int
+    width: int
+    height: int
+    dets: List[Detection]
+
+
+def is_zmq_addr(addr: str) -> bool:
+    return addr.startswith(("ipc://", "tcp://"))
+
+
+def pack_record(device_id: int, seq: int, ts: float, state: str, dets: Sequence[Detection],
+                dead_class: str, dead_detected: bool, best_dead_conf: float, dead_hits: int,
+                width: int, height: int) -> bytes:
+    dets = dets[:MAX_DETS]
+    parts = [HEADER.pack(
+        MAGIC, VERSION, STATE_CODES.get(state, 0), DEAD_FLAG if dead_detected else 0, device_id,
+        seq, ts, best_dead_conf, min(dead_hits, 0xFFFF), len(dets), width, height,
+    )]
+    for d in dets:
+        flags = (DET_CONFIRMED if d.confirmed else 0) | (DET_DEAD if d.name == dead_class else 0)
+        parts.append(DET.pack(d.cls, flags, d.conf, *d.xyxy))
+    return b"".join(parts)
+
+
+def unpack_record(data: bytes, names: Optional[Dict[int, str]] = None, dead_class: str = "dead") -> DetectionRecord:
+    """names: id -> nama kelas model (opsional); tanpa names, box dead diberi nama dead_class."""
+    (magic, version, state, flags, device_id, seq, ts, best, hits, n, width, height) = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"record bukan detection bus v{VERSION}")
+    dets = []
+    for i in range(n):
+        cls, dflags, conf, x1, y1, x2, y2 = DET.unpack_from(data, HEADER.size + i * DET.size)
+        if names is not None:
+            name = names.get(cls, str(cls))
+        else:
+            name = dead_class if dflags & DET_DEAD else str(cls)
+        dets.append(Detection(cls, name, conf, (x1, y1, x2, y2), bool(dflags & DET_CONFIRMED)))
+    return DetectionRecord(device_id, seq, ts, STATE_NAMES.get(state, "unknown"), bool(flags & DEAD_FLAG),
+                           best, hits, width, height, dets)
+
+
+# ===================== PUBLISHER =====================
+class DetectionBusPublisher:
+    """
+    Satu instance per proses (dipakai bersama semua VideoWorker di multi_device).
+    publish() non-blocking; aman dipanggil dari banyak thread.
+    """
+    def __init__(self, addr: str, dead_class: str = "dead"):
+        self.addr = addr
+        self.dead_class = dead_class
+        self._lock = threading.Lock()
+        self._seq: Dict[int, int] = {}
+        self.published = 0
+        self.dropped = 0
+
+        self._zmq = None
+        self._ctx = None
+        self._sock = None
+        self._peers: List[str] = []
+        self._next_scan = 0.0
+        self._n_subs = 0
+        if is_zmq_addr(addr):
+            if zmq is None:
+                raise RuntimeError(f"DET_BUS_ADDR={addr} butuh pyzmq (pip install pyzmq)")
+            self._ctx = zmq.Context.instance()
+            self._zmq = self._ctx.socket(zmq.XPUB)
+            self._zmq.setsockopt(zmq.SNDHWM, 100)
+            self._zmq.bind(addr)
+        else:
+            os.makedirs(addr, exist_ok=True)
+            self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            self._sock.setblocking(False)
+
+    @property
+    def subscribers(self) -> int:
+        return self._n_subs
+
+    def publish(self, device_id: int, ts: float, state: str, dets: Sequence[Detection],
+                dead_detected: bool = False, best_dead_conf: float = 0.0, dead_hits: int = 0,
+                width: int = 0, height: int = 0) -> bool:
+        with self._lock:
+            seq = self._seq.get(device_id, 0) + 1
+            self._seq[device_id] = seq  # seq tetap naik walau tanpa subscriber -> gap = record terlewat
+            if not self._has_subscribers():
+                return False
+            data = pack_record(device_id, seq, ts, state, dets, self.dead_class, dead_detected,
+                               best_dead_conf, dead_hits, width, height)
+            if self._zmq is not None:
+                try:
+                    self._zmq.send_multipart([f"dev{device_id}".encode(), data], flags=zmq.NOBLOCK)
+                    sent = True
+                except zmq.Again:
+                    sent = False
+                    self.dropped += 1
+            else:
+                sent = self._send_unix(data)
+            if sent:
+                self.published += 1
+            METRICS.set("detbus.published", self.published)
+            METRICS.set("detbus.dropped", self.dropped)
+            return sent
+
+    def _has_subscribers(self) -> bool:
+        if self._zmq is not None:
+            # pesan subscribe/unsubscribe XPUB: b"\x01topic" / b"\x00topic"; XPUB hanya meneruskan
+            # subscribe pertama / unsubscribe terakhir per topic -> hitungan = topic aktif, cukup untuk fast path
+            while True:
+                try:
+                    msg = self._zmq.recv(zmq.NOBLOCK)
+                except zmq.Again:
+                    break
+                if msg:
+                    self._n_subs += 1 if msg[0] == 1 else -1
+        else:
+            now = time.monotonic()
+            if now >= self._next_scan:
+                self._next_scan = now + SCAN_SEC
+                try:
+                    self._peers = [e.path for e in os.scandir(self.addr) if e.name.endswith(".sock")]
+                except OSError:
+                    self._peers = []
+                self._n_subs = len(self._peers)
+        METRICS.set("detbus.subscribers", self._n_subs)
+        return self._n_subs > 0
+
+    def _send_unix(self, data: bytes) -> bool:
+        sent = False
+        for path in list(self._peers):
+            try:
+                self._sock.sendto(data, path)
+                sent = True
+            except BlockingIOError:
+                self.dropped += 1  # subscriber lambat: buffer socket penuh
+            except OSError as e:
+                if e.errno in (errno.ECONNREFUSED, errno.ENOENT):
+                    # subscriber mati tanpa close(): socket basi
+                    self._peers.remove(path)
+                    self._n_subs = len(self._peers)
+                    try:
+                        os.unlink(path)
+                    except OSError:
+                        pass
+                else:
+                    self.dropped += 1
+        return sent
+
+    def close(self):
+        if self._zmq is not None:
+            self._zmq.close(linger=0)
+        if self._sock is not None:
+            self._sock.close()
+
+
+# ===================== SUBSCRIBER =====================
+class DetectionBusSubscriber:
+    """
+    sub = DetectionBusSubscriber("/tmp/aikentang_det")
+    for rec in sub:           # atau sub.recv(timeout)
+        ...
+    device_ids: hanya device tertentu (ZeroMQ: filter di publisher; UNIX: filter di sini).
+    """
+    def __init__(self, addr: str, names: Optional[Dict[int, str]] = None, dead_class: str = "dead",
+                 device_ids: Optional[Sequence[int]] = None, rcvbuf: int = 1 << 20):
+        self.addr = addr
+        self.names = names
+        self.dead_class = dead_class
+        self.device_ids = set(device_ids) if device_ids else None
+        self.path = None
+        self._zmq = None
+        self._sock = None
+        if is_zmq_addr(addr):
+            if zmq is None:
+                raise RuntimeError(f"{addr} butuh pyzmq (pip install pyzmq)")
+            self._zmq = zmq.Context.instance().socket(zmq.SUB)
+            for topic in ([f"dev{d}".encode() for d in self.device_ids] if self.device_ids else [b""]):
+                self._zmq.setsockopt(zmq.SUBSCRIBE, topic)
+            self._zmq.connect(addr)
+        else:
+            os.makedirs(addr, exist_ok=True)
+            self.path = os.path.join(addr, f"sub_{os.getpid()}_{id(self):x}.sock")
+            self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, rcvbuf)
+            self._sock.bind(self.path)
+
+    def recv(self, timeout: Optional[float] = 1.0) -> Optional[DetectionRecord]:
+        """Record berikutnya, atau None kalau timeout (None = tunggu terus)."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            data = self._recv_raw(remaining)
+            if data is None:
+                return None
+            rec = unpack_record(data, self.names, self.dead_class)
+            if self.device_ids is None or rec.device_id in self.device_ids:
+                return rec
+
+    def _recv_raw(self, timeout: Optional[float]) -> Optional[bytes]:
+        if self._zmq is not None:
+            if not self._zmq.poll(None if timeout is None else int(timeout * 1000)):
+                return None
+            return self._zmq.recv_multipart()[1]
+        self._sock.settimeout(timeout)
+        try:
+            return self._sock.recv(HEADER.size + MAX_DETS * DET.size)
+        except socket.timeout:
+            return None
+
+    def __iter__(self):
+        while True:
+            rec = self.recv(timeout=None)
+            if rec is not None:
+                yield rec
+
+    def close(self):
+        if self._zmq is not None:
+            self._zmq.close(linger=0)
+        if self._sock is not None:
+            self._sock.close()
+            try:
+                os.unlink(self.path)
+            except OSError:
+                pass
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Monitor detection bus (rate + latency + isi record)")
+    ap.add_argument("--addr", default="/tmp/aikentang_det")
+    ap.add_argument("--seconds", type=float, default=10)
+    ap.add_argument("--device", type=int, action="append", help="filter device_id (bisa berulang)")
+    ap.add_argument("-v", "--verbose", action="store_true", help="print tiap record")
+    args = ap.parse_args()
+
+    sub = DetectionBusSubscriber(args.addr, device_ids=args.device)
+    last: Dict[int, int] = {}
+    n, lat, gaps = 0, 0.0, 0
+    t0 = time.monotonic()
+    try:
+        while time.monotonic() - t0 < args.seconds:
+            rec = sub.recv(timeout=0.5)
+            if rec is None:
+                continue
+            if rec.device_id in last:
+                gaps += max(0, rec.seq - last[rec.device_id] - 1)
+            last[rec.device_id] = rec.seq
+            n, lat = n + 1, lat + (time.time() - rec.ts)
+            if args.verbose:
+                dead = sum(1 for d in rec.dets if d.name == sub.dead_class)
+                print(f"dev{rec.device_id} #{rec.seq} {rec.state} dets={len(rec.dets)} dead={dead} "
+                      f"best={rec.best_dead_conf:.2f} hits={rec.dead_hits}")
+    finally:
+        sub.close()
+    elapsed = time.monotonic() - t0
+    if n:
+        print(f"{n / elapsed:.1f} rec/s, avg latency {lat / n * 1000:.2f}ms, terlewat {gaps}, device {sorted(last)}")
+    else:
+        print("no records")
+
+
+if __name__ == "__main__":
+    main()
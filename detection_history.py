@@ -0,0 +1,337 @@
+# detection_history.py
+import os
+import json
+import time
+import threading
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from config import AppConfig
+
+
+# status UI -> kode 1 byte
+STATE_CODES = {"stopped": 0, "normal": 1, "malnutrisi": 2, "no_plant": 3}
+STATE_NAMES = {v: k for k, v in STATE_CODES.items()}
+
+RESOLUTIONS = {"minute": 60, "hour": 3600}
+
+
+def raw_dtype(n_classes: int) -> np.dtype:
+    return np.dtype([
+        ("ts", "<f8"),
+        ("counts", "<u2", (n_classes,)),
+        ("best_dead_conf", "<f4"),
+        ("dead", "u1"),
+        ("state", "u1"),
+    ])
+
+
+def rollup_dtype(n_classes: int) -> np.dtype:
+    return np.dtype([
+        ("bucket", "<i8"),
+        ("frames", "<u4"),
+        ("counts", "<u4", (n_classes,)),
+        ("dead_frames", "<u4"),
+        ("best_dead_conf", "<f4"),
+        ("malnutrisi_frames", "<u4"),
+        ("last_state", "u1"),
+    ])
+
+
+def _group_last_index(first_idx: np.ndarray, n: int) -> np.ndarray:
+    return np.r_[first_idx[1:] - 1, n - 1]
+
+
+def rollup_raw(rows: np.ndarray, period: int, n_classes: int) -> np.ndarray:
+    """Agregasi baris raw (urut waktu) ke bucket `period` detik."""
+    out = np.zeros(0, dtype=rollup_dtype(n_classes))
+    if len(rows) == 0:
+        return out
+    buckets = (rows["ts"] // period).astype(np.int64) * period
+    uniq, first, inv = np.unique(buckets, return_index=True, return_inverse=True)
+    out = np.zeros(len(uniq), dtype=rollup_dtype(n_classes))
+    out["bucket"] = uniq
+    out["frames"] = np.bincount(inv, minlength=len(uniq))
+    np.add.at(out["counts"], inv, rows["counts"])
+    out["dead_frames"] = np.bincount(inv, weights=rows["dead"], minlength=len(uniq))
+    out["malnutrisi_frames"] = np.bincount(
+        inv, weights=(rows["state"] == STATE_CODES["malnutrisi"]), minlength=len(uniq)
+    )
+    np.maximum.at(out["best_dead_conf"], inv, rows["best_dead_conf"])
+    out["last_state"] = rows["state"][_group_last_index(first, len(rows))]
+    return out
+
+
+def rollup_rollups(rows: np.ndarray, period: int, n_classes: int) -> np.ndarray:
+    """Gabung baris rollup (menit -> jam, atau merge bucket duplikat)."""
+    out = np.zeros(0, dtype=rollup_dtype(n_classes))
+    if len(rows) == 0:
+        return out
+    rows = rows[np.argsort(rows["bucket"], kind="stable")]
+    buckets = (rows["bucket"] // period) * period
+    uniq, first, inv = np.unique(buckets, return_index=True, return_inverse=True)
+    out = np.zeros(len(uniq), dtype=rollup_dtype(n_classes))
+    out["bucket"] = uniq
+    for col in ("frames", "dead_frames", "malnutrisi_frames"):
+        out[col] = np.bincount(inv, weights=rows[col], minlength=len(uniq))
+    np.add.at(out["counts"], inv, rows["counts"])
+    np.maximum.at(out["best_dead_conf"], inv, rows["best_dead_conf"])
+    out["last_state"] = rows["last_state"][_group_last_index(first, len(rows))]
+    return out
+
+
+class DetectionHistory:
+    """
+    Riwayat deteksi lokal, array-backed (record biner fixed-width, append-only).
+
+    Layout HIST_DIR:
+      meta.json            -> daftar nama kelas (index kolom `counts`)
+      raw/YYYYMMDD.bin     -> 1 record per frame (retensi HIST_RAW_KEEP_DAYS)
+      minute/YYYYMMDD.bin  -> rollup per menit (retensi HIST_MINUTE_KEEP_DAYS)
+      hour/YYYYMM.bin      -> rollup per jam (disimpan permanen)
+
+    append() dipanggil dari thread video (cuma deque.append); flush, rollup, dan
+    retensi dikerjakan thread background tiap HIST_FLUSH_SEC.
+    File dibaca via np.memmap, jadi query berminggu-minggu cukup baca rollup.
+    """
+    def __init__(
+        self,
+        cfg: AppConfig,
+        log: Optional[Callable[[str], None]] = None,
+        on_minute_rollup: Optional[Callable[[np.ndarray, List[str]], None]] = None,
+    ):
+        self.cfg = cfg
+        self._log = log or (lambda msg: None)
+        self.on_minute_rollup = on_minute_rollup
+        self.root = cfg.HIST_DIR
+
+        self._meta_lock = threading.Lock()
+        self.classes: List[str] = []
+        self.n_classes = int(cfg.HIST_MAX_CLASSES)
+        self._load_meta()
+
+        self.raw_dtype = raw_dtype(self.n_classes)
+        self.rollup_dtype = rollup_dtype(self.n_classes)
+
+        self._buf: deque = deque()
+        self._io_lock = threading.Lock()
+        self._open: Dict[str, Optional[np.ndarray]] = {"minute": None, "hour": None}
+        self._last_prune_day = ""
+
+        self.stop_event = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+
+    # ---------- meta ----------
+    def _meta_path(self) -> str:
+        return os.path.join(self.root, "meta.json")
+
+    def _load_meta(self):
+        try:
+            with open(self._meta_path(), "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            self.classes = list(meta.get("classes", []))
+            self.n_classes = int(meta.get("max_classes", self.n_classes))
+        except (OSError, ValueError):
+            pass
+
+    def _save_meta(self):
+        os.makedirs(self.root, exist_ok=True)
+        tmp = self._meta_path() + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": 1, "max_classes": self.n_classes, "classes": self.classes}, f)
+        os.replace(tmp, self._meta_path())
+
+    def class_index(self, name: str) -> int:
+        try:
+            return self.classes.index(name)
+        except ValueError:
+            pass
+        with self._meta_lock:
+            if name not in self.classes:
+                if len(self.classes) >= self.n_classes:
+                    return -1
+                self.classes.append(name)
+                self._save_meta()
+            return self.classes.index(name)
+
+    # ---------- lifecycle ----------
+    def start(self):
+        for sub in ("raw", "minute", "hour"):
+            os.makedirs(os.path.join(self.root, sub), exist_ok=True)
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join(timeout=5)
+        self.flush(close_open=True)
+
+    def _run(self):
+        while not self.stop_event.wait(float(self.cfg.HIST_FLUSH_SEC)):
+            try:
+                self.flush()
+            except Exception as e:
+                self._log(f"[HIST] ERROR flush: {e}")
+
+    # ---------- API thread video ----------
+    def append(self, ts: float, counts: Dict[str, int], best_dead_conf: float, dead: bool, state: str):
+        row = np.zeros(self.n_classes, dtype="<u2")
+        for name, n in counts.items():
+            idx = self.class_index(name)
+            if idx >= 0:
+                row[idx] = min(int(n), 0xFFFF)
+        self._buf.append((ts, row, best_dead_conf, 1 if dead else 0, STATE_CODES.get(state, 0)))
+
+    # ---------- flush / rollup ----------
+    def _file(self, kind: str, ts: float) -> str:
+        fmt = "%Y%m" if kind == "hour" else "%Y%m%d"
+        return os.path.join(self.root, kind, time.strftime(fmt, time.gmtime(ts)) + ".bin")
+
+    def _append_rows(self, kind: str, rows: np.ndarray, ts_col: str):
+        if len(rows) == 0:
+            return
+        paths = [self._file(kind, t) for t in rows[ts_col]]
+        start = 0
+        for i in range(1, len(rows) + 1):
+            if i == len(rows) or paths[i] != paths[start]:
+                with open(paths[start], "ab") as f:
+                    rows[start:i].tofile(f)
+                start = i
+
+    def _merge_open(self, kind: str, rolled: np.ndarray, now: float, close_open: bool) -> np.ndarray:
+        """Return bucket yang sudah final; bucket terakhir ditahan sampai periodenya lewat."""
+        period = RESOLUTIONS[kind]
+        prev = self._open[kind]
+        if prev is not None:
+            rolled = rollup_rollups(np.concatenate([prev, rolled]), period, self.n_classes)
+        if len(rolled) == 0:
+            return rolled
+        last = rolled[-1:]
+        grace = float(self.cfg.HIST_FLUSH_SEC)
+        if close_open or (last["bucket"][0] + period + grace) <= now:
+            self._open[kind] = None
+            return rolled
+        self._open[kind] = last.copy()
+        return rolled[:-1]
+
+    def _with_earlier_part(self, minutes: np.ndarray) -> np.ndarray:
+        """
+        Restart di tengah menit: bagian awal bucket pertama sudah ditulis (dan di-upload) oleh
+        instance sebelumnya. Gabungkan dengan baris itu di ekor file supaya yang dikirim total penuh.
+        """
+        first = minutes["bucket"][0]
+        arr = self._read(self._file("minute", float(first)), self.rollup_dtype)
+        i = len(arr)
+        while i > 0 and arr["bucket"][i - 1] == first:
+            i -= 1
+        if i == len(arr):
+            return minutes
+        return rollup_rollups(np.concatenate([np.array(arr[i:]), minutes]), 60, self.n_classes)
+
+    def flush(self, close_open: bool = False):
+        with self._io_lock:
+            batch = [self._buf.popleft() for _ in range(len(self._buf))]
+            now = time.time()
+
+            rows = np.zeros(len(batch), dtype=self.raw_dtype)
+            if batch:
+                ts, counts, best, dead, state = zip(*batch)
+                rows["ts"] = ts
+                rows["counts"] = np.stack(counts)
+                rows["best_dead_conf"] = best
+                rows["dead"] = dead
+                rows["state"] = state
+                rows = rows[np.argsort(rows["ts"], kind="stable")]
+                self._append_rows("raw", rows, "ts")
+
+            minutes = self._merge_open("minute", rollup_raw(rows, 60, self.n_classes), now, close_open)
+            if self.on_minute_rollup is not None and len(minutes):
+                # callback (upload DB, overwrite per bucket) harus dapat total bucket, bukan sisa setelah restart
+                self.on_minute_rollup(self._with_earlier_part(minutes), list(self.classes))
+            self._append_rows("minute", minutes, "bucket")
+
+            hours = self._merge_open("hour", rollup_rollups(minutes, 3600, self.n_classes), now, close_open)
+            self._append_rows("hour", hours, "bucket")
+
+            self._prune(now)
+            return minutes
+
+    def _prune(self, now: float):
+        today = time.strftime("%Y%m%d", time.gmtime(now))
+        if today == self._last_prune_day:
+            return
+        self._last_prune_day = today
+        for kind, keep_days in (("raw", self.cfg.HIST_RAW_KEEP_DAYS), ("minute", self.cfg.HIST_MINUTE_KEEP_DAYS)):
+            if keep_days <= 0:
+                continue
+            cutoff = time.strftime("%Y%m%d", time.gmtime(now - keep_days * 86400))
+            folder = os.path.join(self.root, kind)
+            for fn in os.listdir(folder):
+                if fn.endswith(".bin") and fn[:-4] < cutoff:
+                    try:
+                        os.remove(os.path.join(folder, fn))
+                        self._log(f"[HIST] pruned {kind}/{fn}")
+                    except OSError:
+                        pass
+
+    # ---------- query ----------
+    def _read(self, path: str, dtype: np.dtype) -> np.ndarray:
+        try:
+            n = os.path.getsize(path) // dtype.itemsize
+        except OSError:
+            n = 0
+        if n == 0:
+            return np.zeros(0, dtype=dtype)
+        return np.memmap(path, dtype=dtype, mode="r", shape=(n,))
+
+    def _files_between(self, kind: str, start_ts: float, end_ts: float) -> List[str]:
+        lo = os.path.basename(self._file(kind, start_ts))
+        hi = os.path.basename(self._file(kind, end_ts))
+        folder = os.path.join(self.root, kind)
+        if not os.path.isdir(folder):
+            return []
+        return [os.path.join(folder, fn) for fn in sorted(os.listdir(folder)) if lo <= fn <= hi]
+
+    def query(self, start_ts: float, end_ts: float, resolution: str = "auto") -> np.ndarray:
+        """
+        Return structured array untuk [start_ts, end_ts).
+        resolution: raw | minute | hour | auto (raw <= 6 jam, minute <= 14 hari, sisanya hour).
+        """
+        if resolution == "auto":
+            span = end_ts - start_ts
+            resolution = "raw" if span <= 6 * 3600 else ("minute" if span <= 14 * 86400 else "hour")
+
+        if resolution == "raw":
+            dtype, col = self.raw_dtype, "ts"
+        elif resolution in RESOLUTIONS:
+            dtype, col = self.rollup_dtype, "bucket"
+        else:
+            raise ValueError(f"unknown resolution: {resolution}")
+
+        # bucket rollup yang overlap dengan start_ts ikut diambil
+        period = RESOLUTIONS.get(resolution, 0)
+        parts = []
+        for path in self._files_between(resolution, start_ts - period, end_ts):
+            arr = self._read(path, dtype)
+            keys = arr[col]
+            lo, hi = np.searchsorted(keys, start_ts - period, "right"), np.searchsorted(keys, end_ts, "left")
+            if resolution == "raw":
+                lo = np.searchsorted(keys, start_ts, "left")
+            if hi > lo:
+                parts.append(np.array(arr[lo:hi]))
+
+        # bucket terbuka (belum ditulis) ikut dihitung
+        if resolution in RESOLUTIONS and self._open[resolution] is not None:
+            parts.append(self._open[resolution])
+
+        if not parts:
+            return np.zeros(0, dtype=dtype)
+        out = np.concatenate(parts)
+        if resolution == "raw":
+            return out
+        # merge bucket duplikat (restart di tengah menit/jam)
+        out = rollup_rollups(out, period, self.n_classes)
+        return out[(out["bucket"] + period > start_ts) & (out["bucket"] < end_ts)]
@@ -0,0 +1,235 @@
+# event_recorder.py
+import os
+import json
+import time
+import threading
+import queue
+from collections import deque
+from typing import Callable, Deque, List, Optional, Tuple
+
+import cv2
+
+from config import AppConfig
+
+
+# (ts, jpg_bytes, detections)
+RingItem = Tuple[float, bytes, list]
+
+
+class EventRecorder:
+    """
+    Rekam klip pre/post-trigger saat status berubah ke MALNUTRISI.
+
+    - push() dipanggil dari thread video: sampling + resize/copy (buffer pemanggil dipakai ulang)
+      + put_nowait (tidak pernah blocking).
+    - Thread encoder: JPEG encode, simpan di ring buffer (dibatasi detik & MB).
+    - trigger(): ambil isi ring sebagai pre-roll, kumpulkan post-roll, lalu serahkan
+      ke thread writer yang menulis klip (.mjpeg/.avi/.mp4) + sidecar deteksi (.jsonl).
+    """
+    def __init__(self, cfg: AppConfig, log: Optional[Callable[[str], None]] = None):
+        self.cfg = cfg
+        self._log = log or (lambda msg: None)
+
+        self.pre_sec = float(cfg.REC_PRE_SEC)
+        self.post_sec = float(cfg.REC_POST_SEC)
+        self.fps = max(1.0, float(cfg.REC_FPS))
+        self.max_bytes = int(cfg.REC_MAX_MB) * 1024 * 1024
+
+        self.in_q: "queue.Queue[tuple[float, object, list]]" = queue.Queue(maxsize=2)
+        self.write_q: "queue.Queue[dict]" = queue.Queue(maxsize=2)
+
+        self.ring: Deque[RingItem] = deque()
+        self.ring_bytes = 0
+
+        self._next_sample_ts = 0.0
+        self._lock = threading.Lock()
+        self._pending_triggers: List[dict] = []
+        self._event: Optional[dict] = None
+
+        self.dropped_frames = 0
+        self.stop_event = threading.Event()
+        self.threads: List[threading.Thread] = []
+
+    def start(self):
+        os.makedirs(self.cfg.REC_DIR, exist_ok=True)
+        for target in (self._encode_loop, self._write_loop):
+            t = threading.Thread(target=target, daemon=True)
+            t.start()
+            self.threads.append(t)
+
+    def stop(self, timeout: float = 10.0):
+        # flush event yang sedang berjalan (post-roll dipotong)
+        with self._lock:
+            ev, self._event = self._event, None
+        if ev is not None:
+            self._hand_off(ev)
+        self.stop_event.set()
+        # thread daemon: tanpa join, klip terakhir bisa terpotong saat proses keluar
+        deadline = time.monotonic() + timeout
+        for t in self.threads:
+            t.join(timeout=max(0.0, deadline - time.monotonic()))
+        if any(t.is_alive() for t in self.threads):
+            self._log(f"[REC] writer belum selesai setelah {timeout}s, klip terakhir mungkin terpotong")
+
+    # ---------- API thread video ----------
+    def push(self, frame_bgr, detections: list, ts: Optional[float] = None) -> bool:
+        """Frame di-resize/copy di sini, jadi pemanggil boleh langsung memakai ulang buffernya."""
+        ts = time.time() if ts is None else ts
+        if ts < self._next_sample_ts:
+            return False
+        self._next_sample_ts = ts + (1.0 / self.fps)
+        if self.in_q.full():
+            self.dropped_frames += 1
+            return False
+        try:
+            self.in_q.put_nowait((ts, self._shrink(frame_bgr), detections))
+            return True
+        except queue.Full:
+            self.dropped_frames += 1
+            return False
+
+    def trigger(self, reason: str, meta: Optional[dict] = None):
+        with self._lock:
+            self._pending_triggers.append({
+                "reason": reason,
+                "trigger_ts": time.time(),
+                "meta": meta or {},
+            })
+
+    def _shrink(self, frame_bgr):
+        h, w = frame_bgr.shape[:2]
+        max_w = int(self.cfg.REC_MAX_WIDTH)
+        if max_w > 0 and w > max_w:
+            return cv2.resize(frame_bgr, (max_w, int(h * max_w / w)), interpolation=cv2.INTER_AREA)
+        return frame_bgr.copy()
+
+    # ---------- Encoder thread ----------
+    def _encode(self, frame_bgr) -> Optional[bytes]:
+        ok, buf = cv2.imencode(".jpg", frame_bgr, [int(cv2.IMWRITE_JPEG_QUALITY), int(self.cfg.REC_JPEG_QUALITY)])
+        return buf.tobytes() if ok else None
+
+    def _trim_ring(self, now: float):
+        while self.ring and (self.ring[0][0] < now - self.pre_sec or self.ring_bytes > self.max_bytes):
+            _, jpg, _ = self.ring.popleft()
+            self.ring_bytes -= len(jpg)
+
+    def _start_pending_triggers(self):
+        with self._lock:
+            pending, self._pending_triggers = self._pending_triggers, []
+            for trig in pending:
+                end_ts = trig["trigger_ts"] + self.post_sec
+                if self._event is not None:
+                    # trigger beruntun -> perpanjang klip yang sama
+                    self._event["end_ts"] = max(self._event["end_ts"], end_ts)
+                    continue
+                self._event = {
+                    **trig,
+                    "end_ts": end_ts,
+                    "frames": list(self.ring),
+                    "bytes": self.ring_bytes,
+                }
+
+    def _encode_loop(self):
+        while not self.stop_event.is_set():
+            self._start_pending_triggers()
+            try:
+                ts, frame_bgr, detections = self.in_q.get(timeout=0.5)
+            except queue.Empty:
+                self._finish_event_if_due(time.time())
+                continue
+
+            jpg = self._encode(frame_bgr)
+            if jpg is None:
+                continue
+
+            item = (ts, jpg, detections)
+            self.ring.append(item)
+            self.ring_bytes += len(jpg)
+            self._trim_ring(ts)
+
+            with self._lock:
+                ev = self._event
+                if ev is not None and ts <= ev["end_ts"] and ev["bytes"] < self.max_bytes:
+                    ev["frames"].append(item)
+                    ev["bytes"] += len(jpg)
+            self._finish_event_if_due(ts)
+
+    def _finish_event_if_due(self, now: float):
+        with self._lock:
+            ev = self._event
+            if ev is None or (now < ev["end_ts"] and ev["bytes"] < self.max_bytes):
+                return
+            self._event = None
+        self._hand_off(ev)
+
+    def _hand_off(self, ev: dict):
+        try:
+            self.write_q.put_nowait(ev)
+        except queue.Full:
+            self._log(f"[REC] writer busy, drop clip ({ev['reason']})")
+
+    # ---------- Writer thread ----------
+    def _write_loop(self):
+        while not (self.stop_event.is_set() and self.write_q.empty()):
+            try:
+                ev = self.write_q.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            try:
+                path = self._write_clip(ev)
+                self._log(f"[REC] clip saved: {path} ({len(ev['frames'])} frames)")
+            except Exception as e:
+                self._log(f"[REC] ERROR write clip: {e}")
+            finally:
+                self.write_q.task_done()
+
+    def _write_clip(self, ev: dict) -> str:
+        t0 = ev["trigger_ts"]
+        day_dir = os.path.join(self.cfg.REC_DIR, time.strftime("%Y%m%d", time.localtime(t0)))
+        os.makedirs(day_dir, exist_ok=True)
+        stem = os.path.join(
+            day_dir,
+            f"dev{self.cfg.DEVICE_ID}_{time.strftime('%H%M%S', time.localtime(t0))}_{ev['reason']}",
+        )
+        frames: List[RingItem] = ev["frames"]
+        fmt = self.cfg.REC_FORMAT.lower()
+
+        if fmt == "mjpeg":
+            # JPEG berurutan = stream MJPEG (ffplay -f mjpeg / VLC), tanpa re-encode
+            path = stem + ".mjpeg"
+            with open(path, "wb") as f:
+                for _, jpg, _ in frames:
+                    f.write(jpg)
+        else:
+            import numpy as np
+
+            path = stem + (".mp4" if fmt == "mp4" else ".avi")
+            fourcc = cv2.VideoWriter_fourcc(*("mp4v" if fmt == "mp4" else "MJPG"))
+            writer = None
+            try:
+                for _, jpg, _ in frames:
+                    img = cv2.imdecode(np.frombuffer(jpg, dtype=np.uint8), cv2.IMREAD_COLOR)
+                    if img is None:
+                        continue
+                    if writer is None:
+                        h, w = img.shape[:2]
+                        writer = cv2.VideoWriter(path, fourcc, self.fps, (w, h))
+                    writer.write(img)
+            finally:
+                if writer is not None:
+                    writer.release()
+
+        with open(stem + ".jsonl", "w", encoding="utf-8") as f:
+            f.write(json.dumps({
+                "reason": ev["reason"],
+                "device_id": self.cfg.DEVICE_ID,
+                "trigger_ts": t0,
+                "fps": self.fps,
+                "pre_sec": self.pre_sec,
+                "post_sec": self.post_sec,
+                "clip": os.path.basename(path),
+                "meta": ev["meta"],
+            }) + "\n")
+            for i, (ts, _, dets) in enumerate(frames):
+                f.write(json.dumps({"i": i, "ts": round(ts, 3), "detections": dets}) + "\n")
+        return path
@@ -0,0 +1,204 @@
+# frame_bus.py
+"""
+Frame bus shared memory: 1 publisher (VideoWorker) -> banyak subscriber (proses lain),
+tanpa membuka kamera lagi (CSI/Argus hanya bisa dibuka satu proses).
+
+Layout block:
+  header (64 B) : magic, version, n_slots, slot_bytes, max_h, max_w, max_c, latest_seq
+  slot[i]       : slot header (32 B: lock, ts, h, w, c) + data (slot_bytes)
+
+Sinkronisasi lock-free per slot (seqlock), single writer:
+  writer  : lock = 2*seq+1 (sedang ditulis) -> copy data -> lock = 2*seq -> latest_seq = seq
+  reader  : baca lock -> copy data -> baca lock lagi; valid kalau sama & genap.
+Reader tidak pernah memblok writer; reader yang kalah cepat cukup retry / ambil frame terbaru.
+
+Monitor cepat:
+  python frame_bus.py --name aikentang_frames
+"""
+import time
+import argparse
+from multiprocessing import shared_memory
+from typing import Optional, Tuple
+
+import numpy as np
+
+MAGIC = 0x4B4E5442  # "BTNK"
+VERSION = 1
+HEADER_BYTES = 64
+SLOT_HEADER_BYTES = 32
+
+_HEADER_DTYPE = np.dtype([
+    ("magic", "<u4"), ("version", "<u4"), ("n_slots", "<u4"), ("pad", "<u4"),
+    ("slot_bytes", "<u8"), ("max_h", "<u4"), ("max_w", "<u4"), ("max_c", "<u4"), ("pad2", "<u4"),
+    ("latest_seq", "<u8"),
+])
+_SLOT_DTYPE = np.dtype([
+    ("lock", "<u8"), ("ts", "<f8"), ("h", "<u4"), ("w", "<u4"), ("c", "<u4"), ("pad", "<u4"),
+])
+
+# (seq, ts, frame)
+FrameItem = Tuple[int, float, np.ndarray]
+
+
+def _views(buf, n_slots: int, slot_bytes: int):
+    header = np.ndarray((), dtype=_HEADER_DTYPE, buffer=buf, offset=0)
+    slots, datas = [], []
+    for i in range(n_slots):
+        off = HEADER_BYTES + i * (SLOT_HEADER_BYTES + slot_bytes)
+        slots.append(np.ndarray((), dtype=_SLOT_DTYPE, buffer=buf, offset=off))
+        datas.append(np.ndarray((slot_bytes,), dtype=np.uint8, buffer=buf, offset=off + SLOT_HEADER_BYTES))
+    return header, slots, datas
+
+
+class FrameBusPublisher:
+    def __init__(self, name: str, max_shape: Tuple[int, int, int], n_slots: int = 4):
+        h, w, c = max_shape
+        self.name = name
+        self.n_slots = max(2, int(n_slots))
+        self.slot_bytes = int(h * w * c)
+        size = HEADER_BYTES + self.n_slots * (SLOT_HEADER_BYTES + self.slot_bytes)
+
+        try:
+            stale = shared_memory.SharedMemory(name=name)
+            stale.close()
+            stale.unlink()
+        except FileNotFoundError:
+            pass
+        self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+
+        self.header, self.slots, self.datas = _views(self.shm.buf, self.n_slots, self.slot_bytes)
+        self.header["magic"] = MAGIC
+        self.header["version"] = VERSION
+        self.header["n_slots"] = self.n_slots
+        self.header["slot_bytes"] = self.slot_bytes
+        self.header["max_h"], self.header["max_w"], self.header["max_c"] = h, w, c
+        self.header["latest_seq"] = 0
+        self.seq = 0
+
+    def fits(self, frame: np.ndarray) -> bool:
+        return frame.nbytes <= self.slot_bytes and frame.dtype == np.uint8
+
+    def publish(self, frame: np.ndarray, ts: Optional[float] = None) -> int:
+        seq = self.seq + 1
+        i = seq % self.n_slots
+        slot = self.slots[i]
+        h, w = frame.shape[:2]
+        c = frame.shape[2] if frame.ndim == 3 else 1
+
+        slot["lock"] = 2 * seq + 1
+        dst = self.datas[i][: frame.nbytes].reshape(frame.shape)
+        np.copyto(dst, frame)
+        slot["ts"] = time.time() if ts is None else ts
+        slot["h"], slot["w"], slot["c"] = h, w, c
+        slot["lock"] = 2 * seq
+        self.header["latest_seq"] = seq
+        self.seq = seq
+        return seq
+
+    def close(self):
+        # lepas view numpy dulu, kalau tidak close() gagal (exported pointers)
+        self.header = self.slots = self.datas = None
+        try:
+            self.shm.close()
+            self.shm.unlink()
+        except Exception:
+            pass
+
+
+class FrameBusSubscriber:
+    def __init__(self, name: str):
+        self.shm = shared_memory.SharedMemory(name=name)
+        try:
+            # block milik publisher; jangan ikut di-unlink resource_tracker proses ini
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(self.shm._name, "shared_memory")
+        except Exception:
+            pass
+        header = np.ndarray((), dtype=_HEADER_DTYPE, buffer=self.shm.buf, offset=0)
+        if int(header["magic"]) != MAGIC or int(header["version"]) != VERSION:
+            raise RuntimeError(f"frame bus '{name}' tidak valid (magic/version)")
+        self.n_slots = int(header["n_slots"])
+        self.slot_bytes = int(header["slot_bytes"])
+        self.header, self.slots, self.datas = _views(self.shm.buf, self.n_slots, self.slot_bytes)
+
+    @property
+    def latest_seq(self) -> int:
+        return int(self.header["latest_seq"])
+
+    def read(self, seq: int, copy: bool = True) -> Optional[FrameItem]:
+        """
+        Ambil frame `seq` kalau masih ada di ring. copy=False -> view zero-copy;
+        panggil is_valid(seq) setelah selesai memakai view untuk memastikan tidak tertimpa.
+        """
+        slot = self.slots[seq % self.n_slots]
+        lock1 = int(slot["lock"])
+        if lock1 != 2 * seq:
+            return None
+        h, w, c = int(slot["h"]), int(slot["w"]), int(slot["c"])
+        ts = float(slot["ts"])
+        shape = (h, w, c) if c > 1 else (h, w)
+        view = self.datas[seq % self.n_slots][: h * w * c].reshape(shape)
+        frame = view.copy() if copy else view
+        if int(slot["lock"]) != lock1:
+            return None
+        return seq, ts, frame
+
+    def is_valid(self, seq: int) -> bool:
+        return int(self.slots[seq % self.n_slots]["lock"]) == 2 * seq
+
+    def read_latest(self, copy: bool = True, retries: int = 3) -> Optional[FrameItem]:
+        for _ in range(retries):
+            seq = self.latest_seq
+            if seq == 0:
+                return None
+            item = self.read(seq, copy=copy)
+            if item is not None:
+                return item
+        return None
+
+    def wait_next(self, last_seq: int, timeout: float = 1.0, poll_sec: float = 0.001,
+                  copy: bool = True) -> Optional[FrameItem]:
+        """Tunggu frame lebih baru dari last_seq (frame yang terlewat di-skip, ambil terbaru)."""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.latest_seq > last_seq:
+                item = self.read_latest(copy=copy)
+                if item is not None:
+                    return item
+            time.sleep(poll_sec)
+        return None
+
+    def close(self):
+        self.header = self.slots = self.datas = None
+        try:
+            self.shm.close()
+        except Exception:
+            pass
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Monitor frame bus (fps + latency)")
+    ap.add_argument("--name", default="aikentang_frames")
+    ap.add_argument("--seconds", type=float, default=10)
+    args = ap.parse_args()
+
+    sub = FrameBusSubscriber(args.name)
+    last, n, lat, dropped = sub.latest_seq, 0, 0.0, 0
+    t0 = time.monotonic()
+    while time.monotonic() - t0 < args.seconds:
+        item = sub.wait_next(last)
+        if item is None:
+            continue
+        seq, ts, frame = item
+        dropped += max(0, seq - last - 1) if last else 0
+        last, n, lat = seq, n + 1, lat + (time.time() - ts)
+    elapsed = time.monotonic() - t0
+    if n:
+        print(f"{n / elapsed:.1f} fps, avg latency {lat / n * 1000:.2f}ms, skipped {dropped}, last shape {frame.shape}")
+    else:
+        print("no frames")
+    sub.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+# frame_pool.py
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+
+class FramePool:
+    """
+    Ring buffer array yang dialokasikan sekali per (shape, dtype) lalu dipakai bergiliran.
+
+    Buffer ke-i dipakai ulang setelah `size` kali next(); konsumen yang memegang referensi
+    (UI, stream, dst.) harus selesai sebelum itu -> pilih size > jumlah konsumen in-flight.
+    """
+    def __init__(self, size: int = 4):
+        self.size = max(2, int(size))
+        self._rings: Dict[Tuple, List[np.ndarray]] = {}
+        self._idx: Dict[Tuple, int] = {}
+
+    def next(self, shape, dtype=np.uint8) -> np.ndarray:
+        key = (tuple(shape), np.dtype(dtype).str)
+        ring = self._rings.get(key)
+        if ring is None:
+            # resolusi berubah (kamera re-open) -> buang ring lama supaya memori tetap terbatas
+            self._rings.clear()
+            self._idx.clear()
+            ring = [np.empty(shape, dtype=dtype) for _ in range(self.size)]
+            self._rings[key] = ring
+            self._idx[key] = 0
+        i = self._idx[key]
+        self._idx[key] = (i + 1) % self.size
+        return ring[i]
+
+    @property
+    def nbytes(self) -> int:
+        return sum(a.nbytes for ring in self._rings.values() for a in ring)
@@ -0,0 +1,272 @@
+# gst_pipeline.py
+"""
+Builder pipeline GStreamer untuk capture (cv2.VideoCapture + CAP_GSTREAMER).
+
+Sumber:
+  csi   -> nvarguscamerasrc (Jetson): flip/crop/scale di nvvidconv (VIC), output BGRx tanpa videoconvert
+  v4l2  -> v4l2src (webcam USB, non-Jetson), opsional MJPEG (jpegdec)
+  file  -> filesrc + decodebin (replay rekaman untuk testing)
+  test  -> videotestsrc (tanpa kamera sama sekali)
+
+Format appsink:
+  BGR   -> kompatibel semua build OpenCV; di CSI butuh videoconvert (CPU)
+  BGRx  -> langsung dari nvvidconv (tanpa videoconvert); 4 kanal -> FramePreprocessor membuang alpha
+           setelah resize (di buffer kecil)
+
+Dual stream (tee):
+  appsink  <- ukuran model (PRE_MODEL_SIZE)
+  shmsink  <- ukuran display (DISPLAY_MAX_WIDTH), dibaca DualCapture lewat pipeline shmsrc kedua
+  (OpenCV hanya bisa menarik satu appsink per VideoCapture)
+
+Lihat semua varian:
+  python gst_pipeline.py
+  python gst_pipeline.py --check        # parse tiap varian dengan Gst.parse_launch (butuh PyGObject)
+
+Unit test string pipeline: python -m pytest tests/test_gst_pipeline.py
+"""
+import time
+import argparse
+from dataclasses import dataclass, replace
+from typing import List, Optional, Tuple
+
+import cv2
+
+SOURCES = ("csi", "v4l2", "file", "test")
+FORMATS = ("BGR", "BGRx")
+
+Size = Tuple[int, int]
+
+
+@dataclass(frozen=True)
+class CaptureSpec:
+    source: str = "csi"
+    width: int = 1920            # resolusi sensor / kamera
+    height: int = 1080
+    fps: int = 30
+    sensor_id: int = 0           # csi: nvarguscamerasrc sensor-id (multi kamera)
+    device: str = "/dev/video0"  # v4l2
+    path: str = ""               # file
+    mjpeg: bool = False          # v4l2: kamera kirim image/jpeg
+    flip_method: int = 0         # csi: flip-method nvvidconv (sudah termasuk mirror)
+    mirror: bool = False         # non-csi: videoflip horizontal-flip
+    crop: Optional[Tuple[int, int, int, int]] = None  # x,y,w,h di frame setelah flip/mirror
+    fmt: str = "BGR"
+    out_size: Optional[Size] = None      # ukuran appsink (None = ukuran setelah crop)
+    display_size: Optional[Size] = None  # dual stream: ukuran shmsink (None = single stream)
+    shm_path: str = "/tmp/aikentang_display"
+
+    @property
+    def dual(self) -> bool:
+        return self.display_size is not None
+
+
+def _even(v: int) -> int:
+    return max(2, int(v) // 2 * 2)
+
+
+def _caps(fmt: str, size: Optional[Size], nvmm: bool = False) -> str:
+    mem = "(memory:NVMM)" if nvmm else ""
+    caps = f"video/x-raw{mem}, format={fmt}"
+    if size is not None:
+        caps += f", width={_even(size[0])}, height={_even(size[1])}"
+    return caps
+
+
+def _appsink(name: str = "model") -> str:
+    return f"appsink name={name} drop=true max-buffers=1 sync=false"
+
+
+def _shmsink(spec: CaptureSpec) -> str:
+    w, h = spec.display_size
+    shm_size = _even(w) * _even(h) * 4 * 4  # 4 frame BGRx
+    return f"shmsink socket-path={spec.shm_path} shm-size={shm_size} wait-for-connection=false sync=false"
+
+
+def _queue() -> str:
+    return "queue max-size-buffers=1 leaky=downstream"
+
+
+def crop_geometry(spec: CaptureSpec) -> Tuple[int, int, int, int]:
+    """(x, y, w, h) crop yang sudah di-clamp; full frame kalau tidak ada crop (di koordinat setelah flip)."""
+    rotated = spec.source == "csi" and spec.flip_method in (1, 3, 5, 7)
+    w, h = (spec.height, spec.width) if rotated else (spec.width, spec.height)
+    if spec.crop is None:
+        return 0, 0, w, h
+    x, y, cw, ch = spec.crop
+    x, y = max(0, min(x, w - 2)), max(0, min(y, h - 2))
+    return x, y, max(2, min(cw, w - x)), max(2, min(ch, h - y))
+
+
+def _csi(spec: CaptureSpec) -> str:
+    src = (
+        f"nvarguscamerasrc sensor-id={spec.sensor_id} ! "
+        f"video/x-raw(memory:NVMM), width={spec.width}, height={spec.height}, "
+        f"framerate={spec.fps}/1, format=NV12"
+    )
+    # flip dulu (crop dinyatakan di frame setelah flip), lalu crop + scale di nvvidconv kedua
+    x, y, cw, ch = crop_geometry(spec)
+    flip = f"nvvidconv flip-method={spec.flip_method}"
+    if spec.crop is not None:
+        flip += f" ! {_caps('NV12', None, nvmm=True)} ! nvvidconv left={x} top={y} right={x + cw} bottom={y + ch}"
+
+    if spec.fmt == "BGRx":
+        def branch(size, sink):
+            return f"{_caps('BGRx', size)} ! {sink}"
+    else:
+        def branch(size, sink):
+            return f"{_caps('BGRx', size)} ! videoconvert ! {_caps('BGR', None)} ! {sink}"
+
+    if not spec.dual:
+        return f"{src} ! {flip} ! {branch(spec.out_size, _appsink())}"
+    return (
+        f"{src} ! {flip} ! {_caps('NV12', None, nvmm=True)} ! tee name=t "
+        f"t. ! {_queue()} ! nvvidconv ! {branch(spec.out_size, _appsink())} "
+        f"t. ! {_queue()} ! nvvidconv ! {_caps('BGRx', spec.display_size)} ! {_shmsink(spec)}"
+    )
+
+
+def _generic(spec: CaptureSpec) -> str:
+    if spec.source == "v4l2":
+        if spec.mjpeg:
+            src = (
+                f"v4l2src device={spec.device} ! image/jpeg, width={spec.width}, height={spec.height}, "
+                f"framerate={spec.fps}/1 ! jpegdec"
+            )
+        else:
+            src = f"v4l2src device={spec.device} ! video/x-raw, width={spec.width}, height={spec.height}, framerate={spec.fps}/1"
+    elif spec.source == "file":
+        src = f'filesrc location="{spec.path}" ! decodebin'
+    else:
+        src = f"videotestsrc is-live=true pattern=ball ! video/x-raw, width={spec.width}, height={spec.height}, framerate={spec.fps}/1"
+
+    chain = f"{src} ! videoconvert"
+    if spec.mirror:
+        chain += " ! videoflip method=horizontal-flip"
+    if spec.crop is not None:
+        x, y, cw, ch = crop_geometry(spec)
+        chain += f" ! videocrop left={x} top={y} right={spec.width - x - cw} bottom={spec.height - y - ch}"
+
+    if not spec.dual:
+        return f"{chain} ! videoscale ! {_caps(spec.fmt, spec.out_size)} ! {_appsink()}"
+    return (
+        f"{chain} ! tee name=t "
+        f"t. ! {_queue()} ! videoscale ! {_caps(spec.fmt, spec.out_size)} ! {_appsink()} "
+        f"t. ! {_queue()} ! videoscale ! videoconvert ! {_caps('BGRx', spec.display_size)} ! {_shmsink(spec)}"
+    )
+
+
+def build_pipeline(spec: CaptureSpec) -> str:
+    if spec.source not in SOURCES:
+        raise ValueError(f"source tidak dikenal: {spec.source} (pilih {SOURCES})")
+    if spec.fmt not in FORMATS:
+        raise ValueError(f"format tidak didukung: {spec.fmt} (pilih {FORMATS})")
+    if spec.source == "file" and not spec.path:
+        raise ValueError("source=file butuh path")
+    return _csi(spec) if spec.source == "csi" else _generic(spec)
+
+
+def build_shm_reader(spec: CaptureSpec) -> str:
+    """Pipeline pembaca stream display dari shmsink (companion DualCapture)."""
+    w, h = spec.display_size
+    return (
+        f"shmsrc socket-path={spec.shm_path} is-live=true do-timestamp=true ! "
+        f"video/x-raw, format=BGRx, width={_even(w)}, height={_even(h)}, framerate={spec.fps}/1 ! "
+        f"{_appsink('display')}"
+    )
+
+
+class DualCapture:
+    """
+    Dua VideoCapture: stream model (appsink pipeline utama) + stream display (shmsrc).
+    read() -> (ok, display); frame model terakhir ada di .model_frame.
+    Kalau stream display gagal, display = frame model (tetap jalan, resolusi lebih kecil).
+    """
+    def __init__(self, spec: CaptureSpec, main_cap, open_timeout: float = 3.0):
+        self.spec = spec
+        self.main = main_cap
+        self.display = None
+        self.model_frame = None
+        deadline = time.monotonic() + open_timeout
+        while time.monotonic() < deadline:
+            # socket shmsink baru ada setelah pipeline utama PLAYING (frame pertama)
+            self.main.grab()
+            cap = cv2.VideoCapture(build_shm_reader(spec), cv2.CAP_GSTREAMER)
+            if cap.isOpened():
+                self.display = cap
+                break
+            time.sleep(0.2)
+
+    def isOpened(self) -> bool:
+        return self.main.isOpened()
+
+    def read(self):
+        ok, model = self.main.read()
+        if not ok:
+            return False, None
+        self.model_frame = model
+        if self.display is not None:
+            ok_d, disp = self.display.read()
+            if ok_d and disp is not None:
+                return True, disp
+        return True, model
+
+    def release(self):
+        self.main.release()
+        if self.display is not None:
+            self.display.release()
+
+
+def open_capture(spec: CaptureSpec):
+    cap = cv2.VideoCapture(build_pipeline(spec), cv2.CAP_GSTREAMER)
+    if not cap.isOpened():
+        return None
+    return DualCapture(spec, cap) if spec.dual else cap
+
+
+# ===================== VARIAN (cek manual / CI) =====================
+def variants() -> List[Tuple[str, CaptureSpec]]:
+    base = CaptureSpec()
+    return [
+        ("csi BGR (legacy)", base),
+        ("csi BGRx mirror 640", replace(base, fmt="BGRx", flip_method=4, out_size=(640, 360))),
+        ("csi sensor1 crop", replace(base, sensor_id=1, fmt="BGRx", crop=(320, 180, 1280, 720), out_size=(640, 360))),
+        ("csi dual", replace(base, fmt="BGRx", flip_method=4, out_size=(640, 360), display_size=(960, 540))),
+        ("v4l2 yuyv", replace(base, source="v4l2", width=1280, height=720, mirror=True, out_size=(640, 360))),
+        ("v4l2 mjpeg dual", replace(base, source="v4l2", mjpeg=True, width=1280, height=720,
+                                    out_size=(640, 360), display_size=(960, 540))),
+        ("file", replace(base, source="file", path="recordings/sample.mp4", out_size=(640, 360))),
+        ("test crop", replace(base, source="test", width=1280, height=720, crop=(0, 0, 640, 480))),
+    ]
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Tampilkan / cek varian pipeline GStreamer capture")
+    ap.add_argument("--check", action="store_true", help="parse dengan Gst.parse_launch (PyGObject)")
+    args = ap.parse_args()
+
+    Gst = None
+    if args.check:
+        import gi
+        gi.require_version("Gst", "1.0")
+        from gi.repository import Gst
+        Gst.init(None)
+
+    failed = 0
+    for name, spec in variants():
+        pipelines = [build_pipeline(spec)] + ([build_shm_reader(spec)] if spec.dual else [])
+        print(f"== {name}")
+        for p in pipelines:
+            print("  " + p)
+            if Gst is not None:
+                try:
+                    Gst.parse_launch(p)
+                    print("  -> OK")
+                except Exception as e:  # elemen tidak ada di host ini (mis. nvarguscamerasrc di PC)
+                    failed += 1
+                    print(f"  -> GAGAL: {e}")
+    if failed:
+        print(f"{failed} pipeline gagal di-parse (elemen Jetson memang tidak ada di non-Jetson)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+# inference.py
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+
+class Detection(NamedTuple):
+    cls: int
+    name: str
+    conf: float
+    xyxy: Tuple[float, float, float, float]
+    confirmed: bool = True  # False = ditolak / belum dicek model konfirmasi (cascade)
+
+
+def results_to_detections(r0, names: Dict[int, str]) -> List[Detection]:
+    """Ultralytics Results -> list Detection (koordinat piksel frame input)."""
+    if r0.boxes is None or len(r0.boxes) == 0:
+        return []
+    cls_ids = r0.boxes.cls.cpu().numpy().astype(int)
+    confs = r0.boxes.conf.cpu().numpy()
+    xyxys = r0.boxes.xyxy.cpu().numpy()
+    return [
+        Detection(int(cid), names.get(int(cid), str(cid)), float(cf), tuple(float(v) for v in xyxy))
+        for cid, cf, xyxy in zip(cls_ids, confs, xyxys)
+    ]
+
+
+# default model.predict() ultralytics; parameter yang sama dengan ini tidak dikirim / tidak masuk key cache
+ULTRALYTICS_DEFAULTS = {"imgsz": 0, "conf": 0.25, "iou": 0.7, "max_det": 300, "half": False, "classes": []}
+
+
+def infer_params(cfg) -> Dict:
+    """
+    Parameter inferensi dari config (hanya yang beda dari default ultralytics).
+    Dict ini = backend.params -> ikut key result cache, dan dikirim ke inference server apa adanya.
+    classes berisi nama / id kelas; di-resolve ke id di sebelah model (predict_kwargs).
+    """
+    classes = [c.strip() for c in cfg.INFER_CLASSES.split(",") if c.strip()]
+    params = {
+        "imgsz": cfg.INFER_IMGSZ,
+        "conf": cfg.INFER_CONF,
+        "iou": cfg.INFER_IOU,
+        "max_det": cfg.INFER_MAX_DET,
+        "half": bool(cfg.INFER_HALF),
+        "classes": [int(c) if c.isdigit() else c for c in classes],
+    }
+    return {k: v for k, v in params.items() if v != ULTRALYTICS_DEFAULTS[k]}
+
+
+def predict_kwargs(params: Optional[Dict], names: Dict[int, str]) -> Dict:
+    """params (infer_params) -> kwargs model.predict(); nama kelas -> id sesuai model."""
+    kw = dict(params or {})
+    classes = kw.pop("classes", None)
+    if classes:
+        inv = {v: k for k, v in names.items()}
+        ids = []
+        for c in classes:
+            if isinstance(c, int):
+                ids.append(c)
+            elif c in inv:
+                ids.append(inv[c])
+            else:
+                raise ValueError(f"INFER_CLASSES: kelas '{c}' tidak ada di model ({names})")
+        kw["classes"] = ids
+    return kw
+
+
+class YoloBackend:
+    """
+    Backend in-process (1 instance YOLO).
+    Semua backend punya interface yang sama: .names, .path, predict(frame), predict_batch(frames).
+    params         -> parameter inferensi (infer_params), juga bagian key result cache
+    supports_imgsz -> predict(frame, imgsz=...) bisa menurunkan ukuran input (load_controller).
+    """
+    supports_imgsz = True
+
+    def __init__(self, model, path: str = "", params: Optional[Dict] = None):
+        self.model = model
+        self.path = path
+        self.params = dict(params or {})
+        self._kw = predict_kwargs(self.params, model.names)
+
+    @property
+    def names(self) -> Dict[int, str]:
+        return self.model.names
+
+    def predict(self, frame, imgsz: Optional[int] = None) -> List[Detection]:
+        kw = {**self._kw, "imgsz": imgsz} if imgsz else self._kw
+        results = self.model.predict(frame, verbose=False, **kw)
+        return results_to_detections(results[0], self.model.names)
+
+    def predict_batch(self, frames: Sequence) -> List[List[Detection]]:
+        if not frames:
+            return []
+        results = self.model.predict(list(frames), verbose=False, **self._kw)
+        return [results_to_detections(r, self.model.names) for r in results]
+
+
+def draw_label_box(img, xyxy, label, conf):
+    """
+    Rules:
+      - label == 'malnutrisi'  -> bounding box RED
+      - else                  -> bounding box GREEN
+
+    Font made bigger as requested.
+    """
+    import cv2  # lazy: Detection dipakai modul yang di-import main.py sebelum window tampil
+
+    x1, y1, x2, y2 = [int(v) for v in xyxy]
+
+    # colors (BGR)
+    if label.lower() == "malnutrisi":
+        color = (0, 0, 255)   # red
+    else:
+        color = (0, 255, 0)   # green
+
+    # thicker box
+    box_thickness = 4
+    cv2.rectangle(img, (x1, y1), (x2, y2), color, box_thickness)
+
+    # bigger font
+    font = cv2.FONT_HERSHEY_SIMPLEX
+    font_scale = 1.2
+    text_thickness = 3
+
+    text = f"{label.upper()} {conf:.2f}"
+    (tw, th), baseline = cv2.getTextSize(text, font, font_scale, text_thickness)
+
+    # label background box
+    pad_x, pad_y = 8, 6
+    y_text_top = max(0, y1 - th - baseline - (pad_y * 2))
+    x_text_left = max(0, x1)
+
+    cv2.rectangle(
+        img,
+        (x_text_left, y_text_top),
+        (x_text_left + tw + (pad_x * 2), y_text_top + th + baseline + (pad_y * 2)),
+        color,
+        -1,
+    )
+
+    # text in black for contrast
+    cv2.putText(
+        img,
+        text,
+        (x_text_left + pad_x, y_text_top + th + pad_y),
+        font,
+        font_scale,
+        (0, 0, 0),
+        text_thickness,
+        cv2.LINE_AA,
+    )
+
+
+def overlay_label(det: Detection, dead_class_name: str) -> str:
+    """Kelas dead -> 'malnutrisi' (merah); dead yang tidak terkonfirmasi cascade -> 'dead?' (hijau)."""
+    if det.name != dead_class_name:
+        return det.name
+    return "malnutrisi" if det.confirmed else f"{det.name}?"
+
+
+def draw_detections(img, dets: Sequence[Detection], dead_class_name: str):
+    """Gambar semua box; kelas dead ditampilkan sebagai 'malnutrisi' (merah)."""
+    for d in dets:
+        draw_label_box(img, d.xyxy, overlay_label(d, dead_class_name), d.conf)
+    return img
+
+
+def load_backend(path: str, params: Optional[Dict] = None) -> YoloBackend:
+    from ultralytics import YOLO
+
+    return YoloBackend(YOLO(path), path, params)
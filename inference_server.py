@@ -0,0 +1,287 @@
+# inference_server.py
+"""
+Server inferensi lokal: model YOLO di-load sekali di worker process, dipakai bersama
+oleh banyak frontend (GUI, daemon headless, batch tools) di satu mesin.
+
+Transport:
+  - frame  -> shared memory milik client (worker attach by name, zero-copy read)
+  - kontrol + hasil deteksi -> multiprocessing.managers (TCP localhost / UNIX socket)
+
+Jalankan server:
+  python inference_server.py --workers 2 --preload model_1.pt model_2.pt
+
+Client:
+  client = InferenceClient(cfg.INFER_SERVER_ADDR, cfg.INFER_SERVER_AUTHKEY)
+  backend = RemoteBackend(client, "model_1.pt")
+  dets = backend.predict(frame_bgr)
+"""
+import os
+import sys
+import time
+import argparse
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from multiprocessing.managers import BaseManager
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+from config import AppConfig
+from inference import Detection
+
+Address = Union[str, Tuple[str, int]]
+
+# (cls, name, conf, x1, y1, x2, y2) -> ringkas untuk di-pickle
+DetTuple = Tuple[int, str, float, float, float, float, float]
+
+
+def parse_address(addr: str) -> Address:
+    """'127.0.0.1:50555' -> (host, port); selain itu dianggap path UNIX socket."""
+    if ":" in addr and not addr.startswith("/"):
+        host, port = addr.rsplit(":", 1)
+        return host or "127.0.0.1", int(port)
+    return addr
+
+
+# key bawaan hanya untuk UNIX socket / loopback; alamat lain wajib INFER_SERVER_AUTHKEY sendiri
+LOCAL_AUTHKEY = "aikentang"
+
+
+def is_local_address(address: Address) -> bool:
+    if isinstance(address, str):
+        return True
+    host = address[0]
+    return host == "localhost" or host == "::1" or host.startswith("127.")
+
+
+def resolve_authkey(address: Address, authkey: str) -> bytes:
+    """
+    multiprocessing.managers meng-unpickle pesan -> key yang bisa ditebak = remote code execution.
+    Alamat non-lokal tanpa key (atau dengan key bawaan) ditolak.
+    """
+    if not is_local_address(address) and authkey in ("", LOCAL_AUTHKEY):
+        raise ValueError(
+            f"INFER_SERVER_AUTHKEY wajib di-set (bukan key bawaan) untuk alamat non-lokal {address}"
+        )
+    return (authkey or LOCAL_AUTHKEY).encode()
+
+
+# ===================== WORKER PROCESS =====================
+_MODELS: Dict[str, object] = {}
+_SHM: "OrderedDict[str, shared_memory.SharedMemory]" = OrderedDict()
+_SHM_CACHE_MAX = 16
+
+
+def _worker_init(torch_threads: int):
+    if torch_threads > 0:
+        try:
+            import torch
+            torch.set_num_threads(torch_threads)
+        except Exception:
+            pass
+
+
+def _get_model(path: str):
+    model = _MODELS.get(path)
+    if model is None:
+        from ultralytics import YOLO
+        model = YOLO(path)
+        _MODELS[path] = model
+    return model
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    shm = _SHM.get(name)
+    if shm is not None:
+        _SHM.move_to_end(name)
+        return shm
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        # block dimiliki client; jangan sampai resource_tracker worker ikut unlink
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister(shm._name, "shared_memory")
+    except Exception:
+        pass
+    _SHM[name] = shm
+    while len(_SHM) > _SHM_CACHE_MAX:
+        _, old = _SHM.popitem(last=False)
+        old.close()
+    return shm
+
+
+def _job_names(model_path: str) -> Dict[int, str]:
+    return dict(_get_model(model_path).names)
+
+
+def _job_predict(shm_name: str, shape: Tuple[int, ...], dtype: str, model_path: str,
+                 params: Optional[Dict] = None) -> List[DetTuple]:
+    import numpy as np
+    from inference import predict_kwargs, results_to_detections
+
+    shm = _attach(shm_name)
+    frame = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+    model = _get_model(model_path)
+    results = model.predict(frame, verbose=False, **predict_kwargs(params, model.names))
+    return [(d.cls, d.name, d.conf, *d.xyxy) for d in results_to_detections(results[0], model.names)]
+
+
+# ===================== SERVER =====================
+class InferenceService:
+    """Object yang di-expose lewat manager; tiap koneksi client dilayani thread sendiri."""
+    def __init__(self, workers: int, torch_threads: int):
+        self.pool = ProcessPoolExecutor(
+            max_workers=workers, initializer=_worker_init, initargs=(torch_threads,),
+        )
+        self.workers = workers
+        self.served = 0
+        self._lock = threading.Lock()
+
+    def preload(self, model_path: str):
+        # load di semua worker (1 job names per worker, best effort)
+        futs = [self.pool.submit(_job_names, model_path) for _ in range(self.workers)]
+        return [f.result() for f in futs][0]
+
+    def names(self, model_path: str) -> Dict[int, str]:
+        return self.pool.submit(_job_names, model_path).result()
+
+    def predict(self, shm_name: str, shape: Tuple[int, ...], dtype: str, model_path: str,
+                params: Optional[Dict] = None) -> List[DetTuple]:
+        dets = self.pool.submit(_job_predict, shm_name, tuple(shape), dtype, model_path, params).result()
+        with self._lock:
+            self.served += 1
+        return dets
+
+    def stats(self) -> Dict[str, int]:
+        return {"workers": self.workers, "served": self.served}
+
+    def shutdown(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+
+class _ServerManager(BaseManager):
+    pass
+
+
+class InferenceServer:
+    def __init__(self, cfg: AppConfig, workers: int = 0):
+        self.cfg = cfg
+        self.workers = workers or cfg.INFER_SERVER_WORKERS
+        cpu = os.cpu_count() or 1
+        self.service = InferenceService(self.workers, max(1, cpu // self.workers))
+
+    def serve_forever(self, preload: Sequence[str] = ()):
+        for path in preload:
+            t0 = time.perf_counter()
+            self.service.preload(path)
+            print(f"[SRV] preloaded {path} ({(time.perf_counter() - t0) * 1000:.0f}ms)", flush=True)
+
+        address = parse_address(self.cfg.INFER_SERVER_ADDR)
+        if isinstance(address, str) and os.path.exists(address):
+            os.remove(address)
+
+        authkey = resolve_authkey(address, self.cfg.INFER_SERVER_AUTHKEY)
+        service = self.service
+        _ServerManager.register("get_service", callable=lambda: service)
+        manager = _ServerManager(address=address, authkey=authkey)
+        server = manager.get_server()
+        if isinstance(address, str):
+            os.chmod(address, 0o600)  # socket hanya untuk user yang sama
+        print(f"[SRV] listening on {self.cfg.INFER_SERVER_ADDR} (workers={self.workers})", flush=True)
+        try:
+            server.serve_forever()
+        finally:
+            service.shutdown()
+
+
+# ===================== CLIENT =====================
+class _ClientManager(BaseManager):
+    pass
+
+
+_ClientManager.register("get_service")
+
+
+class InferenceClient:
+    """
+    Client server inferensi. Satu client = satu block shared memory (di-resize otomatis).
+    Tidak thread-safe; pakai satu client per thread.
+    """
+    def __init__(self, address: str, authkey: str):
+        address = parse_address(address)
+        self.manager = _ClientManager(address=address, authkey=resolve_authkey(address, authkey))
+        self.manager.connect()
+        self.service = self.manager.get_service()
+        self.shm = None
+        self._names: Dict[str, Dict[int, str]] = {}
+
+    def _ensure_shm(self, nbytes: int):
+        if self.shm is not None and self.shm.size >= nbytes:
+            return
+        self.close_shm()
+        self.shm = shared_memory.SharedMemory(create=True, size=nbytes)
+
+    def names(self, model_path: str) -> Dict[int, str]:
+        if model_path not in self._names:
+            self._names[model_path] = self.service.names(model_path)
+        return self._names[model_path]
+
+    def predict(self, frame, model_path: str, params: Optional[Dict] = None) -> List[Detection]:
+        import numpy as np
+
+        self._ensure_shm(frame.nbytes)
+        view = np.ndarray(frame.shape, dtype=frame.dtype, buffer=self.shm.buf)
+        view[...] = frame
+        rows = self.service.predict(self.shm.name, frame.shape, frame.dtype.str, model_path, params or None)
+        return [Detection(c, n, cf, (x1, y1, x2, y2)) for c, n, cf, x1, y1, x2, y2 in rows]
+
+    def close_shm(self):
+        if self.shm is not None:
+            try:
+                self.shm.close()
+                self.shm.unlink()
+            except Exception:
+                pass
+            self.shm = None
+
+    def close(self):
+        self.close_shm()
+
+
+class RemoteBackend:
+    """Backend yang interface-nya sama dengan inference.YoloBackend, tapi model ada di server."""
+    supports_imgsz = True
+
+    def __init__(self, client: InferenceClient, path: str, params: Optional[Dict] = None):
+        self.client = client
+        self.path = path
+        self.params = dict(params or {})  # nama kelas di-resolve di worker server
+
+    @property
+    def names(self) -> Dict[int, str]:
+        return self.client.names(self.path)
+
+    def predict(self, frame, imgsz: Optional[int] = None) -> List[Detection]:
+        params = {**self.params, "imgsz": imgsz} if imgsz else self.params
+        return self.client.predict(frame, self.path, params)
+
+    def predict_batch(self, frames: Sequence) -> List[List[Detection]]:
+        return [self.client.predict(f, self.path, self.params) for f in frames]
+
+
+def main():
+    cfg = AppConfig()
+    ap = argparse.ArgumentParser(description="Server inferensi YOLO lokal (shared-memory frame transport)")
+    ap.add_argument("--workers", type=int, default=cfg.INFER_SERVER_WORKERS)
+    ap.add_argument("--preload", nargs="*", default=[], help="path model yang di-load saat start")
+    args = ap.parse_args()
+    if not cfg.INFER_SERVER_ADDR:
+        sys.exit("INFER_SERVER_ADDR belum di-set (contoh: 127.0.0.1:50555 atau /tmp/aikentang-infer.sock)")
+    try:
+        resolve_authkey(parse_address(cfg.INFER_SERVER_ADDR), cfg.INFER_SERVER_AUTHKEY)
+    except ValueError as e:
+        sys.exit(str(e))
+    InferenceServer(cfg, workers=args.workers).serve_forever(preload=args.preload)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,368 @@
+# io_service.py
+"""
+Satu event loop asyncio (thread sendiri) untuk semua I/O jaringan di sisi device:
+  - DB      : get_threshold / set_current (aiomysql pool kalau ada, selain itu db_client di executor)
+  - Telegram: sendPhoto (aiohttp kalau ada, selain itu requests di executor), antre + jeda TG_COOLDOWN_SEC (dibaca tiap kirim lewat cooldown_getter)
+  - Jadwal  : tugas periodik (mis. LiveConfig.poll_once tiap CFG_POLL_SEC)
+
+Thread video/inferensi hanya memanggil API submit (enqueue_photo, set_current, get_threshold, submit):
+tidak pernah menunggu jaringan. Hasil dikirim lewat callback on_done(result, error) yang dipanggil
+di thread loop -> callback harus singkat (log / assign atribut).
+
+Backpressure: maksimal IO_MAX_PENDING operasi antre/jalan; selebihnya submit() return False (di-drop).
+
+Driver (IO_DB_DRIVER / IO_HTTP_DRIVER): auto | aiomysql/aiohttp | thread.
+  thread = fungsi sinkron di ThreadPoolExecutor (IO_EXECUTOR_WORKERS); dipakai juga oleh FakeDb testkit.
+  DbPool bersama terpasang (db_client.use_pool, multi_device) -> DB selalu lewat executor + pool itu,
+  bukan pool aiomysql kedua, supaya total koneksi MySQL tetap DB_POOL_SIZE.
+
+Metrik: io.pending, io.submitted, io.dropped, io.errors, io.<nama>_ms, io.tg_queue, io.tg_sent, io.tg_failed
+"""
+import time
+import asyncio
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Deque, Dict, Hashable, Optional, Tuple
+
+import requests
+
+from config import AppConfig
+from db_client import SET_CURRENT_SQL, THRESHOLD_SQL, get_threshold, pool_active, set_current, threshold_from_row
+from metrics import METRICS
+
+try:
+    import aiomysql
+except ImportError:  # opsional
+    aiomysql = None
+
+try:
+    import aiohttp
+except ImportError:  # opsional
+    aiohttp = None
+
+Callback = Callable[[Any, Optional[BaseException]], None]
+
+
+class IoService:
+    """
+    Dipakai sebagai pengganti TelegramSender (enqueue_photo, dropped, queued()) sekaligus jalur DB
+    non-blocking untuk VideoWorker. Satu instance bisa dipakai banyak device (multi_device).
+    """
+    def __init__(self, cfg: AppConfig, log: Optional[Callable[[str], None]] = None,
+                 queue_size: int = 5, key_cooldown_sec: float = 0.0,
+                 cooldown_getter: Optional[Callable[[], float]] = None):
+        self.cfg = cfg
+        self._log = log or (lambda msg: None)
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.thread: Optional[threading.Thread] = None
+        self.executor = ThreadPoolExecutor(max(1, cfg.IO_EXECUTOR_WORKERS), thread_name_prefix="io")
+
+        self._aiomysql_ok = aiomysql is not None and cfg.IO_DB_DRIVER in ("auto", "aiomysql")
+        self.use_aiohttp = aiohttp is not None and cfg.IO_HTTP_DRIVER in ("auto", "aiohttp")
+        self._pool = None
+        self._session = None
+
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._tasks: set = set()
+        # setpoint per device: satu write berjalan, berikutnya menunggu (yang lebih baru menimpa)
+        self._sp_busy: set = set()
+        self._sp_next: Dict[int, tuple] = {}
+
+        # Telegram: antrean di loop, ukuran & rate limit per key sama seperti TelegramSender
+        self.queue_size = queue_size
+        self.key_cooldown_sec = key_cooldown_sec
+        self.cooldown_getter = cooldown_getter or (lambda: cfg.TG_COOLDOWN_SEC)
+        self.last_key_ts: Dict[Hashable, float] = {}
+        self.dropped: Dict[Hashable, int] = {}
+        self._tg_items: Deque[Tuple[bytes, str]] = deque()
+        self._tg_queued = 0
+        self._tg_wakeup: Optional[asyncio.Event] = None
+        self.last_send_ts = 0.0
+
+    @property
+    def use_aiomysql(self) -> bool:
+        # dicek tiap query: DbPool bersama bisa dipasang setelah service dibuat
+        return self._aiomysql_ok and not pool_active()
+
+    # ---------- lifecycle ----------
+    def start(self):
+        if self.thread is not None:
+            return
+        ready = threading.Event()
+        self.thread = threading.Thread(target=self._run, args=(ready,), name="io-loop", daemon=True)
+        self.thread.start()
+        ready.wait(timeout=5)
+        self._log(
+            f"[IO] event loop jalan (db={'aiomysql' if self.use_aiomysql else 'thread'}, "
+            f"http={'aiohttp' if self.use_aiohttp else 'thread'}, max_pending={self.cfg.IO_MAX_PENDING})"
+        )
+
+    def _run(self, ready: threading.Event):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.loop.set_default_executor(self.executor)
+        self._tg_wakeup = asyncio.Event()
+        self._spawn(self._telegram_loop(), "telegram")
+        ready.set()
+        try:
+            self.loop.run_forever()
+        finally:
+            self.loop.close()
+
+    def stop(self, timeout: float = 10.0):
+        """Tunggu operasi yang masih antre (maks timeout), lalu tutup pool/session dan loop."""
+        loop = self.loop
+        if loop is None or not loop.is_running():
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self._shutdown(timeout), loop).result(timeout + 5)
+        except Exception as e:
+            self._log(f"[IO] ERROR shutdown: {e}")
+        loop.call_soon_threadsafe(loop.stop)
+        self.thread.join(timeout=5)
+        self.executor.shutdown(wait=False)
+
+    async def _shutdown(self, timeout: float):
+        deadline = time.monotonic() + timeout
+        while (self._pending or self._tg_queued) and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        if self._pending or self._tg_queued:
+            self._log(f"[IO] stop: {self._pending} operasi + {self._tg_queued} foto dibuang")
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self._session is not None:
+            await self._session.close()
+        if self._pool is not None:
+            self._pool.close()
+            await self._pool.wait_closed()
+
+    # ---------- submit (thread mana saja, non-blocking) ----------
+    def submit(self, name: str, fn: Callable[..., Awaitable], *args, on_done: Optional[Callback] = None) -> bool:
+        """Jadwalkan coroutine fn(*args) di loop. False kalau service belum jalan / antrean penuh."""
+        loop = self.loop
+        if loop is None or not loop.is_running():
+            return False
+        with self._lock:
+            if self._pending >= self.cfg.IO_MAX_PENDING:
+                METRICS.inc("io.dropped")
+                return False
+            self._pending += 1
+            METRICS.set("io.pending", self._pending)
+        METRICS.inc("io.submitted")
+        loop.call_soon_threadsafe(self._spawn, self._call(name, fn, args, on_done), name)
+        return True
+
+    def submit_sync(self, name: str, fn: Callable, *args, on_done: Optional[Callback] = None) -> bool:
+        """Fungsi sinkron (blocking) dijalankan di executor loop."""
+        return self.submit(name, self._in_executor, fn, *args, on_done=on_done)
+
+    def every(self, name: str, seconds: float, fn: Callable[[], Any]) -> Optional[Future]:
+        """
+        Tugas periodik: fn() (sinkron -> executor) tiap `seconds`, langsung mulai.
+        Return Future; .cancel() (thread mana saja) menghentikan jadwal.
+        """
+        if self.loop is None:
+            return None
+        return asyncio.run_coroutine_threadsafe(self._every(name, seconds, fn), self.loop)
+
+    def queued(self) -> int:
+        return self._tg_queued
+
+    # ---------- DB ----------
+    def get_threshold(self, cfg: AppConfig, device_id: int, on_done: Optional[Callback] = None) -> bool:
+        if self.use_aiomysql:
+            return self.submit("db_threshold", self._aio_threshold, cfg, device_id, on_done=on_done)
+        # nama global dicari saat dipanggil -> FakeDb.installed() ikut menukar
+        return self.submit_sync("db_threshold", lambda: get_threshold(cfg, device_id), on_done=on_done)
+
+    def set_current(self, cfg: AppConfig, device_id: int, n: int, p: int, k: int,
+                    on_done: Optional[Callback] = None) -> bool:
+        """
+        Per device berurutan (seperti ActuatorDispatcher): dengan beberapa worker executor / pool aiomysql,
+        set current=0 dan recover sesudahnya tidak boleh selesai terbalik. Setpoint yang datang selagi
+        write berjalan menunggu; kalau ada yang lebih baru lagi, yang menunggu ditimpa (on_done-nya tidak dipanggil).
+        """
+        item = (cfg, n, p, k, on_done)
+        with self._lock:
+            if device_id in self._sp_busy:
+                if device_id in self._sp_next:
+                    METRICS.inc("io.setpoint_coalesced")
+                self._sp_next[device_id] = item
+                return True
+            self._sp_busy.add(device_id)
+        if not self.submit("db_set_current", self._setpoint_chain, device_id, item):
+            with self._lock:
+                self._sp_busy.discard(device_id)
+            return False
+        return True
+
+    async def _setpoint_chain(self, device_id: int, item: tuple):
+        while item is not None:
+            cfg, n, p, k, on_done = item
+            result, error = None, None
+            try:
+                if self.use_aiomysql:
+                    result = await self._aio_set_current(cfg, device_id, n, p, k)
+                else:
+                    result = await self._in_executor(lambda: set_current(cfg, device_id, n, p, k))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                error = e
+                METRICS.inc("io.errors")
+            if on_done is not None:
+                try:
+                    on_done(result, error)
+                except Exception as e:
+                    self._log(f"[IO] ERROR callback db_set_current: {e}")
+            elif error is not None:
+                self._log(f"[IO] ERROR db_set_current: {error}")
+            with self._lock:
+                item = self._sp_next.pop(device_id, None)
+                if item is None:
+                    self._sp_busy.discard(device_id)
+
+    async def _aio_pool(self, cfg: AppConfig):
+        if self._pool is None:
+            # dibuat saat query pertama (DB bisa belum siap saat boot); gagal -> dicoba lagi query berikutnya
+            self._pool = await aiomysql.create_pool(
+                host=cfg.DB_HOST, user=cfg.DB_USER, password=cfg.DB_PASS, db=cfg.DB_NAME, port=cfg.DB_PORT,
+                autocommit=True, cursorclass=aiomysql.DictCursor, minsize=0, maxsize=max(1, cfg.DB_POOL_SIZE),
+                pool_recycle=3600,
+            )
+        return self._pool
+
+    async def _aio_threshold(self, cfg: AppConfig, device_id: int) -> Dict[str, int]:
+        pool = await self._aio_pool(cfg)
+        async with pool.acquire() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute(THRESHOLD_SQL, (device_id,))
+                return threshold_from_row(await cur.fetchone())
+
+    async def _aio_set_current(self, cfg: AppConfig, device_id: int, n: int, p: int, k: int) -> int:
+        pool = await self._aio_pool(cfg)
+        async with pool.acquire() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute(SET_CURRENT_SQL, (n, p, k, device_id))
+                return cur.rowcount
+
+    # ---------- Telegram ----------
+    def enqueue_photo(self, jpg_bytes: bytes, caption: str, key: Optional[Hashable] = None) -> bool:
+        if not self.cfg.telegram_enabled() or self.loop is None:
+            return False
+        with self._lock:
+            limited = key is not None and self.key_cooldown_sec > 0
+            now = time.time()
+            if limited and now - self.last_key_ts.get(key, 0.0) < self.key_cooldown_sec:
+                self.dropped[key] = self.dropped.get(key, 0) + 1
+                return False
+            if self._tg_queued >= self.queue_size:
+                # antrean penuh: cooldown tidak distempel, foto berikutnya device ini tetap boleh masuk
+                if key is not None:
+                    self.dropped[key] = self.dropped.get(key, 0) + 1
+                return False
+            self._tg_queued += 1
+            if limited:
+                self.last_key_ts[key] = now
+        METRICS.set("io.tg_queue", self._tg_queued)
+        self.loop.call_soon_threadsafe(self._tg_push, jpg_bytes, caption)
+        return True
+
+    def _tg_push(self, jpg_bytes: bytes, caption: str):
+        self._tg_items.append((jpg_bytes, caption))
+        self._tg_wakeup.set()
+
+    async def _telegram_loop(self):
+        while True:
+            if not self._tg_items:
+                self._tg_wakeup.clear()
+                await self._tg_wakeup.wait()
+                continue
+            jpg_bytes, caption = self._tg_items.popleft()
+            wait = (self.last_send_ts + self.cooldown_getter()) - time.time()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            t0 = time.perf_counter()
+            try:
+                await self._send_photo(jpg_bytes, caption)
+                METRICS.inc("io.tg_sent")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                METRICS.inc("io.tg_failed")
+                self._log(f"[TG] ERROR sendPhoto: {e}")
+            finally:
+                self.last_send_ts = time.time()
+                METRICS.set("io.tg_ms", round((time.perf_counter() - t0) * 1000.0, 1))
+                with self._lock:
+                    self._tg_queued -= 1
+                METRICS.set("io.tg_queue", self._tg_queued)
+
+    async def _send_photo(self, jpg_bytes: bytes, caption: str):
+        url = f"{self.cfg.TG_API_BASE}/bot{self.cfg.TG_BOT_TOKEN}/sendPhoto"
+        if self.use_aiohttp:
+            if self._session is None:
+                self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=12))
+            form = aiohttp.FormData()
+            form.add_field("chat_id", self.cfg.TG_CHAT_ID)
+            form.add_field("caption", caption)
+            form.add_field("photo", jpg_bytes, filename="snapshot.jpg", content_type="image/jpeg")
+            async with self._session.post(url, data=form) as resp:
+                await resp.read()
+            return
+        await asyncio.get_running_loop().run_in_executor(None, lambda: requests.post(
+            url,
+            data={"chat_id": self.cfg.TG_CHAT_ID, "caption": caption},
+            files={"photo": ("snapshot.jpg", jpg_bytes, "image/jpeg")},
+            timeout=12,
+        ))
+
+    # ---------- internal (thread loop) ----------
+    def _spawn(self, coro, name: str):
+        task = self.loop.create_task(coro, name=name)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _in_executor(self, fn: Callable):
+        return await asyncio.get_running_loop().run_in_executor(None, fn)
+
+    async def _call(self, name: str, fn: Callable[..., Awaitable], args: tuple, on_done: Optional[Callback]):
+        t0 = time.perf_counter()
+        result, error = None, None
+        try:
+            result = await fn(*args)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            error = e
+            METRICS.inc("io.errors")
+        finally:
+            with self._lock:
+                self._pending -= 1
+            METRICS.set("io.pending", self._pending)
+            METRICS.set(f"io.{name}_ms", round((time.perf_counter() - t0) * 1000.0, 1))
+        if on_done is not None:
+            try:
+                on_done(result, error)
+            except Exception as e:
+                self._log(f"[IO] ERROR callback {name}: {e}")
+        elif error is not None:
+            self._log(f"[IO] ERROR {name}: {error}")
+
+    async def _every(self, name: str, seconds: float, fn: Callable[[], Any]):
+        loop = asyncio.get_running_loop()
+        task = asyncio.current_task()
+        self._tasks.add(task)  # ikut dibatalkan saat stop()
+        task.add_done_callback(self._tasks.discard)
+        while True:
+            t0 = time.perf_counter()
+            try:
+                await loop.run_in_executor(None, fn)
+            except Exception as e:
+                METRICS.inc("io.errors")
+                self._log(f"[IO] ERROR {name}: {e}")
+            METRICS.set(f"io.{name}_ms", round((time.perf_counter() - t0) * 1000.0, 1))
+            await asyncio.sleep(seconds)
@@ -0,0 +1,180 @@
+# live_config.py
+import os
+import json
+import threading
+import dataclasses
+from typing import Callable, Dict, Optional, Tuple
+
+from dotenv import dotenv_values
+
+from config import AppConfig, calibration_path, coerce_overrides
+from db_client import get_config_version, get_data_configuration
+
+
+# urutan prioritas naik: layer belakang menimpa layer depan.
+# Layer env hanya berisi key yang nilainya di .env BERUBAH sejak start (nilai .env saat start sudah ada di
+# base, di bawah kalibrasi): kalibrasi menang atas .env awal, edit .env saat runtime menang atas kalibrasi.
+LAYER_ORDER: Tuple[str, ...] = ("calibration", "env", "db")
+
+
+def load_calibration(cfg: AppConfig, model_path: str,
+                     log: Optional[Callable[[str], None]] = None) -> Dict[str, object]:
+    """
+    Override hasil calibrate.py untuk model ini ({} kalau nonaktif / file belum ada).
+    File dari versi model lain (fingerprint beda, mis. model di-training ulang) diabaikan.
+    """
+    log = log or (lambda msg: None)
+    if not cfg.CALIB_ENABLED:
+        return {}
+    path = calibration_path(cfg, model_path)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            doc = json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        log(f"[CFG] ERROR kalibrasi {path}: {e}")
+        return {}
+
+    from inference import infer_params
+    from result_cache import model_fingerprint
+
+    if doc.get("model_fp") and doc["model_fp"] != model_fingerprint(model_path):
+        log(f"[CFG] kalibrasi {path} untuk versi model lain -> diabaikan (jalankan calibrate.py ulang)")
+        return {}
+    if "infer_params" in doc and doc["infer_params"] != infer_params(cfg):
+        log(f"[CFG] WARNING kalibrasi {path} dibuat dengan INFER_* {doc['infer_params']}, "
+            f"sekarang {infer_params(cfg)}")
+    overrides = coerce_overrides(doc.get("overrides") or {})
+    note = "" if doc.get("feasible", True) else ", target alarm palsu tidak tercapai"
+    log(f"[CFG] kalibrasi {os.path.basename(path)} ({doc.get('created', '?')}, fps={doc.get('fps')}{note}): "
+        f"{overrides}")
+    return overrides
+
+
+class LiveConfig:
+    """
+    AppConfig yang bisa di-reload saat runtime.
+
+    - get() selalu return instance AppConfig (frozen) yang utuh; reload = swap referensi,
+      jadi worker tidak pernah melihat config setengah jadi.
+    - Sumber override:
+        calibration -> CALIB_DIR/<model>.json (calibrate.py), diganti tiap model di-load (use_calibration)
+        env -> file CFG_ENV_PATH (dicek via mtime); hanya key yang nilainya beda dari .env saat start
+        db  -> configurations.data_configuration $.device_configuration.detection
+               (dicek via (id, updated_at); JSON hanya diambil kalau versi berubah)
+    - Hanya field di config.LIVE_KEYS yang boleh berubah.
+    - threshold n/p/k ikut di-refresh dari JSON yang sama.
+    """
+    def __init__(self, base: AppConfig, log: Optional[Callable[[str], None]] = None):
+        self.base = base
+        self._log = log or (lambda msg: None)
+        self._cfg = base
+        self._layers: Dict[str, Dict[str, object]] = {name: {} for name in LAYER_ORDER}
+        self._lock = threading.Lock()
+
+        self.threshold: Optional[Dict[str, int]] = None
+        self._env_mtime: Optional[float] = None
+        self._env_baseline: Optional[Dict[str, Optional[str]]] = None  # isi .env saat poll pertama
+        self._db_version: Optional[Tuple[int, float]] = None
+
+        self.stop_event = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+        self._scheduled = None  # Future jadwal di IoService
+
+    def get(self) -> AppConfig:
+        return self._cfg
+
+    def set_layer(self, name: str, overrides: Dict[str, object]) -> bool:
+        """Ganti isi satu layer lalu rebuild config. Return True kalau config efektif berubah."""
+        with self._lock:
+            self._layers[name] = coerce_overrides(overrides)
+            merged: Dict[str, object] = {}
+            for layer in LAYER_ORDER:
+                merged.update(self._layers.get(layer, {}))
+            new_cfg = dataclasses.replace(self.base, **merged)
+            if new_cfg == self._cfg:
+                return False
+            changes = [
+                f"{f.name}={getattr(self._cfg, f.name)}->{getattr(new_cfg, f.name)}"
+                for f in dataclasses.fields(AppConfig)
+                if getattr(self._cfg, f.name) != getattr(new_cfg, f.name)
+            ]
+            self._cfg = new_cfg
+        self._log(f"[CFG] reload ({name}): {', '.join(changes)}")
+        return True
+
+    def use_calibration(self, model_path: str) -> bool:
+        """Ganti layer calibration ke model yang akan dipakai (panggil sebelum VideoWorker dibuat)."""
+        return self.set_layer("calibration", load_calibration(self.base, model_path, self._log))
+
+    # ---------- polling ----------
+    def start(self, io=None):
+        """io: IoService -> polling dijadwalkan di event loop I/O (tanpa thread sendiri)."""
+        if not self.base.CFG_LIVE_ENABLED:
+            return
+        if io is not None:
+            self._scheduled = io.every(f"cfg_poll_dev{self.base.DEVICE_ID}", float(self.base.CFG_POLL_SEC),
+                                       self._poll_logged)
+            if self._scheduled is not None:
+                return
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self._scheduled is not None:
+            self._scheduled.cancel()
+
+    def _run(self):
+        while True:
+            self._poll_logged()
+            if self.stop_event.wait(float(self.base.CFG_POLL_SEC)):
+                return
+
+    def _poll_logged(self):
+        try:
+            self.poll_once()
+        except Exception as e:
+            self._log(f"[CFG] ERROR poll: {e}")
+
+    def poll_once(self):
+        self._poll_env()
+        if self.base.DB_HOST:
+            self._poll_db()
+
+    def _poll_env(self):
+        path = self.base.CFG_ENV_PATH
+        try:
+            mtime = os.stat(path).st_mtime
+        except OSError:
+            return
+        if mtime == self._env_mtime:
+            return
+        self._env_mtime = mtime
+        values = dotenv_values(path)
+        if self._env_baseline is None:
+            # saat start, .env sudah ter-load lewat load_dotenv() -> sudah ada di base
+            self._env_baseline = dict(values)
+            return
+        # hanya yang benar-benar diedit; edit key lain (mis. token) tidak menimpa hasil kalibrasi
+        changed = {k: v for k, v in values.items() if self._env_baseline.get(k) != v}
+        self.set_layer("env", changed)
+
+    def _poll_db(self):
+        version = get_config_version(self.base, self.base.DEVICE_ID)
+        if version is None or version == self._db_version:
+            return
+
+        data = get_data_configuration(self.base, self.base.DEVICE_ID)
+        dev = data.get("device_configuration") or {}
+        self.set_layer("db", dev.get("detection") or {})
+
+        th = dev.get("threshold") or {}
+        if th:
+            threshold = {key: int(th.get(key) or 0) for key in ("n", "p", "k")}
+            if threshold != self.threshold:
+                self.threshold = threshold
+                self._log(f"[CFG] threshold refreshed: {threshold}")
+        # baru ditandai sudah dilihat setelah berhasil diterapkan; gagal fetch/parse -> dicoba lagi poll berikutnya
+        self._db_version = version
@@ -0,0 +1,242 @@
+# load_controller.py
+"""
+Degradasi bertahap saat inferensi tidak kejar target (thermal throttling Jetson, beban lain).
+
+Diukur: waktu proses per frame (setelah read() kamera s.d. frame dikirim ke UI), dirata-rata EWMA.
+  ewma > LOAD_TARGET_MS * LOAD_HIGH selama LOAD_DOWN_SEC -> turun satu level
+  ewma < LOAD_TARGET_MS * LOAD_LOW  selama LOAD_UP_SEC   -> naik satu level
+Setiap perubahan level menunggu LOAD_DOWN_SEC dulu (EWMA perlu waktu menyesuaikan).
+
+Level (kumulatif, urut dari yang paling murah kualitasnya):
+  1. imgsz inferensi turun (LOAD_IMGSZ_STEPS)       -- hanya backend dengan supports_imgsz
+  2. frame skip 1..LOAD_MAX_SKIP (inferensi tiap n+1 frame; frame lain pakai box terakhir)
+  3. model fallback lebih kecil (LOAD_FALLBACK_MODEL), di-load di background saat pertama dibutuhkan
+  4. batas FPS tampilan GUI/stream (LOAD_DISPLAY_FPS)
+Frame yang di-skip tidak dihitung ke dead_hits (bukan bukti baru).
+
+Metrik: load.level, load.ewma_ms, load.imgsz, load.skip, load.fallback, load.display_fps, load.changes
+(prefix mengikuti metrics_prefix worker).
+"""
+import copy
+import time
+import threading
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+import numpy as np
+
+from config import AppConfig
+from metrics import METRICS
+
+
+class LoadState(NamedTuple):
+    imgsz: Optional[int] = None        # None = default model
+    skip: int = 0                      # frame di-skip di antara dua inferensi
+    fallback: bool = False
+    display_fps: float = 0.0           # 0 = tanpa batas
+
+    def describe(self) -> str:
+        parts = [
+            f"imgsz={self.imgsz or 'default'}",
+            f"skip={self.skip}",
+            f"fallback={int(self.fallback)}",
+            f"display_fps={self.display_fps or 'max'}",
+        ]
+        return " ".join(parts)
+
+
+def _ints(value: str) -> List[int]:
+    return [int(v) for v in value.replace(" ", "").split(",") if v]
+
+
+def _floats(value: str) -> List[float]:
+    return [float(v) for v in value.replace(" ", "").split(",") if v]
+
+
+def build_ladder(cfg: AppConfig, supports_imgsz: bool, base_imgsz: int = 0) -> List[LoadState]:
+    state = LoadState()
+    ladder = [state]
+    if supports_imgsz:
+        # hanya langkah di bawah INFER_IMGSZ (kalau di-set); degradasi tidak boleh memperbesar input
+        for imgsz in [s for s in _ints(cfg.LOAD_IMGSZ_STEPS) if not base_imgsz or s < base_imgsz]:
+            state = state._replace(imgsz=imgsz)
+            ladder.append(state)
+    for skip in range(1, max(0, cfg.LOAD_MAX_SKIP) + 1):
+        state = state._replace(skip=skip)
+        ladder.append(state)
+    if cfg.LOAD_FALLBACK_MODEL:
+        state = state._replace(fallback=True)
+        ladder.append(state)
+    for fps in _floats(cfg.LOAD_DISPLAY_FPS):
+        state = state._replace(display_fps=fps)
+        ladder.append(state)
+    return ladder
+
+
+def make_fallback_backend(primary, path: str):
+    """Backend untuk model fallback, jenisnya mengikuti primary (remote/in-process, cascade tetap)."""
+    inner = getattr(primary, "primary", None)
+    if inner is not None:
+        # CascadeBackend: konfirmasi dead tetap jalan di atas model fallback
+        wrapped = copy.copy(primary)
+        wrapped.primary = make_fallback_backend(inner, path)
+        return wrapped
+    client = getattr(primary, "client", None)
+    if client is not None:
+        from inference_server import RemoteBackend
+
+        return RemoteBackend(client, path, getattr(primary, "params", None))
+    from inference import load_backend
+
+    return load_backend(path, getattr(primary, "params", None))
+
+
+class LoadController:
+    def __init__(self, cfg: AppConfig, backend, log: Optional[Callable[[str], None]] = None,
+                 metrics_prefix: str = "video"):
+        self.cfg = cfg
+        self.primary = backend
+        self.log = log or (lambda msg: None)
+        self.prefix = f"{metrics_prefix}.load"
+        # LOAD_ENABLED=0 -> satu level saja (tidak pernah berubah), worker tetap lewat controller
+        self.ladder = (
+            build_ladder(
+                cfg,
+                bool(getattr(backend, "supports_imgsz", False)),
+                int(getattr(backend, "params", {}).get("imgsz", 0)),
+            ) if cfg.LOAD_ENABLED
+            else [LoadState()]
+        )
+        self.level = 0
+        self.ewma_ms: Optional[float] = None
+
+        self._above_since: Optional[float] = None
+        self._below_since: Optional[float] = None
+        self._settle_until = 0.0
+        self._frame_idx = 0
+        self._last_display_ts = 0.0
+
+        self._fallback = None
+        self._fallback_loading = False
+        self._predict_kwargs: Dict[str, int] = {}
+        self._publish()
+
+    @property
+    def state(self) -> LoadState:
+        return self.ladder[self.level]
+
+    @property
+    def backend(self):
+        if self.state.fallback and self._fallback is not None:
+            return self._fallback
+        return self.primary
+
+    # ---------- dipanggil loop worker ----------
+    def predict(self, frame):
+        backend = self.backend
+        if self._predict_kwargs and getattr(backend, "supports_imgsz", False):
+            return backend.predict(frame, **self._predict_kwargs)
+        return backend.predict(frame)
+
+    @property
+    def pipelined(self) -> bool:
+        """Backend aktif punya submit() (WorkerPool): frame dikirim tanpa menunggu hasil."""
+        return hasattr(self.backend, "submit")
+
+    def submit(self, frame, tag):
+        backend = self.backend
+        if self._predict_kwargs and getattr(backend, "supports_imgsz", False):
+            return backend.submit(frame, tag, **self._predict_kwargs)
+        return backend.submit(frame, tag)
+
+    def should_infer(self) -> bool:
+        skip = self.state.skip
+        self._frame_idx += 1
+        return skip <= 0 or self._frame_idx % (skip + 1) == 1
+
+    def allow_display(self, now: float) -> bool:
+        fps = self.state.display_fps
+        if fps <= 0:
+            return True
+        if now - self._last_display_ts < 1.0 / fps:
+            return False
+        self._last_display_ts = now
+        return True
+
+    def observe(self, frame_ms: float, now: Optional[float] = None):
+        now = time.monotonic() if now is None else now
+        a = self.cfg.LOAD_EWMA_ALPHA
+        self.ewma_ms = frame_ms if self.ewma_ms is None else (1 - a) * self.ewma_ms + a * frame_ms
+        METRICS.set(f"{self.prefix}.ewma_ms", round(self.ewma_ms, 2))
+        if now < self._settle_until:
+            return
+
+        target = self.cfg.LOAD_TARGET_MS
+        if self.ewma_ms > target * self.cfg.LOAD_HIGH:
+            self._below_since = None
+            if self._above_since is None:
+                self._above_since = now
+            elif now - self._above_since >= self.cfg.LOAD_DOWN_SEC and self.level < len(self.ladder) - 1:
+                self._set_level(self.level + 1, now)
+        elif self.ewma_ms < target * self.cfg.LOAD_LOW:
+            self._above_since = None
+            if self._below_since is None:
+                self._below_since = now
+            elif now - self._below_since >= self.cfg.LOAD_UP_SEC and self.level > 0:
+                self._set_level(self.level - 1, now)
+        else:
+            self._above_since = self._below_since = None
+
+    # ---------- internal ----------
+    def _set_level(self, level: int, now: float):
+        direction = "turun" if level > self.level else "naik"
+        self.level = level
+        self._above_since = self._below_since = None
+        self._settle_until = now + self.cfg.LOAD_DOWN_SEC
+        if self.state.fallback and self._fallback is None:
+            self._load_fallback()
+        METRICS.inc(f"{self.prefix}.changes")
+        self._publish()
+        self.log(
+            f"[LOAD] {direction} ke level {level}/{len(self.ladder) - 1} (ewma={self.ewma_ms:.0f}ms, "
+            f"target={self.cfg.LOAD_TARGET_MS:.0f}ms): {self.state.describe()}"
+        )
+
+    def _publish(self):
+        s = self.state
+        self._predict_kwargs = {"imgsz": s.imgsz} if s.imgsz else {}
+        METRICS.set(f"{self.prefix}.level", self.level)
+        METRICS.set(f"{self.prefix}.imgsz", s.imgsz or 0)
+        METRICS.set(f"{self.prefix}.skip", s.skip)
+        METRICS.set(f"{self.prefix}.fallback", int(s.fallback and self._fallback is not None))
+        METRICS.set(f"{self.prefix}.display_fps", s.display_fps)
+
+    def _load_fallback(self):
+        if self._fallback_loading:
+            return
+        self._fallback_loading = True
+        path = self.cfg.LOAD_FALLBACK_MODEL
+
+        def run():
+            try:
+                t0 = time.perf_counter()
+                fb = make_fallback_backend(self.primary, path)
+                fb.predict(np.zeros((320, 320, 3), dtype=np.uint8))  # warm-up di sini, bukan di loop worker
+                self._fallback = fb
+                self._publish()
+                self.log(f"[LOAD] model fallback siap: {path} ({(time.perf_counter() - t0) * 1000:.0f}ms)")
+            except Exception as e:
+                # langkah fallback dibuang dari ladder; knob lain tetap jalan
+                self.log(f"[LOAD] ERROR load fallback {path}: {e}")
+                ladder = []
+                for s in self.ladder:
+                    s = s._replace(fallback=False)
+                    if not ladder or ladder[-1] != s:
+                        ladder.append(s)
+                current = self.state._replace(fallback=False)
+                self.ladder = ladder
+                self.level = ladder.index(current)
+                self._publish()
+            finally:
+                self._fallback_loading = False
+
+        threading.Thread(target=run, daemon=True).start()
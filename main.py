@@ -1,30 +1,104 @@
 # main.py
-import sys
 import time
+BOOT_T0 = time.perf_counter()
+
+import os
+import sys
+import json
+import signal
 from PyQt5 import QtWidgets, QtCore
 
 from config import AppConfig
 from ui_widgets import ResponsiveVideoLabel, StatusPanel
 from telegram_sender import TelegramSender
-from video_worker import VideoWorker, load_model_for_age
+from db_uploader import DetectionUploader
+from live_config import LiveConfig
+from io_service import IoService
+from actuator import ActuatorDispatcher
+from model_loader import ModelLoader
+from stream_server import StreamHub, StreamServer
+from memory_monitor import MemoryMonitor
+from metrics import METRICS
+
+# video_worker (cv2 / torch / ultralytics) sengaja TIDAK di-import di sini:
+# di-import oleh ModelLoader di background thread supaya window langsung tampil.
+# Modul yang di-import di atas juga tidak boleh menarik cv2 / numpy saat import.
 
 
 class MainWindow(QtWidgets.QWidget):
+    # log dari thread non-GUI (uploader, dsb.) -> diteruskan ke self.log di thread GUI
+    log_requested = QtCore.pyqtSignal(str)
+
     def __init__(self, cfg: AppConfig):
         super().__init__()
         self.cfg = cfg
         self.worker = None
+        self.loader = None
+        self.backends = {}  # path -> backend (sudah di-warm-up), supaya Start ulang tidak load lagi
+        self.closing = False  # closeEvent sudah jalan -> sinyal loader yang telat diabaikan
+        self.boot_bench = os.getenv("BOOT_BENCH", "") == "1"
+        self.log_requested.connect(self.log)
 
         self.setWindowTitle("Deteksi Kentang - PyQt5 + YOLO + DB + Telegram")
         self.resize(1200, 780)
 
-        # Telegram worker (thread)
-        self.tg = TelegramSender(cfg)
-        self.tg.start()
-
         self._build_ui()
         self._connect_signals()
 
+        # I/O (DB, Telegram, polling config) di satu event loop; IO_ENABLED=0 -> thread Telegram seperti dulu
+        self.io = None
+        if cfg.IO_ENABLED:
+            self.io = IoService(cfg, log=self.log_requested.emit)
+            self.io.start()
+            self.tg = self.io
+        else:
+            self.tg = TelegramSender(cfg)
+            self.tg.start()
+
+        # DB upload worker (rollup + state event, batch)
+        self.uploader = DetectionUploader(cfg, log=self.log_requested.emit)
+        self.uploader.start()
+
+        # Live config (poll .env + DB, apply ke worker tanpa restart)
+        self.live_cfg = LiveConfig(cfg, log=self.log_requested.emit)
+        self.live_cfg.start(io=self.io)
+        # TG_COOLDOWN_SEC ikut live config
+        self.tg.cooldown_getter = lambda: self.live_cfg.get().TG_COOLDOWN_SEC
+
+        # Remote viewing (MJPEG); hub tetap hidup walau worker di-restart
+        self.stream_hub = None
+        self.stream_server = None
+        if cfg.STREAM_ENABLED:
+            self.stream_hub = StreamHub()
+            try:
+                self.stream_server = StreamServer(cfg, self.stream_hub, status_provider=self.status_info)
+                self.stream_server.start()
+                self.log(f"[STREAM] http://{cfg.STREAM_HOST}:{cfg.STREAM_PORT}/ (max {cfg.STREAM_MAX_FPS}fps)")
+            except OSError as e:
+                self.log(f"[STREAM] ERROR start server: {e}")
+                self.stream_hub = None
+
+        # Aktuator langsung (MQTT/serial/HTTP) -> setpoint tidak menunggu DB + polling kontroler
+        self.actuator = None
+        if cfg.ACT_KIND:
+            self.actuator = ActuatorDispatcher(cfg, log=self.log_requested.emit)
+            self.actuator.start()
+
+        # Detection bus (record per inferensi untuk konsumen lokal); hidup walau worker di-restart
+        self.det_bus = None
+        if cfg.DET_BUS_ADDR:
+            try:
+                from detection_bus import DetectionBusPublisher  # lazy (numpy), seperti video_worker
+
+                self.det_bus = DetectionBusPublisher(cfg.DET_BUS_ADDR, cfg.DEAD_CLASS_NAME)
+                self.log(f"[DETBUS] publish -> {cfg.DET_BUS_ADDR}")
+            except Exception as e:
+                self.log(f"[DETBUS] ERROR start: {e}")
+
+        # RSS / tracemalloc sampling -> METRICS (+ trim kalau lewat MEM_BUDGET_MB)
+        self.mem_monitor = MemoryMonitor(cfg, log=self.log_requested.emit)
+        self.mem_monitor.start()
+
         self.log(f"[ENV] DEVICE_ID={cfg.DEVICE_ID}, DB={cfg.DB_HOST}/{cfg.DB_NAME}, TG={cfg.telegram_enabled()}")
 
         # ✅ Auto start when app opens
@@ -54,6 +128,7 @@ class MainWindow(QtWidgets.QWidget):
 
         self.log_box = QtWidgets.QPlainTextEdit()
         self.log_box.setReadOnly(True)
+        self.log_box.setMaximumBlockCount(self.cfg.LOG_MAX_LINES)
         self.log_box.setMaximumHeight(130)
         self.log_box.setStyleSheet("font-family: Consolas; font-size: 11px;")
         root.addWidget(self.log_box)
@@ -71,6 +146,11 @@ class MainWindow(QtWidgets.QWidget):
 
         controls.addStretch(1)
 
+        self.btn_profile = QtWidgets.QPushButton("Profile")
+        self.btn_profile.setToolTip(f"Profil loop video {self.cfg.PROFILE_SEC:.0f}s ({self.cfg.PROFILE_MODE}) -> {self.cfg.PROFILE_DIR}/")
+        self.btn_profile.setStyleSheet("background:#475569;color:white;font-size:14px;padding:10px 16px;border-radius:10px;")
+        controls.addWidget(self.btn_profile)
+
         self.btn_start = QtWidgets.QPushButton("Start")
         self.btn_start.setStyleSheet("background:#16a34a;color:white;font-size:14px;padding:10px 16px;border-radius:10px;")
         controls.addWidget(self.btn_start)
@@ -89,10 +169,12 @@ class MainWindow(QtWidgets.QWidget):
     def _connect_signals(self):
         self.btn_start.clicked.connect(self.start)
         self.btn_stop.clicked.connect(self.stop)
+        self.btn_profile.clicked.connect(self.request_profile)
 
     def _set_running(self, running: bool):
         self.btn_start.setEnabled(not running)
         self.btn_stop.setEnabled(running)
+        self.btn_profile.setEnabled(running)
         self.umur.setEnabled(not running)
 
     # ---------- Logging ----------
@@ -104,25 +186,96 @@ class MainWindow(QtWidgets.QWidget):
 
     # ---------- Actions ----------
     def start(self):
-        if self.worker and self.worker.running:
+        if self.closing or (self.worker and self.worker.running):
             return
 
-        try:
-            model = load_model_for_age(self.cfg, self.umur.value())
-            self.log(f"[INFO] Model loaded (umur={self.umur.value()} hari)")
-        except Exception as e:
-            self.log(f"[ERR] Failed to load model: {e}")
-            self.status_panel.set_stopped()
+        if self.loader is not None and self.loader.isRunning():
+            return
+
+        loader = ModelLoader(self.cfg, self.umur.value())
+        backend = self.backends.get(loader.path)
+        if backend is not None:
+            self._start_worker(backend)
             return
 
-        self.worker = VideoWorker(self.cfg, model, self.tg)
-        self.worker.frame_updated.connect(self.video.setImage)
+        self.loader = loader
+        self.loader.progress.connect(self.on_load_progress)
+        self.loader.loaded.connect(self.on_model_loaded)
+        self.loader.failed.connect(self.on_model_failed)
+        self.btn_start.setEnabled(False)
+        self.umur.setEnabled(False)
+        self.status_panel.set_loading()
+        self.loader.start()
+
+    def on_load_progress(self, step: str):
+        self.log(f"[BOOT] {step}")
+        self.status_panel.set_loading(step)
+
+    def on_model_loaded(self, backend, path: str, timings: dict):
+        if self.closing:
+            # sinyal masih antre setelah window ditutup -> jangan start worker baru
+            if hasattr(backend, "close"):
+                backend.close()
+            return
+        self.backends[path] = backend
+        ready_ms = (time.perf_counter() - BOOT_T0) * 1000
+        self.log(
+            f"[INFO] Model loaded (umur={self.umur.value()} hari, {path}) "
+            f"import={timings['import_ms']:.0f}ms load={timings['load_ms']:.0f}ms "
+            f"warmup={timings['warmup_ms']:.0f}ms ready@{ready_ms:.0f}ms"
+        )
+        if self.boot_bench:
+            print(json.dumps({"event": "model_ready", "ms": ready_ms, **timings}), flush=True)
+            QtWidgets.QApplication.quit()
+            return
+        self._start_worker(backend)
+
+    def on_model_failed(self, err: str):
+        self.log(f"[ERR] Failed to load model: {err}")
+        self._set_running(False)
+        self.status_panel.set_stopped()
+        if self.boot_bench:
+            print(json.dumps({"event": "model_failed", "error": err}), flush=True)
+            QtWidgets.QApplication.exit(1)
+
+    def _start_worker(self, backend):
+        from video_worker import VideoWorker
+
+        self.live_cfg.use_calibration(backend.path)
+        self.worker = VideoWorker(
+            self.cfg,
+            backend,
+            self.tg,
+            uploader=self.uploader,
+            live_cfg=self.live_cfg,
+            stream_hub=self.stream_hub,
+            io=self.io,
+            det_bus=self.det_bus,
+            actuator=self.actuator,
+        )
+        self.worker.frame_updated.connect(self.on_frame)
         self.worker.log_signal.connect(self.log)
         self.worker.status_signal.connect(self.on_status)
+        self.worker.stats_signal.connect(self.status_panel.update_stats)
 
         self._set_running(True)
         self.worker.start()
 
+    def on_frame(self, img):
+        self.video.setImage(img)
+        # frame dari worker lama (sudah di-stop) masih bisa antre -> jangan ack ke worker baru
+        if self.worker is not None and self.sender() is self.worker:
+            self.worker.frame_consumed()
+
+    def request_profile(self):
+        if self.worker is None:
+            self.log("[PROF] worker belum jalan")
+            return
+        self.worker.profiler.request()
+
+    def status_info(self) -> dict:
+        return {"metrics": METRICS.snapshot()}
+
     def stop(self):
         if self.worker:
             try:
@@ -146,14 +299,35 @@ class MainWindow(QtWidgets.QWidget):
             self.status_panel.set_normal()
 
     def closeEvent(self, event):
+        self.closing = True
         try:
             self.stop()
         except Exception:
             pass
+        if self.loader is not None:
+            self.loader.wait()
         try:
             self.tg.stop()
         except Exception:
             pass
+        try:
+            self.uploader.stop()
+        except Exception:
+            pass
+        try:
+            self.live_cfg.stop()
+        except Exception:
+            pass
+        self.mem_monitor.stop()
+        if self.det_bus is not None:
+            self.det_bus.close()
+        if self.actuator is not None:
+            self.actuator.stop()
+        if self.stream_server is not None:
+            try:
+                self.stream_server.stop()
+            except Exception:
+                pass
         super().closeEvent(event)
 
 
@@ -162,4 +336,15 @@ if __name__ == "__main__":
     app = QtWidgets.QApplication(sys.argv)
     win = MainWindow(cfg)
     win.show()
+    shown_ms = (time.perf_counter() - BOOT_T0) * 1000
+    win.log(f"[BOOT] window shown in {shown_ms:.0f}ms")
+    if win.boot_bench:
+        print(json.dumps({"event": "window_shown", "ms": shown_ms}), flush=True)
+
+    # kill -USR1 <pid> -> profiling tanpa akses layar; handler Python butuh interpreter sesekali jalan
+    if hasattr(signal, "SIGUSR1"):
+        signal.signal(signal.SIGUSR1, lambda *_: QtCore.QTimer.singleShot(0, win.request_profile))
+        tick = QtCore.QTimer()
+        tick.timeout.connect(lambda: None)
+        tick.start(500)
     sys.exit(app.exec_())
@@ -0,0 +1,124 @@
+# memory_monitor.py
+import gc
+import os
+import sys
+import time
+import threading
+from typing import Callable, List, Optional
+
+from config import AppConfig
+from metrics import METRICS
+
+_PAGE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def rss_bytes() -> int:
+    """RSS proses saat ini (Linux: /proc/self/statm; lainnya: peak RSS dari getrusage)."""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * _PAGE
+    except (OSError, ValueError, IndexError):
+        import resource
+        ru = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return ru if sys.platform == "darwin" else ru * 1024
+
+
+def trim_memory():
+    """gc + kembalikan cache allocator (torch CUDA, glibc malloc) ke OS."""
+    gc.collect()
+    torch = sys.modules.get("torch")
+    if torch is not None:
+        try:
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+        except Exception:
+            pass
+    try:
+        import ctypes
+        ctypes.CDLL("libc.so.6").malloc_trim(0)
+    except Exception:
+        pass
+
+
+class MemoryMonitor:
+    """
+    Sampling RSS (+ tracemalloc opsional) tiap MEM_SAMPLE_SEC -> METRICS:
+      mem.rss_mb, mem.rss_peak_mb, mem.rss_start_mb, mem.traced_mb, mem.trims
+    Kalau RSS > MEM_BUDGET_MB: log peringatan + trim_memory().
+    """
+    def __init__(self, cfg: AppConfig, log: Optional[Callable[[str], None]] = None):
+        self.cfg = cfg
+        self._log = log or (lambda msg: None)
+        self.samples: List[tuple] = []  # (ts, rss_mb), dibatasi
+        self.max_samples = 1440
+        self._tm_snapshot = None
+        self.stop_event = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self.cfg.MEM_TRACEMALLOC:
+            import tracemalloc
+            tracemalloc.start(10)
+            self._tm_snapshot = tracemalloc.take_snapshot()
+        METRICS.set("mem.rss_start_mb", round(rss_bytes() / 1e6, 1))
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def _run(self):
+        while not self.stop_event.wait(float(self.cfg.MEM_SAMPLE_SEC)):
+            try:
+                self.sample()
+            except Exception as e:
+                self._log(f"[MEM] ERROR sample: {e}")
+
+    def sample(self) -> float:
+        rss_mb = rss_bytes() / 1e6
+        self.samples.append((time.time(), rss_mb))
+        del self.samples[:-self.max_samples]
+        METRICS.set("mem.rss_mb", round(rss_mb, 1))
+        METRICS.set("mem.rss_peak_mb", round(max(rss_mb, METRICS.get("mem.rss_peak_mb", 0)), 1))
+
+        if self._tm_snapshot is not None:
+            self._sample_tracemalloc()
+
+        budget = float(self.cfg.MEM_BUDGET_MB)
+        if budget > 0 and rss_mb > budget:
+            trim_memory()
+            METRICS.inc("mem.trims")
+            after = rss_bytes() / 1e6
+            self._log(f"[MEM] RSS {rss_mb:.0f}MB > budget {budget:.0f}MB -> trim ({after:.0f}MB)")
+        return rss_mb
+
+    def _sample_tracemalloc(self):
+        import tracemalloc
+        snap = tracemalloc.take_snapshot()
+        current, _ = tracemalloc.get_traced_memory()
+        METRICS.set("mem.traced_mb", round(current / 1e6, 2))
+        top = snap.compare_to(self._tm_snapshot, "lineno")[:3]
+        growth = [s for s in top if s.size_diff > 512 * 1024]
+        if growth:
+            self._log("[MEM] growth: " + "; ".join(
+                f"{s.traceback[0].filename.split(os.sep)[-1]}:{s.traceback[0].lineno} +{s.size_diff / 1e6:.1f}MB"
+                for s in growth
+            ))
+        self._tm_snapshot = snap
+
+    def slope_mb_per_hour(self, skip_sec: float = 0.0) -> float:
+        """Slope regresi linear RSS (MB/jam) setelah `skip_sec` pertama (warm-up)."""
+        if not self.samples:
+            return 0.0
+        t0 = self.samples[0][0] + skip_sec
+        pts = [(t, m) for t, m in self.samples if t >= t0]
+        if len(pts) < 2:
+            return 0.0
+        n = len(pts)
+        mt = sum(t for t, _ in pts) / n
+        mm = sum(m for _, m in pts) / n
+        var = sum((t - mt) ** 2 for t, _ in pts)
+        if var == 0:
+            return 0.0
+        cov = sum((t - mt) * (m - mm) for t, m in pts)
+        return cov / var * 3600.0
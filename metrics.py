@@ -0,0 +1,33 @@
+# metrics.py
+import threading
+import time
+from typing import Dict, Union
+
+Number = Union[int, float]
+
+
+class Metrics:
+    """Registry metrik sederhana (gauge + counter), thread-safe, dibaca lewat snapshot()."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values: Dict[str, Number] = {}
+
+    def set(self, name: str, value: Number):
+        with self._lock:
+            self._values[name] = value
+
+    def inc(self, name: str, delta: Number = 1):
+        with self._lock:
+            self._values[name] = self._values.get(name, 0) + delta
+
+    def get(self, name: str, default: Number = 0) -> Number:
+        return self._values.get(name, default)
+
+    def snapshot(self) -> Dict[str, Number]:
+        with self._lock:
+            data = dict(self._values)
+        data["ts"] = time.time()
+        return data
+
+
+METRICS = Metrics()
@@ -0,0 +1,71 @@
+# model_loader.py
+import time
+from PyQt5 import QtCore
+
+from config import AppConfig, model_path_for_age
+
+
+class ModelLoader(QtCore.QThread):
+    """
+    Import modul berat (cv2/torch/ultralytics) + load + warm-up model di background,
+    supaya window langsung tampil dan thread GUI tidak pernah freeze.
+    """
+    progress = QtCore.pyqtSignal(str)
+    # (backend, path, timings_ms)
+    loaded = QtCore.pyqtSignal(object, str, dict)
+    failed = QtCore.pyqtSignal(str)
+
+    def __init__(self, cfg: AppConfig, umur_hari: int):
+        super().__init__()
+        self.cfg = cfg
+        self.umur_hari = umur_hari
+        self.path = model_path_for_age(cfg, umur_hari)
+
+    def run(self):
+        timings = {}
+        try:
+            t0 = time.perf_counter()
+            self.progress.emit("Memuat library (cv2 / torch / ultralytics)...")
+            import numpy as np
+            import video_worker
+            from inference import YoloBackend, infer_params
+            timings["import_ms"] = (time.perf_counter() - t0) * 1000
+
+            t1 = time.perf_counter()
+            client = None
+            if self.cfg.INFER_SERVER_ADDR:
+                from inference_server import InferenceClient, RemoteBackend
+
+                self.progress.emit(f"Menghubungkan ke inference server {self.cfg.INFER_SERVER_ADDR}...")
+                client = InferenceClient(self.cfg.INFER_SERVER_ADDR, self.cfg.INFER_SERVER_AUTHKEY)
+                backend = RemoteBackend(client, self.path, infer_params(self.cfg))
+                _ = backend.names  # server load model kalau belum
+            elif self.cfg.POOL_REPLICAS > 1:
+                from worker_pool import build_pool
+
+                self.progress.emit(f"Memuat {self.cfg.POOL_REPLICAS} replika model {self.path} ({self.cfg.POOL_MODE})...")
+                backend = build_pool(self.cfg, self.path, infer_params(self.cfg), log=self.progress.emit)
+            else:
+                self.progress.emit(f"Memuat model {self.path}...")
+                model = video_worker.load_model_for_age(self.cfg, self.umur_hari)
+                backend = YoloBackend(model, self.path, infer_params(self.cfg))
+            if self.cfg.CASCADE_MODEL:
+                from cascade import build_cascade
+
+                self.progress.emit(f"Memuat model konfirmasi {self.cfg.CASCADE_MODEL}...")
+                backend = build_cascade(self.cfg, backend, client)
+            timings["load_ms"] = (time.perf_counter() - t1) * 1000
+
+            # inferensi pertama jauh lebih lambat (fuse layer, alokasi, autotune) -> lakukan di sini
+            t2 = time.perf_counter()
+            self.progress.emit("Warm-up model...")
+            w = int(getattr(self.cfg, "CAM_WIDTH", 1920))
+            h = int(getattr(self.cfg, "CAM_HEIGHT", 1080))
+            # WorkerPool: semua replika di-warm-up
+            getattr(backend, "warmup", backend.predict)(np.zeros((h, w, 3), dtype=np.uint8))
+            timings["warmup_ms"] = (time.perf_counter() - t2) * 1000
+        except Exception as e:
+            self.failed.emit(str(e))
+            return
+
+        self.loaded.emit(backend, self.path, timings)
@@ -0,0 +1,384 @@
+# multi_device.py
+"""
+Mode multi-device (headless): satu host menjalankan worker untuk banyak device sekaligus.
+
+devices.json (DEVICES_FILE):
+  [
+    {"device_id": 3, "umur": 10, "config": {"CAM_SOURCE": "v4l2", "CAM_DEVICE": "/dev/video0"}},
+    {"device_id": 4, "umur": 21, "config": {"CAM_SOURCE": "csi", "CAM_SENSOR_ID": 1, "DEAD_CONF": 0.4}}
+  ]
+  "config" = override field AppConfig (nama field / nama env) khusus device itu.
+
+Per device : AppConfig sendiri, LiveConfig (threshold cache + override DB), VideoWorker (state machine),
+             HIST_DIR / REC_DIR / FRAME_BUS_NAME / CAM_SHM_PATH otomatis di-suffix device_id.
+Bersama    : DbPool (maks DB_POOL_SIZE koneksi MySQL untuk semua device), IoService (event loop untuk
+             DB/Telegram/polling config; Telegram rate limit per device TG_DEVICE_COOLDOWN_SEC),
+             DetectionUploader, DetectionBusPublisher (DET_BUS_ADDR), ActuatorDispatcher (ACT_KIND),
+             model per path.
+Status     : GET http://STREAM_HOST:STREAM_PORT/status (STREAM_ENABLED=1) -> JSON semua device.
+
+Worker yang berhenti (kamera putus, dsb.) di-restart setelah DEVICE_RESTART_SEC.
+
+  python multi_device.py
+  python multi_device.py --devices /etc/aikentang/devices.json
+"""
+import os
+import sys
+import json
+import time
+import signal
+import argparse
+import threading
+import contextlib
+from dataclasses import dataclass, fields, replace
+from typing import Dict, List, Optional
+
+from PyQt5 import QtCore
+
+from config import AppConfig, coerce_overrides, model_path_for_age
+from db_client import DbPool, use_pool
+from db_uploader import DetectionUploader
+from inference import infer_params
+from live_config import LiveConfig, load_calibration
+from io_service import IoService
+from detection_bus import DetectionBusPublisher
+from actuator import ActuatorDispatcher
+from memory_monitor import MemoryMonitor
+from metrics import METRICS
+from stream_server import StreamServer
+from telegram_sender import TelegramSender
+
+ALL_KEYS = tuple(f.name for f in fields(AppConfig))
+
+
+@dataclass
+class DeviceSlot:
+    device_id: int
+    umur: int
+    cfg: AppConfig
+    live_cfg: Optional[LiveConfig] = None
+    worker: object = None
+    status: str = "stopped"
+    last_log: str = ""
+    started_ts: float = 0.0
+    stopped_ts: float = 0.0
+    restarts: int = 0
+    errors: int = 0
+
+
+def device_config(base: AppConfig, device_id: int, overrides: Dict) -> AppConfig:
+    # dicek di hasil coerce (nama field kanonik), bukan dict mentah: "hist_dir" / nama env juga eksplisit
+    o = coerce_overrides(overrides, keys=ALL_KEYS)
+    cfg = replace(base, DEVICE_ID=device_id, **o)
+    # resource lokal per device tidak boleh bentrok (kecuali di-set eksplisit)
+    per_device = {}
+    if "HIST_DIR" not in o:
+        per_device["HIST_DIR"] = os.path.join(base.HIST_DIR, str(device_id))
+    if "REC_DIR" not in o:
+        per_device["REC_DIR"] = os.path.join(base.REC_DIR, str(device_id))
+    if base.FRAME_BUS_NAME and "FRAME_BUS_NAME" not in o:
+        per_device["FRAME_BUS_NAME"] = f"{base.FRAME_BUS_NAME}_{device_id}"
+    if "CAM_SHM_PATH" not in o:
+        per_device["CAM_SHM_PATH"] = f"{base.CAM_SHM_PATH}_{device_id}"
+    return replace(cfg, **per_device)
+
+
+def load_devices(path: str, base: AppConfig) -> List[DeviceSlot]:
+    with open(path, "r", encoding="utf-8") as f:
+        raw = json.load(f)
+    slots, seen = [], set()
+    for item in raw:
+        device_id = int(item["device_id"])
+        if device_id in seen:
+            raise ValueError(f"device_id {device_id} dobel di {path}")
+        seen.add(device_id)
+        cfg = device_config(base, device_id, item.get("config", {}))
+        slots.append(DeviceSlot(device_id=device_id, umur=int(item.get("umur", 10)), cfg=cfg))
+    return slots
+
+
+class SharedBackend:
+    """
+    Satu model in-process dipakai banyak worker: predict/score diserialisasi (ultralytics tidak
+    thread-safe). Membungkus backend deteksi maupun confirmer cascade.
+    serialize=False untuk WorkerPool (sudah thread-safe; predict device berbeda jalan paralel di replika
+    berbeda). submit() pool sengaja tidak diteruskan: urutan hasil pipelining hanya untuk satu pemanggil.
+    """
+    def __init__(self, backend, serialize: bool = True):
+        self.backend = backend
+        self._lock = threading.Lock() if serialize else contextlib.nullcontext()
+
+    @property
+    def names(self):
+        return self.backend.names
+
+    @property
+    def path(self) -> str:
+        return self.backend.path
+
+    @property
+    def params(self) -> Dict:
+        return getattr(self.backend, "params", {})
+
+    @property
+    def supports_imgsz(self) -> bool:
+        return bool(getattr(self.backend, "supports_imgsz", False))
+
+    def predict(self, frame, **kw):
+        with self._lock:
+            return self.backend.predict(frame, **kw)
+
+    def predict_batch(self, frames):
+        with self._lock:
+            return self.backend.predict_batch(frames)
+
+    def score(self, crops):
+        with self._lock:
+            return self.backend.score(crops)
+
+
+class Supervisor(QtCore.QObject):
+    def __init__(self, base: AppConfig, slots: List[DeviceSlot]):
+        super().__init__()
+        self.base = base
+        self.slots = slots
+        self.t0 = time.time()
+
+        self.pool = DbPool(base, base.DB_POOL_SIZE)
+        use_pool(self.pool)
+
+        # satu event loop I/O untuk semua device (DB set_current/threshold, Telegram, polling config)
+        tg_kw = dict(queue_size=max(5, 2 * len(slots)), key_cooldown_sec=base.TG_DEVICE_COOLDOWN_SEC,
+                     cooldown_getter=self._tg_cooldown)
+        self.io = IoService(base, log=self.log, **tg_kw) if base.IO_ENABLED else None
+        self.tg = self.io if self.io is not None else TelegramSender(base, **tg_kw)
+        self.uploader = DetectionUploader(base, log=self.log)
+        # satu publisher untuk semua device (record membawa device_id)
+        self.det_bus = DetectionBusPublisher(base.DET_BUS_ADDR, base.DEAD_CLASS_NAME) if base.DET_BUS_ADDR else None
+        # satu koneksi aktuator (broker MQTT / port serial / URL) untuk semua device; device_id di payload
+        self.actuator = ActuatorDispatcher(base, log=self.log) if base.ACT_KIND else None
+        self.mem_monitor = MemoryMonitor(base, log=self.log)
+        self._backends: Dict[str, object] = {}
+
+        self.timer = QtCore.QTimer(self)
+        self.timer.timeout.connect(self._check_workers)
+
+    def log(self, msg: str, device_id: Optional[int] = None):
+        ts = time.strftime("%H:%M:%S")
+        tag = f"[DEV {device_id}] " if device_id is not None else ""
+        print(f"{ts} {tag}{msg}", flush=True)
+
+    def _tg_cooldown(self) -> float:
+        # sender dipakai bersama: jeda global = TG_COOLDOWN_SEC live terbesar di antara device
+        live = [(s.live_cfg.get() if s.live_cfg is not None else s.cfg).TG_COOLDOWN_SEC for s in self.slots]
+        return max(live, default=self.base.TG_COOLDOWN_SEC)
+
+    # ---------- lifecycle ----------
+    def start(self):
+        self.tg.start()
+        if self.actuator is not None:
+            self.actuator.start()
+        self.uploader.start()
+        self.mem_monitor.start()
+        for slot in self.slots:
+            if slot.cfg.CFG_LIVE_ENABLED:
+                slot.live_cfg = LiveConfig(slot.cfg, log=lambda m, d=slot.device_id: self.log(m, d))
+                slot.live_cfg.start(io=self.io)
+            self._start_worker(slot)
+        self.timer.start(5000)
+
+    def stop(self):
+        self.timer.stop()
+        for slot in self.slots:
+            if slot.worker is not None:
+                slot.worker.stop()
+            if slot.live_cfg is not None:
+                slot.live_cfg.stop()
+        if self.actuator is not None:
+            self.actuator.stop()
+        self.uploader.stop()
+        self.tg.stop()
+        if self.det_bus is not None:
+            self.det_bus.close()
+        self.mem_monitor.stop()
+        for shared in self._backends.values():
+            if hasattr(shared.backend, "close"):
+                shared.backend.close()  # WorkerPool: thread / proses replika
+        use_pool(None)
+        self.pool.close()
+
+    def _backend_for(self, slot: DeviceSlot):
+        path = model_path_for_age(slot.cfg, slot.umur)
+        if slot.cfg.INFER_SERVER_ADDR:
+            # client sendiri per device (buffer shm per client); server yang membagi GPU
+            from inference_server import InferenceClient, RemoteBackend
+
+            client = InferenceClient(slot.cfg.INFER_SERVER_ADDR, slot.cfg.INFER_SERVER_AUTHKEY)
+            backend = RemoteBackend(client, path, infer_params(slot.cfg))
+            if slot.cfg.CASCADE_MODEL:
+                from cascade import build_cascade
+
+                backend = build_cascade(slot.cfg, backend, client)
+            return backend
+
+        # model yang sama dengan parameter inferensi beda (override per device) = backend beda
+        params = infer_params(slot.cfg)
+        key = f"{path}|{json.dumps(params, sort_keys=True)}"
+        if slot.cfg.POOL_REPLICAS > 1:
+            from worker_pool import build_pool
+
+            backend = self._shared(key, lambda: build_pool(slot.cfg, path, params, log=self.log), serialize=False)
+        else:
+            backend = self._shared(key, lambda: __import__("inference").load_backend(path, params))
+        if slot.cfg.CASCADE_MODEL:
+            # model dibagi, tapi CascadeBackend (budget + cache region) per device
+            from cascade import build_cascade, load_confirmer
+
+            confirmer = self._shared("cascade:" + slot.cfg.CASCADE_MODEL, lambda: load_confirmer(slot.cfg))
+            backend = build_cascade(slot.cfg, backend, confirmer=confirmer)
+        return backend
+
+    def _shared(self, key: str, load, serialize: bool = True):
+        shared = self._backends.get(key)
+        if shared is None:
+            self.log(f"[MODEL] loading {key} (shared)")
+            shared = SharedBackend(load(), serialize)
+            self._backends[key] = shared
+        return shared
+
+    def _start_worker(self, slot: DeviceSlot):
+        from video_worker import VideoWorker
+
+        try:
+            backend = self._backend_for(slot)
+        except Exception as e:
+            slot.errors += 1
+            slot.last_log = f"[ERR] load model: {e}"
+            slot.stopped_ts = time.time()
+            self.log(slot.last_log, slot.device_id)
+            return
+
+        cfg = slot.cfg
+        if slot.live_cfg is not None:
+            slot.live_cfg.use_calibration(backend.path)
+        else:
+            cfg = replace(cfg, **load_calibration(cfg, backend.path, lambda m, d=slot.device_id: self.log(m, d)))
+        worker = VideoWorker(
+            cfg,
+            backend,
+            self.tg,
+            uploader=self.uploader,
+            live_cfg=slot.live_cfg,
+            headless=True,
+            metrics_prefix=f"dev{slot.device_id}",
+            io=self.io,
+            det_bus=self.det_bus,
+            actuator=self.actuator,
+        )
+        worker.log_signal.connect(lambda msg, s=slot: self._on_log(s, msg))
+        worker.status_signal.connect(lambda st, s=slot: self._on_status(s, st))
+        slot.worker = worker
+        slot.started_ts = time.time()
+        worker.start()
+
+    def _on_log(self, slot: DeviceSlot, msg: str):
+        slot.last_log = msg
+        if "ERROR" in msg:
+            slot.errors += 1
+        self.log(msg, slot.device_id)
+
+    def _on_status(self, slot: DeviceSlot, status: str):
+        slot.status = status
+        if status == "stopped":
+            slot.stopped_ts = time.time()
+
+    def _check_workers(self):
+        now = time.time()
+        for slot in self.slots:
+            w = slot.worker
+            alive = w is not None and w.isRunning()
+            if alive:
+                continue
+            if not slot.stopped_ts:
+                slot.stopped_ts = now
+            if now - slot.stopped_ts >= self.base.DEVICE_RESTART_SEC:
+                slot.restarts += 1
+                slot.stopped_ts = 0.0
+                self.log(f"[SUP] restart worker (#{slot.restarts})", slot.device_id)
+                self._start_worker(slot)
+
+    def profile_all(self):
+        """SIGUSR1: profil semua worker yang sedang jalan (file terpisah per device)."""
+        for slot in self.slots:
+            if slot.worker is not None and slot.worker.isRunning():
+                slot.worker.profiler.request()
+
+    # ---------- status ----------
+    def status(self) -> Dict:
+        now = time.time()
+        devices = []
+        for slot in self.slots:
+            w = slot.worker
+            devices.append({
+                "device_id": slot.device_id,
+                "status": slot.status,
+                "running": bool(w is not None and w.isRunning()),
+                "dead_state": bool(getattr(w, "dead_state", False)),
+                "dead_hits": int(getattr(w, "dead_hits", 0)),
+                "threshold": getattr(w, "threshold", None),
+                "frames": METRICS.get(f"dev{slot.device_id}.frames"),
+                "uptime_sec": round(now - slot.started_ts) if slot.started_ts else 0,
+                "restarts": slot.restarts,
+                "errors": slot.errors,
+                "tg_dropped": self.tg.dropped.get(slot.device_id, 0),
+                "last_log": slot.last_log,
+            })
+        return {
+            "uptime_sec": round(now - self.t0),
+            "devices": devices,
+            "db_pool": self.pool.stats(),
+            "tg_queue": self.tg.queued(),
+            "memory": {k: v for k, v in METRICS.snapshot().items() if k.startswith("mem.")},
+        }
+
+
+def main():
+    base = AppConfig()
+    ap = argparse.ArgumentParser(description="Jalankan worker deteksi untuk banyak device (headless)")
+    ap.add_argument("--devices", default=base.DEVICES_FILE)
+    args = ap.parse_args()
+
+    slots = load_devices(args.devices, base)
+    if not slots:
+        sys.exit(f"tidak ada device di {args.devices}")
+
+    app = QtCore.QCoreApplication(sys.argv)
+    sup = Supervisor(base, slots)
+
+    server = None
+    if base.STREAM_ENABLED:
+        server = StreamServer(base, None, status_provider=sup.status)
+        server.start()
+        sup.log(f"[STATUS] http://{base.STREAM_HOST}:{base.STREAM_PORT}/status")
+
+    sup.log(f"[SUP] {len(slots)} device: {[s.device_id for s in slots]}, DB pool={base.DB_POOL_SIZE}")
+    sup.start()
+
+    # Ctrl+C / SIGTERM -> keluar dari event loop Qt dengan rapi
+    signal.signal(signal.SIGINT, lambda *_: app.quit())
+    signal.signal(signal.SIGTERM, lambda *_: app.quit())
+    if hasattr(signal, "SIGUSR1"):
+        signal.signal(signal.SIGUSR1, lambda *_: sup.profile_all())
+    tick = QtCore.QTimer()
+    tick.timeout.connect(lambda: None)  # beri kesempatan handler signal Python jalan
+    tick.start(500)
+
+    code = app.exec_()
+    sup.stop()
+    if server is not None:
+        server.stop()
+    sys.exit(code)
+
+
+if __name__ == "__main__":
+    main()
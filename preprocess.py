@@ -0,0 +1,184 @@
+# preprocess.py
+"""
+Tahap preprocessing frame kamera: crop + resize + mirror + konversi warna dalam satu pass,
+langsung dari frame sensor ke buffer pool (tanpa salinan full-res di tengah).
+
+Output per frame:
+  display      -> ukuran tampilan (DISPLAY_MAX_WIDTH), BGR; buffer milik worker (boleh digambari)
+  model_input  -> ukuran input model (PRE_MODEL_SIZE sisi terpanjang), BGR;
+                  sama dengan `display` kalau ukurannya sama (jangan digambari sebelum predict selesai)
+Deteksi dari model_input dipetakan ke koordinat display dengan PreFrame.to_display().
+
+Mirror sebaiknya dikerjakan GStreamer (flip-method nvvidconv, lihat compose_flip_method) supaya
+CPU tidak menyentuh piksel sama sekali; FramePreprocessor hanya mirror kalau diminta (mirror=True).
+"""
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from config import AppConfig
+from frame_pool import FramePool
+from inference import Detection
+
+# nvvidconv flip-method -> matriks 2x2 pada koordinat gambar (x ke kanan, y ke bawah)
+FLIP_METHODS = {
+    0: ((1, 0), (0, 1)),     # none
+    1: ((0, 1), (-1, 0)),    # counterclockwise 90
+    2: ((-1, 0), (0, -1)),   # rotate 180
+    3: ((0, -1), (1, 0)),    # clockwise 90
+    4: ((-1, 0), (0, 1)),    # horizontal flip
+    5: ((0, -1), (-1, 0)),   # upper-right diagonal
+    6: ((1, 0), (0, -1)),    # vertical flip
+    7: ((0, 1), (1, 0)),     # upper-left diagonal (transpose)
+}
+
+
+def _matmul(a, b):
+    return tuple(
+        tuple(sum(a[i][k] * b[k][j] for k in range(2)) for j in range(2))
+        for i in range(2)
+    )
+
+
+def compose_flip_method(method: int, mirror: bool) -> int:
+    """flip-method nvvidconv yang setara dengan `method` lalu mirror horizontal (seperti cv2.flip(.., 1))."""
+    if not mirror:
+        return int(method)
+    target = _matmul(FLIP_METHODS[4], FLIP_METHODS[int(method)])
+    for m, mat in FLIP_METHODS.items():
+        if mat == target:
+            return m
+    raise ValueError(f"flip-method tidak valid: {method}")
+
+
+def parse_crop(value: str) -> Optional[Tuple[int, int, int, int]]:
+    """'x,y,w,h' (piksel, koordinat frame setelah mirror) -> tuple; kosong -> None."""
+    value = (value or "").strip()
+    if not value:
+        return None
+    x, y, w, h = [int(v) for v in value.split(",")]
+    return x, y, w, h
+
+
+def fit_size(w: int, h: int, max_side: int, longest: bool) -> Tuple[int, int]:
+    """Ukuran (w, h) yang dikecilkan supaya sisi terpanjang / lebar <= max_side (aspek dijaga)."""
+    if max_side <= 0:
+        return w, h
+    side = max(w, h) if longest else w
+    if side <= max_side:
+        return w, h
+    s = max_side / side
+    return max(1, int(round(w * s))), max(1, int(round(h * s)))
+
+
+class PreFrame(NamedTuple):
+    display: np.ndarray
+    model_input: np.ndarray
+    scale_x: float  # display_w / model_w
+    scale_y: float
+
+    def to_display(self, dets: Sequence[Detection]) -> List[Detection]:
+        if self.scale_x == 1.0 and self.scale_y == 1.0:
+            return list(dets)
+        sx, sy = self.scale_x, self.scale_y
+        return [
+            d._replace(xyxy=(d.xyxy[0] * sx, d.xyxy[1] * sy, d.xyxy[2] * sx, d.xyxy[3] * sy))
+            for d in dets
+        ]
+
+
+class FramePreprocessor:
+    def __init__(
+        self,
+        mirror: bool = False,
+        crop: Optional[Tuple[int, int, int, int]] = None,
+        display_max_width: int = 0,
+        model_size: int = 0,
+        pool_size: int = 4,
+        inflight: int = 0,
+    ):
+        self.mirror = mirror
+        self.crop = crop
+        self.display_max_width = int(display_max_width)
+        self.model_size = int(model_size)
+        # inflight: frame yang masih diproses replika WorkerPool -> buffernya belum boleh dipakai ulang
+        self.display_pool = FramePool(pool_size + inflight)
+        self.model_pool = FramePool(2 + inflight)
+        # frame 4 kanal (BGRx) sebelum konversi warna; satu pool per output (ukuran beda)
+        self._display_scratch = FramePool(2)
+        self._model_scratch = FramePool(2)
+        self._geom_key = None
+        self._geom = None
+
+    @classmethod
+    def from_config(cls, cfg: AppConfig, mirror: bool, inflight: int = 0) -> "FramePreprocessor":
+        return cls(
+            mirror=mirror,
+            crop=parse_crop(cfg.CAM_CROP),
+            display_max_width=cfg.DISPLAY_MAX_WIDTH,
+            model_size=cfg.PRE_MODEL_SIZE,
+            pool_size=cfg.MEM_FRAME_POOL,
+            inflight=inflight,
+        )
+
+    def _geometry(self, w: int, h: int):
+        key = (w, h)
+        if key != self._geom_key:
+            if self.crop is not None:
+                cx, cy, cw, ch = self.crop
+                cx, cy = max(0, min(cx, w - 1)), max(0, min(cy, h - 1))
+                cw, ch = max(1, min(cw, w - cx)), max(1, min(ch, h - cy))
+                if self.mirror:
+                    # crop dinyatakan di frame ter-mirror -> posisi di frame sensor
+                    cx = w - cx - cw
+                roi = (slice(cy, cy + ch), slice(cx, cx + cw))
+            else:
+                cw, ch = w, h
+                roi = (slice(0, h), slice(0, w))
+            disp = fit_size(cw, ch, self.display_max_width, longest=False)
+            model = fit_size(cw, ch, self.model_size, longest=True)
+            self._geom = (roi, disp, model)
+            self._geom_key = key
+        return self._geom
+
+    def _render(self, roi: np.ndarray, size: Tuple[int, int], pool: FramePool, scratch: FramePool) -> np.ndarray:
+        w, h = size
+        bgrx = roi.ndim == 3 and roi.shape[2] == 4
+        out = pool.next((h, w, 3))
+        dst = scratch.next((h, w, 4)) if bgrx else out
+
+        if (w, h) != (roi.shape[1], roi.shape[0]):
+            cv2.resize(roi, (w, h), dst=dst, interpolation=cv2.INTER_LINEAR)
+            if self.mirror:
+                cv2.flip(dst, 1, dst)  # in-place di buffer kecil
+        elif self.mirror:
+            cv2.flip(roi, 1, dst)
+        elif not bgrx:
+            np.copyto(dst, roi)
+        else:
+            dst = roi
+
+        if bgrx:
+            cv2.cvtColor(dst, cv2.COLOR_BGRA2BGR, dst=out)
+        return out
+
+    def process(self, frame: np.ndarray, model_frame: Optional[np.ndarray] = None) -> PreFrame:
+        """
+        model_frame: input model yang sudah diskalakan GStreamer (dual stream, lihat gst_pipeline);
+        cukup dikonversi warnanya, geometrinya dianggap sama dengan `frame`.
+        """
+        h, w = frame.shape[:2]
+        roi_idx, disp, model = self._geometry(w, h)
+        roi = frame[roi_idx]
+        display = self._render(roi, disp, self.display_pool, self._display_scratch)
+        if model_frame is not None:
+            mh, mw = model_frame.shape[:2]
+            if model_frame.ndim == 3 and model_frame.shape[2] == 4:
+                out = self.model_pool.next((mh, mw, 3))
+                model_frame = cv2.cvtColor(model_frame, cv2.COLOR_BGRA2BGR, dst=out)
+            return PreFrame(display, model_frame, disp[0] / mw, disp[1] / mh)
+        if model == disp:
+            return PreFrame(display, display, 1.0, 1.0)
+        model_input = self._render(roi, model, self.model_pool, self._model_scratch)
+        return PreFrame(display, model_input, disp[0] / model[0], disp[1] / model[1])
@@ -0,0 +1,202 @@
+# profiler.py
+"""
+Profiling on-demand loop VideoWorker di unit lapangan (tanpa redeploy).
+
+Mode (PROFILE_MODE):
+  sample   -> sampler statistik: thread terpisah membaca stack thread worker tiap
+              PROFILE_INTERVAL_MS lewat sys._current_frames(). Overhead kecil & terukur
+              (profile.overhead_pct), aman dipakai di produksi.
+  cprofile -> cProfile di thread worker selama jendela PROFILE_SEC (deterministik, tiap call
+              terhitung, tapi loop bisa ~2x lebih lambat selama jendela itu).
+
+Trigger: tombol "Profile" di GUI, `kill -USR1 <pid>` (main.py / multi_device.py), atau
+LoopProfiler.request() dari kode.
+
+Output di PROFILE_DIR (prefix <waktu>_dev<id>_<mode>):
+  .folded  -> stack terlipat "a;b;c <jumlah>" (sample): flamegraph.pl, speedscope, inferno
+  .prof    -> pstats (cprofile): snakeviz, flameprof, gprof2dot
+  _top.txt -> ringkasan top-N fungsi (self / total)
+"""
+import os
+import sys
+import time
+import pstats
+import cProfile
+import threading
+from io import StringIO
+from typing import Callable, Dict, Optional, Tuple
+
+from config import AppConfig
+from metrics import METRICS
+
+MODES = ("sample", "cprofile")
+
+
+def _frame_label(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class LoopProfiler:
+    """
+    Satu instance per VideoWorker. attach()/detach() dipanggil di thread worker (awal/akhir run),
+    poll() tiap iterasi loop (murah: satu cek atribut kalau tidak ada sesi cprofile).
+    """
+    def __init__(self, cfg: AppConfig, log: Optional[Callable[[str], None]] = None, name: str = ""):
+        self.cfg = cfg
+        self.log = log or (lambda msg: None)
+        self.name = name or f"dev{cfg.DEVICE_ID}"
+        self._ident: Optional[int] = None
+        self._lock = threading.Lock()
+        self._busy = False
+        self._pending_cprofile: Optional[float] = None  # durasi yang diminta, mulai di poll()
+        self._cprofile: Optional[Tuple[cProfile.Profile, float, float]] = None  # (prof, t0, deadline)
+
+    # ---------- thread worker ----------
+    def attach(self):
+        self._ident = threading.get_ident()
+
+    def detach(self):
+        if self._cprofile is not None:
+            self._finish_cprofile()
+        elif self._pending_cprofile is not None:
+            self._pending_cprofile = None
+            self._done()
+        self._ident = None
+
+    def poll(self):
+        if self._pending_cprofile is not None:
+            seconds, self._pending_cprofile = self._pending_cprofile, None
+            prof = cProfile.Profile()
+            t0 = time.perf_counter()
+            self._cprofile = (prof, t0, t0 + seconds)
+            prof.enable()
+        elif self._cprofile is not None and time.perf_counter() >= self._cprofile[2]:
+            self._finish_cprofile()
+
+    # ---------- trigger (thread mana saja) ----------
+    @property
+    def active(self) -> bool:
+        return self._busy
+
+    def request(self, seconds: Optional[float] = None, mode: Optional[str] = None) -> bool:
+        seconds = float(seconds or self.cfg.PROFILE_SEC)
+        mode = mode or self.cfg.PROFILE_MODE
+        if mode not in MODES:
+            self.log(f"[PROF] mode tidak dikenal: {mode} (pilih {MODES})")
+            return False
+        with self._lock:
+            if self._ident is None:
+                self.log("[PROF] worker belum jalan, profiling dibatalkan")
+                return False
+            if self._busy:
+                self.log("[PROF] profiling masih berjalan, permintaan diabaikan")
+                return False
+            self._busy = True
+        METRICS.set("profile.active", 1)
+        self.log(f"[PROF] {mode} {seconds:.0f}s mulai ({self.name})")
+        if mode == "sample":
+            threading.Thread(target=self._sample, args=(self._ident, seconds), daemon=True).start()
+        else:
+            self._pending_cprofile = seconds
+        return True
+
+    # ---------- sampler ----------
+    def _sample(self, ident: int, seconds: float):
+        interval = max(0.001, self.cfg.PROFILE_INTERVAL_MS / 1000.0)
+        stacks: Dict[tuple, int] = {}
+        n = 0
+        cost = 0.0
+        t0 = time.perf_counter()
+        deadline = t0 + seconds
+        try:
+            while time.perf_counter() < deadline and self._ident == ident:
+                ts = time.perf_counter()
+                frame = sys._current_frames().get(ident)
+                if frame is not None:
+                    codes = []
+                    while frame is not None:
+                        codes.append(frame.f_code)
+                        frame = frame.f_back
+                    key = tuple(reversed(codes))
+                    stacks[key] = stacks.get(key, 0) + 1
+                    n += 1
+                cost += time.perf_counter() - ts
+                time.sleep(interval)
+            elapsed = time.perf_counter() - t0
+            METRICS.set("profile.overhead_pct", round(100.0 * cost / max(elapsed, 1e-9), 3))
+            self._write_samples(stacks, n, elapsed)
+        except Exception as e:
+            self.log(f"[PROF] ERROR sampler: {e}")
+        finally:
+            self._done()
+
+    def _write_samples(self, stacks: Dict[tuple, int], n: int, elapsed: float):
+        prefix = self._prefix("sample")
+        labels: Dict[object, str] = {}
+
+        def label(code):
+            s = labels.get(code)
+            if s is None:
+                s = labels[code] = _frame_label(code)
+            return s
+
+        self_counts: Dict[str, int] = {}
+        total_counts: Dict[str, int] = {}
+        with open(prefix + ".folded", "w", encoding="utf-8") as f:
+            for key, count in sorted(stacks.items(), key=lambda kv: -kv[1]):
+                names = [label(c) for c in key]
+                f.write(";".join(n_.replace(";", ":") for n_ in names) + f" {count}\n")
+                self_counts[names[-1]] = self_counts.get(names[-1], 0) + count
+                for name in set(names):  # rekursi dihitung sekali per stack
+                    total_counts[name] = total_counts.get(name, 0) + count
+
+        top = max(1, self.cfg.PROFILE_TOP)
+        lines = [
+            f"# {self.name} sample {elapsed:.1f}s, {n} sampel @ {self.cfg.PROFILE_INTERVAL_MS}ms, "
+            f"overhead {METRICS.get('profile.overhead_pct')}%",
+            "",
+            f"{'self%':>7} {'total%':>7}  fungsi",
+        ]
+        for name, count in sorted(self_counts.items(), key=lambda kv: -kv[1])[:top]:
+            lines.append(f"{100.0 * count / max(n, 1):7.2f} {100.0 * total_counts[name] / max(n, 1):7.2f}  {name}")
+        lines += ["", f"{'total%':>7}  fungsi (inklusif)"]
+        for name, count in sorted(total_counts.items(), key=lambda kv: -kv[1])[:top]:
+            lines.append(f"{100.0 * count / max(n, 1):7.2f}  {name}")
+        with open(prefix + "_top.txt", "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        self.log(f"[PROF] selesai: {prefix}.folded ({n} sampel), {prefix}_top.txt")
+
+    # ---------- cProfile ----------
+    def _finish_cprofile(self):
+        prof, t0, _ = self._cprofile
+        prof.disable()
+        self._cprofile = None
+        elapsed = time.perf_counter() - t0
+        # dump + format di thread lain: loop worker langsung lanjut
+        threading.Thread(target=self._write_cprofile, args=(prof, elapsed), daemon=True).start()
+
+    def _write_cprofile(self, prof: cProfile.Profile, elapsed: float):
+        try:
+            prefix = self._prefix("cprofile")
+            prof.dump_stats(prefix + ".prof")
+            buf = StringIO()
+            buf.write(f"# {self.name} cprofile {elapsed:.1f}s\n")
+            stats = pstats.Stats(prof, stream=buf).strip_dirs()
+            stats.sort_stats("tottime").print_stats(self.cfg.PROFILE_TOP)
+            stats.sort_stats("cumulative").print_stats(self.cfg.PROFILE_TOP)
+            with open(prefix + "_top.txt", "w", encoding="utf-8") as f:
+                f.write(buf.getvalue())
+            self.log(f"[PROF] selesai: {prefix}.prof, {prefix}_top.txt")
+        except Exception as e:
+            self.log(f"[PROF] ERROR tulis cprofile: {e}")
+        finally:
+            self._done()
+
+    def _prefix(self, mode: str) -> str:
+        os.makedirs(self.cfg.PROFILE_DIR, exist_ok=True)
+        return os.path.join(self.cfg.PROFILE_DIR, f"{time.strftime('%Y%m%d_%H%M%S')}_{self.name}_{mode}")
+
+    def _done(self):
+        with self._lock:
+            self._busy = False
+        METRICS.set("profile.active", 0)
@@ -0,0 +1,132 @@
+# result_cache.py
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from inference import Detection
+
+
+def hash_bytes(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+_MODEL_HASHES: Dict[Tuple[str, int, float], str] = {}
+
+
+def model_fingerprint(path: str) -> str:
+    """
+    Hash isi file model (di-cache per (path, size, mtime)).
+    Model standar yang belum ada di disk (mis. 'yolov8n.pt') -> hash nama.
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return "name:" + os.path.basename(path)
+    key = (os.path.abspath(path), st.st_size, st.st_mtime)
+    fp = _MODEL_HASHES.get(key)
+    if fp is None:
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+        fp = h.hexdigest()
+        _MODEL_HASHES[key] = fp
+    return fp
+
+
+def cache_key(image_hash: str, model_fp: str, params: Optional[Dict] = None) -> str:
+    """image_hash = hash bytes file; pemanggil wajib predict pada hasil cv2.imdecode (BGR) dari bytes itu."""
+    p = json.dumps(params or {}, sort_keys=True, separators=(",", ":"))
+    return hash_bytes(f"{image_hash}|{model_fp}|{p}".encode())
+
+
+class ResultCache:
+    """
+    Cache hasil inferensi persisten: key = (hash isi gambar, hash file model, setting inferensi).
+
+    SQLite (WAL) supaya bisa dipakai bersama batch tool, Streamlit, dan benchmark replay
+    (beda proses) sekaligus. Ukuran dibatasi CACHE_MAX_MB, eviction LRU berdasarkan last_access.
+    """
+    def __init__(self, path: str, max_mb: int = 512):
+        self.path = path
+        self.max_bytes = int(max_mb) * 1024 * 1024
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS results (
+              key TEXT PRIMARY KEY,
+              value BLOB NOT NULL,
+              size INTEGER NOT NULL,
+              last_access REAL NOT NULL
+            )
+            """
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_results_access ON results(last_access)")
+        self._total = self._sum_size()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[List[Detection]]:
+        with self._lock:
+            row = self.conn.execute("SELECT value FROM results WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.conn.execute("UPDATE results SET last_access = ? WHERE key = ?", (time.time(), key))
+            self.hits += 1
+        return [Detection(r[0], r[1], r[2], tuple(r[3]), *r[4:]) for r in json.loads(row[0])]
+
+    def put(self, key: str, dets: List[Detection]):
+        value = json.dumps([
+            [d.cls, d.name, d.conf, list(d.xyxy)] + ([] if d.confirmed else [False]) for d in dets
+        ]).encode()
+        size = len(value) + len(key)
+        with self._lock:
+            old = self.conn.execute("SELECT size FROM results WHERE key = ?", (key,)).fetchone()
+            self.conn.execute(
+                "INSERT OR REPLACE INTO results (key, value, size, last_access) VALUES (?, ?, ?, ?)",
+                (key, value, size, time.time()),
+            )
+            self._total += size - (old[0] if old else 0)
+            if self._total > self.max_bytes:
+                # proses lain juga menulis -> sinkronkan total dulu sebelum evict
+                self._total = self._sum_size()
+                if self._total > self.max_bytes:
+                    self._evict()
+
+    def _sum_size(self) -> int:
+        return self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+
+    def _evict(self):
+        # buang yang paling lama tidak dipakai sampai tersisa ~90%
+        target = self._total - int(self.max_bytes * 0.9)
+        freed = 0
+        victims = []
+        for key, size in self.conn.execute("SELECT key, size FROM results ORDER BY last_access ASC"):
+            victims.append((key,))
+            freed += size
+            if freed >= target:
+                break
+        self.conn.executemany("DELETE FROM results WHERE key = ?", victims)
+        self._total -= freed
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            n, total = self.conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results").fetchone()
+        return {"entries": n, "bytes": total, "hits": self.hits, "misses": self.misses}
+
+    def close(self):
+        self.conn.close()
+
+
+def open_cache(cfg) -> ResultCache:
+    return ResultCache(cfg.CACHE_PATH, cfg.CACHE_MAX_MB)
@@ -0,0 +1,145 @@
+# soak_test.py
+"""
+Soak test memori: jalankan VideoWorker (loop asli: anotasi, recorder, history, stream hub)
+dengan frame sintetis + backend palsu (testkit) selama berjam-jam, sampling RSS, lalu cek RSS datar.
+
+Lulus kalau setelah warm-up:
+  - RSS max - RSS awal (setelah warm-up) <= --max-growth MB, dan
+  - slope regresi RSS <= --max-slope MB/jam (dicek kalau growth > --noise-mb)
+Exit code 1 kalau gagal (bisa dipakai di CI / cron malam).
+
+Contoh:
+  python soak_test.py --hours 4
+  python soak_test.py --minutes 10 --fps 30 --width 1920 --height 1080 --sample-sec 10
+  python soak_test.py --minutes 10 --stalled-ui      # GUI tidak pernah ack -> frame harus di-drop, bukan menumpuk
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import threading
+from dataclasses import replace
+
+from PyQt5 import QtCore
+
+from config import AppConfig
+from memory_monitor import MemoryMonitor, rss_bytes
+from metrics import METRICS
+from stream_server import StreamHub
+from testkit import FakeBackend, FakeDb, SyntheticCapture
+
+
+def make_worker(cfg: AppConfig, args, hub: StreamHub):
+    from video_worker import VideoWorker
+
+    class SoakWorker(VideoWorker):
+        def _open_camera(self):
+            return SyntheticCapture(args.width, args.height, args.fps), "synthetic"
+
+    tg = type("NoTelegram", (), {"enqueue_photo": lambda self, *a, **kw: False})()
+    return SoakWorker(cfg, FakeBackend(cfg, args.phase_sec), tg, stream_hub=hub)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Soak test memori VideoWorker (frame sintetis)")
+    ap.add_argument("--hours", type=float, default=0.0)
+    ap.add_argument("--minutes", type=float, default=0.0)
+    ap.add_argument("--fps", type=float, default=15)
+    ap.add_argument("--width", type=int, default=1280)
+    ap.add_argument("--height", type=int, default=720)
+    ap.add_argument("--phase-sec", type=float, default=20)
+    ap.add_argument("--sample-sec", type=float, default=30)
+    ap.add_argument("--warmup-min", type=float, default=5)
+    ap.add_argument("--max-slope", type=float, default=2.0, help="MB/jam")
+    ap.add_argument("--max-growth", type=float, default=20.0, help="MB setelah warm-up")
+    ap.add_argument("--noise-mb", type=float, default=5.0,
+                    help="growth di bawah ini dianggap noise (slope tidak dicek; run pendek slope-nya noisy)")
+    ap.add_argument("--stalled-ui", action="store_true", help="GUI tidak pernah ack frame")
+    ap.add_argument("--tracemalloc", action="store_true")
+    args = ap.parse_args()
+    duration = args.hours * 3600 + args.minutes * 60 or 600.0
+
+    tmp = tempfile.mkdtemp(prefix="soak_")
+    cfg = replace(
+        AppConfig(),
+        TG_BOT_TOKEN="", DB_UPLOAD_ENABLED=False, FRAME_BUS_NAME="",
+        REC_ENABLED=True, REC_DIR=os.path.join(tmp, "rec"),
+        HIST_ENABLED=True, HIST_DIR=os.path.join(tmp, "hist"),
+        DEAD_HITS_REQUIRED=5, RECOVER_AFTER_SEC=5, DB_COOLDOWN_SEC=60,
+        MEM_SAMPLE_SEC=args.sample_sec, MEM_TRACEMALLOC=args.tracemalloc,
+    )
+
+    with FakeDb(thresholds={cfg.DEVICE_ID: (10, 20, 30)}).installed():
+        sys.exit(run(cfg, args, duration, tmp))
+
+
+def run(cfg: AppConfig, args, duration: float, tmp: str) -> int:
+    hub = StreamHub()
+    worker = make_worker(cfg, args, hub)
+    n_errors = [0]
+
+    def on_log(msg: str):
+        # error cukup ditampilkan beberapa kali
+        if "ERROR" in msg:
+            n_errors[0] += 1
+            if n_errors[0] <= 5:
+                print(msg, flush=True)
+
+    def on_frame(img):
+        img.copy()  # seperti QPixmap.fromImage di GUI: salin lalu lepas buffer
+        worker.frame_consumed()
+
+    # tanpa event loop Qt -> koneksi harus direct (dipanggil di thread worker)
+    worker.log_signal.connect(on_log, QtCore.Qt.DirectConnection)
+    if not args.stalled_ui:
+        worker.frame_updated.connect(on_frame, QtCore.Qt.DirectConnection)
+
+    monitor = MemoryMonitor(cfg, log=lambda msg: print(msg, flush=True))
+    t = threading.Thread(target=worker.run, daemon=True)
+    t.start()
+    monitor.start()
+
+    print(f"[SOAK] {duration / 60:.0f} menit, {args.width}x{args.height}@{args.fps}fps, dir={tmp}", flush=True)
+    t0 = time.time()
+    next_report = t0 + 300
+    try:
+        while time.time() - t0 < duration and t.is_alive():
+            time.sleep(1.0)
+            if time.time() >= next_report:
+                next_report += 300
+                m = METRICS.snapshot()
+                print(
+                    f"[SOAK] t={(time.time() - t0) / 60:.0f}m rss={m.get('mem.rss_mb')}MB "
+                    f"frames={m.get('video.frames', 0)} ui_dropped={m.get('video.ui_dropped', 0)}",
+                    flush=True,
+                )
+    except KeyboardInterrupt:
+        pass
+
+    monitor.sample()
+    worker.running = False
+    t.join(timeout=10)
+    monitor.stop()
+
+    warmup = args.warmup_min * 60
+    post = [m for ts, m in monitor.samples if ts >= t0 + warmup]
+    if len(post) < 3:
+        print("[SOAK] terlalu sedikit sampel setelah warm-up (perpanjang durasi / kecilkan --sample-sec)")
+        return 2
+    slope = monitor.slope_mb_per_hour(skip_sec=warmup)
+    growth = max(post) - post[0]
+    frames = METRICS.get("video.frames")
+    print(
+        f"[SOAK] frames={frames} ({frames / max(time.time() - t0, 1e-6):.1f} fps) "
+        f"ui_dropped={METRICS.get('video.ui_dropped')} "
+        f"rss_start={post[0]:.1f}MB rss_end={post[-1]:.1f}MB rss_max={max(post):.1f}MB "
+        f"slope={slope:+.2f}MB/jam growth={growth:.1f}MB (now {rss_bytes() / 1e6:.1f}MB)"
+    )
+    ok = growth <= args.max_growth and (growth <= args.noise_mb or slope <= args.max_slope)
+    print("[SOAK] PASS" if ok else "[SOAK] FAIL: RSS naik terus (kemungkinan leak)")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+# stream_server.py
+"""
+Streaming MJPEG ringan untuk melihat feed ter-anotasi dari jauh (tanpa VNC).
+
+  GET /                -> halaman viewer
+  GET /stream.mjpg     -> multipart MJPEG (adaptif: resolusi/kualitas turun kalau client lambat)
+      ?w=640&q=60      -> paksa profil terdekat (tanpa adaptasi)
+  GET /snapshot.jpg    -> 1 frame terbaru
+  GET /status          -> JSON status hub (+ provider tambahan)
+  (hub=None -> hanya /status, mis. mode multi-device)
+
+Thread video cuma menyalin frame (publish); encode JPEG dikerjakan thread client,
+sekali per (frame, profil) berapapun jumlah viewer. Client lambat selalu dapat frame terbaru
+(frame di antaranya di-skip), tidak ada antrean per client.
+"""
+import json
+import time
+import select
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from config import AppConfig
+
+# (max_width, jpeg_quality), dari kualitas tertinggi ke terendah
+PROFILES: List[Tuple[int, int]] = [(1280, 80), (960, 70), (640, 60), (480, 50), (320, 40)]
+BOUNDARY = "aikentangframe"
+
+
+class StreamHub:
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._frame = None
+        self._ts = 0.0
+        self.seq = 0
+
+        # profil -> (seq, jpg); lock per profil supaya encode tidak dobel
+        self._encoded: Dict[int, Tuple[int, bytes]] = {}
+        self._enc_locks = [threading.Lock() for _ in PROFILES]
+
+        self.viewers = 0
+        self.encodes = 0
+        self._viewers_lock = threading.Lock()
+
+    # ---------- thread video ----------
+    def publish(self, frame_bgr, ts: Optional[float] = None):
+        """
+        Frame disalin: buffer pemanggil (FramePool) dipakai ulang untuk frame berikutnya, sedangkan
+        thread client meng-encode kapan saja. Salinan milik hub tidak pernah ditulis lagi.
+        """
+        frame_bgr = frame_bgr.copy()
+        with self._cond:
+            self._frame = frame_bgr
+            self._ts = time.time() if ts is None else ts
+            self.seq += 1
+            self._cond.notify_all()
+
+    @property
+    def has_viewers(self) -> bool:
+        return self.viewers > 0
+
+    # ---------- thread client ----------
+    def wait_frame(self, last_seq: int, timeout: float = 2.0) -> Tuple[int, object, float]:
+        with self._cond:
+            self._cond.wait_for(lambda: self.seq > last_seq, timeout=timeout)
+            return self.seq, self._frame, self._ts
+
+    def jpeg(self, profile: int, seq: int, frame) -> bytes:
+        cached = self._encoded.get(profile)
+        if cached is not None and cached[0] >= seq:
+            return cached[1]
+        with self._enc_locks[profile]:
+            cached = self._encoded.get(profile)
+            if cached is not None and cached[0] >= seq:
+                return cached[1]
+            import cv2  # lazy: main.py meng-import modul ini sebelum window tampil
+
+            max_w, quality = PROFILES[profile]
+            h, w = frame.shape[:2]
+            if w > max_w:
+                frame = cv2.resize(frame, (max_w, int(h * max_w / w)), interpolation=cv2.INTER_AREA)
+            ok, buf = cv2.imencode(".jpg", frame, [int(cv2.IMWRITE_JPEG_QUALITY), quality])
+            jpg = buf.tobytes() if ok else b""
+            self._encoded[profile] = (seq, jpg)
+            self.encodes += 1
+            return jpg
+
+    def add_viewer(self, delta: int):
+        with self._viewers_lock:
+            self.viewers += delta
+
+    def status(self) -> Dict:
+        return {
+            "seq": self.seq,
+            "last_frame_age_sec": round(time.time() - self._ts, 3) if self._ts else None,
+            "viewers": self.viewers,
+            "encodes": self.encodes,
+        }
+
+
+def nearest_profile(width: Optional[int], quality: Optional[int]) -> int:
+    best, best_score = 0, None
+    for i, (w, q) in enumerate(PROFILES):
+        score = abs(w - (width or w)) / 100.0 + abs(q - (quality or q)) / 10.0
+        if best_score is None or score < best_score:
+            best, best_score = i, score
+    return best
+
+
+_INDEX_HTML = """<!doctype html>
+<html><head><meta name="viewport" content="width=device-width, initial-scale=1">
+<title>Deteksi Kentang - Device {device_id}</title>
+<style>body{{margin:0;background:#111;color:#eee;font-family:sans-serif;text-align:center}}
+img{{max-width:100vw;max-height:92vh}}</style></head>
+<body><div>Device {device_id} &middot; <a style="color:#9cf" href="/status">status</a></div>
+<img src="/stream.mjpg"></body></html>
+"""
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "AikentangStream/1.0"
+    hub: Optional[StreamHub]
+    cfg: AppConfig
+    status_provider: Optional[Callable[[], Dict]] = None
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        qs = parse_qs(url.query)
+        if self.hub is None and url.path != "/status":
+            self._send(404, "text/plain", b"video stream disabled; see /status")
+        elif url.path == "/":
+            self._send(200, "text/html; charset=utf-8", _INDEX_HTML.format(device_id=self.cfg.DEVICE_ID).encode())
+        elif url.path == "/snapshot.jpg":
+            seq, frame, _ = self.hub.wait_frame(0, timeout=2.0)
+            if frame is None:
+                self._send(503, "text/plain", b"no frame yet")
+                return
+            prof = nearest_profile(_int(qs, "w"), _int(qs, "q"))
+            self._send(200, "image/jpeg", self.hub.jpeg(prof, seq, frame))
+        elif url.path == "/status":
+            data = {"stream": self.hub.status()} if self.hub is not None else {}
+            if self.status_provider is not None:
+                data.update(self.status_provider())
+            self._send(200, "application/json", json.dumps(data, default=str).encode())
+        elif url.path == "/stream.mjpg":
+            self._stream(qs)
+        else:
+            self._send(404, "text/plain", b"not found")
+
+    def _send(self, code: int, ctype: str, body: bytes):
+        self.send_response(code)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _stream(self, qs):
+        fixed = _int(qs, "w") is not None or _int(qs, "q") is not None
+        prof = nearest_profile(_int(qs, "w"), _int(qs, "q")) if fixed else 1
+        min_interval = 1.0 / max(1.0, float(self.cfg.STREAM_MAX_FPS))
+
+        self.send_response(200)
+        self.send_header("Content-Type", f"multipart/x-mixed-replace; boundary={BOUNDARY}")
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+
+        self.hub.add_viewer(+1)
+        last_seq, fast_streak, jpg = 0, 0, b""
+        try:
+            while True:
+                seq, frame, _ = self.hub.wait_frame(last_seq, timeout=5.0)
+                if frame is None or seq == last_seq:
+                    # tidak ada frame baru (worker berhenti): kirim ulang frame terakhir supaya
+                    # client yang sudah putus ketahuan dari write yang gagal, thread tidak bocor
+                    if jpg:
+                        self._write_part(jpg)
+                    elif self._client_gone():
+                        return
+                    continue
+                last_seq = seq
+                jpg = self.hub.jpeg(prof, seq, frame)
+
+                t0 = time.monotonic()
+                self._write_part(jpg)
+                send_sec = time.monotonic() - t0
+
+                # adaptasi: kirim lebih lama dari budget -> turun profil; konsisten cepat -> naik
+                if not fixed:
+                    if send_sec > min_interval and prof < len(PROFILES) - 1:
+                        prof, fast_streak = prof + 1, 0
+                    elif send_sec < min_interval * 0.25:
+                        fast_streak += 1
+                        if fast_streak >= 30 and prof > 0:
+                            prof, fast_streak = prof - 1, 0
+                    else:
+                        fast_streak = 0
+
+                rest = min_interval - send_sec
+                if rest > 0:
+                    time.sleep(rest)
+        except (BrokenPipeError, ConnectionResetError, TimeoutError, OSError):
+            pass
+        finally:
+            self.hub.add_viewer(-1)
+
+
+    def _write_part(self, jpg: bytes):
+        self.wfile.write(
+            f"--{BOUNDARY}\r\nContent-Type: image/jpeg\r\nContent-Length: {len(jpg)}\r\n\r\n".encode()
+        )
+        self.wfile.write(jpg)
+        self.wfile.write(b"\r\n")
+        self.wfile.flush()
+
+    def _client_gone(self) -> bool:
+        """Belum ada frame untuk dikirim: cek EOF dari client tanpa menulis."""
+        readable, _, _ = select.select([self.connection], [], [], 0)
+        if not readable:
+            return False
+        try:
+            return self.connection.recv(1, socket.MSG_PEEK) == b""
+        except OSError:
+            return True
+
+
+def _int(qs, key: str) -> Optional[int]:
+    try:
+        return int(qs[key][0])
+    except (KeyError, ValueError, IndexError):
+        return None
+
+
+class StreamServer:
+    def __init__(self, cfg: AppConfig, hub: Optional[StreamHub], status_provider: Optional[Callable[[], Dict]] = None):
+        self.cfg = cfg
+        self.hub = hub
+        handler = type("StreamHandler", (_Handler,), {
+            "hub": hub, "cfg": cfg, "status_provider": staticmethod(status_provider) if status_provider else None,
+        })
+        self.httpd = ThreadingHTTPServer((cfg.STREAM_HOST, cfg.STREAM_PORT), handler)
+        self.httpd.daemon_threads = True
+        self.thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
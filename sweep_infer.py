@@ -0,0 +1,332 @@
+# sweep_infer.py
+"""
+Sweep parameter inferensi (imgsz, conf, iou, max_det, half, classes) di rekaman lapangan:
+kecepatan per frame vs recall kelas dead. Hasilnya dipakai untuk mengisi INFER_* di .env.
+
+Input: file video (rekaman EventRecorder .mjpeg/.avi/.mp4) dan/atau folder/file gambar.
+
+Kebenaran (ground truth):
+  --labels DIR -> label YOLO (<stem>.txt: "cls cx cy w h" relatif) untuk input gambar
+  default      -> deteksi kombinasi referensi (--ref-imgsz, --ref-conf; model yang sama, setting mahal).
+                  Hasil referensi disimpan di result cache (CACHE_PATH) -> sweep ulang tidak menghitung lagi.
+Box dead dihitung kalau conf >= DEAD_CONF (sama seperti VideoWorker); cocok kalau IoU >= --match-iou.
+
+Per kombinasi: ms/frame (p50, p95, batch 1 seperti realtime), fps, recall box dead, recall frame
+(frame yang mengandung dead terdeteksi dead), precision box dead. '*' = Pareto (tidak ada kombinasi
+lain yang lebih cepat DAN recall-nya lebih tinggi).
+
+Contoh:
+  python sweep_infer.py recordings/ --imgsz 320,416,512,640 --half 0,1
+  python sweep_infer.py data/val/images --labels data/val/labels --conf 0.1,0.25 --classes ",dead,healthy"
+  python sweep_infer.py rec.mjpeg --server --out sweep.csv
+"""
+import os
+import sys
+import csv
+import time
+import argparse
+import itertools
+import statistics
+from typing import Dict, List, Sequence, Tuple
+
+import cv2
+
+from config import AppConfig, model_path_for_age
+from inference import ULTRALYTICS_DEFAULTS, Detection, infer_params
+
+IMAGE_EXTS = (".jpg", ".jpeg", ".png", ".bmp", ".webp")
+VIDEO_EXTS = (".mjpeg", ".mjpg", ".avi", ".mp4", ".mkv", ".mov")
+
+Frame = Tuple[str, "cv2.Mat"]  # (nama: path gambar / path#frame, gambar BGR)
+
+
+# ===================== INPUT =====================
+def load_frames(inputs: Sequence[str], every: int, max_frames: int) -> List[Frame]:
+    frames: List[Frame] = []
+    files: List[str] = []
+    for inp in inputs:
+        if os.path.isdir(inp):
+            for root, _, names in os.walk(inp):
+                files += [os.path.join(root, n) for n in sorted(names)]
+        else:
+            files.append(inp)
+
+    for path in files:
+        if len(frames) >= max_frames:
+            break
+        ext = os.path.splitext(path)[1].lower()
+        if ext in IMAGE_EXTS:
+            img = cv2.imread(path)
+            if img is not None:
+                frames.append((path, img))
+        elif ext in VIDEO_EXTS:
+            cap = cv2.VideoCapture(path)
+            idx = 0
+            while len(frames) < max_frames:
+                ok, img = cap.read()
+                if not ok:
+                    break
+                if idx % every == 0:
+                    frames.append((f"{path}#{idx}", img))
+                idx += 1
+            cap.release()
+    return frames
+
+
+def load_labels(label_dir: str, frames: Sequence[Frame], dead_id: int) -> List[List[Tuple[float, ...]]]:
+    out = []
+    for name, img in frames:
+        h, w = img.shape[:2]
+        stem = os.path.splitext(os.path.basename(name))[0]
+        boxes = []
+        try:
+            with open(os.path.join(label_dir, stem + ".txt"), "r", encoding="utf-8") as f:
+                for line in f:
+                    parts = line.split()
+                    if len(parts) >= 5 and int(parts[0]) == dead_id:
+                        cx, cy, bw, bh = (float(v) for v in parts[1:5])
+                        boxes.append(((cx - bw / 2) * w, (cy - bh / 2) * h, (cx + bw / 2) * w, (cy + bh / 2) * h))
+        except FileNotFoundError:
+            pass  # gambar tanpa label = tidak ada objek
+        out.append(boxes)
+    return out
+
+
+# ===================== METRIK =====================
+def _iou(a, b) -> float:
+    ix = max(0.0, min(a[2], b[2]) - max(a[0], b[0]))
+    iy = max(0.0, min(a[3], b[3]) - max(a[1], b[1]))
+    inter = ix * iy
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+def dead_boxes(dets: Sequence[Detection], cfg: AppConfig) -> List[Tuple[float, ...]]:
+    return [d.xyxy for d in dets if d.name == cfg.DEAD_CLASS_NAME and d.conf >= cfg.DEAD_CONF]
+
+
+def match(truth: Sequence, pred: Sequence, thr: float) -> int:
+    """Jumlah box truth yang ketemu pasangannya (greedy, IoU terbesar dulu, satu-satu)."""
+    pairs = sorted(
+        ((_iou(t, p), i, j) for i, t in enumerate(truth) for j, p in enumerate(pred)),
+        reverse=True,
+    )
+    used_t, used_p, n = set(), set(), 0
+    for v, i, j in pairs:
+        if v < thr:
+            break
+        if i in used_t or j in used_p:
+            continue
+        used_t.add(i)
+        used_p.add(j)
+        n += 1
+    return n
+
+
+def score(truth: List[List], preds: List[List], thr: float) -> Dict[str, float]:
+    n_truth = sum(len(t) for t in truth)
+    n_pred = sum(len(p) for p in preds)
+    hit = sum(match(t, p, thr) for t, p in zip(truth, preds))
+    dead_frames = [i for i, t in enumerate(truth) if t]
+    frame_hit = sum(1 for i in dead_frames if preds[i])
+    return {
+        "recall": hit / n_truth if n_truth else float("nan"),
+        "frame_recall": frame_hit / len(dead_frames) if dead_frames else float("nan"),
+        "precision": hit / n_pred if n_pred else float("nan"),
+        "dead_truth": n_truth,
+        "dead_pred": n_pred,
+    }
+
+
+# ===================== BACKEND =====================
+class BackendFactory:
+    """Satu model (in-process) / satu client (server) untuk semua kombinasi; params per backend."""
+    def __init__(self, cfg: AppConfig, model_path: str, use_server: bool):
+        self.cfg = cfg
+        self.model_path = model_path
+        self.use_server = use_server
+        self._model = None
+        self._client = None
+
+    def make(self, params: Dict):
+        if self.use_server:
+            from inference_server import InferenceClient, RemoteBackend
+
+            if self._client is None:
+                self._client = InferenceClient(self.cfg.INFER_SERVER_ADDR, self.cfg.INFER_SERVER_AUTHKEY)
+            return RemoteBackend(self._client, self.model_path, params)
+        from inference import YoloBackend
+
+        if self._model is None:
+            from ultralytics import YOLO
+
+            self._model = YOLO(self.model_path)
+        return YoloBackend(self._model, self.model_path, params)
+
+
+def reference_dets(cfg: AppConfig, factory: BackendFactory, frames: Sequence[Frame], params: Dict,
+                   use_cache: bool) -> List[List[Detection]]:
+    backend = factory.make(params)
+    cache = None
+    if use_cache:
+        from result_cache import cache_key, hash_bytes, model_fingerprint, open_cache
+
+        cache = open_cache(cfg)
+        model_fp = model_fingerprint(factory.model_path)
+    out = []
+    for _, img in frames:
+        key = cache_key(hash_bytes(img.tobytes()), model_fp, params) if cache is not None else None
+        dets = cache.get(key) if cache is not None else None
+        if dets is None:
+            dets = backend.predict(img)
+            if cache is not None:
+                cache.put(key, dets)
+        out.append(dets)
+    if cache is not None:
+        st = cache.stats()
+        print(f"[SWEEP] referensi: cache hits={st['hits']} misses={st['misses']}", flush=True)
+        cache.close()
+    return out
+
+
+def run_combo(backend, frames: Sequence[Frame], warmup: int) -> Tuple[List[List[Detection]], List[float]]:
+    for _, img in frames[:warmup]:
+        backend.predict(img)
+    dets, times = [], []
+    for _, img in frames:
+        t0 = time.perf_counter()
+        dets.append(backend.predict(img))
+        times.append((time.perf_counter() - t0) * 1000.0)
+    return dets, times
+
+
+# ===================== GRID =====================
+def _list(value: str, cast):
+    return [cast(v) for v in value.split(",")]
+
+
+def _classes(value: str) -> List[List]:
+    # "|" memisah alternatif; "," memisah kelas dalam satu alternatif; alternatif kosong = semua kelas
+    out = []
+    for alt in value.split("|"):
+        names = [c.strip() for c in alt.split(",") if c.strip()]
+        out.append([int(c) if c.isdigit() else c for c in names])
+    return out
+
+
+def grid(args, base: Dict) -> List[Dict]:
+    combos = []
+    for imgsz, conf, iou, max_det, half, classes in itertools.product(
+        _list(args.imgsz, int), _list(args.conf, float), _list(args.iou, float),
+        _list(args.max_det, int), _list(args.half, lambda v: bool(int(v))), _classes(args.classes),
+    ):
+        params = dict(base, imgsz=imgsz, conf=conf, iou=iou, max_det=max_det, half=half, classes=classes)
+        # buang nilai default ultralytics (sama seperti infer_params -> key cache konsisten)
+        combos.append({k: v for k, v in params.items() if v != ULTRALYTICS_DEFAULTS.get(k)})
+    return combos
+
+
+def describe(params: Dict) -> str:
+    return " ".join(f"{k}={v}" for k, v in sorted(params.items())) or "default"
+
+
+def main():
+    cfg = AppConfig()
+    ap = argparse.ArgumentParser(description="Sweep parameter inferensi: kecepatan vs recall kelas dead")
+    ap.add_argument("inputs", nargs="+", help="video rekaman dan/atau folder/file gambar")
+    ap.add_argument("--model", default=None, help="default: model untuk --umur")
+    ap.add_argument("--umur", type=int, default=10)
+    ap.add_argument("--imgsz", default="320,416,512,640")
+    ap.add_argument("--conf", default=str(cfg.INFER_CONF))
+    ap.add_argument("--iou", default=str(cfg.INFER_IOU))
+    ap.add_argument("--max-det", default=str(cfg.INFER_MAX_DET))
+    ap.add_argument("--half", default=str(int(cfg.INFER_HALF)), help="mis. 0,1")
+    ap.add_argument("--classes", default=cfg.INFER_CLASSES, help="alternatif dipisah '|', mis. '|dead,healthy'")
+    ap.add_argument("--labels", default="", help="folder label YOLO (ground truth) untuk input gambar")
+    ap.add_argument("--ref-imgsz", type=int, default=1280)
+    ap.add_argument("--ref-conf", type=float, default=0.1)
+    ap.add_argument("--match-iou", type=float, default=0.5)
+    ap.add_argument("--every", type=int, default=5, help="ambil tiap N frame dari video")
+    ap.add_argument("--max-frames", type=int, default=300)
+    ap.add_argument("--warmup", type=int, default=3)
+    ap.add_argument("--server", action="store_true", help="pakai inference server (INFER_SERVER_ADDR)")
+    ap.add_argument("--no-cache", action="store_true", help="jangan pakai result cache untuk referensi")
+    ap.add_argument("--out", default="", help="tulis hasil ke CSV")
+    args = ap.parse_args()
+
+    if args.server and not cfg.INFER_SERVER_ADDR:
+        sys.exit("--server butuh INFER_SERVER_ADDR")
+    model_path = args.model or model_path_for_age(cfg, args.umur)
+    frames = load_frames(args.inputs, max(1, args.every), args.max_frames)
+    if not frames:
+        sys.exit("tidak ada frame/gambar yang bisa dibaca")
+    factory = BackendFactory(cfg, model_path, args.server)
+
+    if args.labels:
+        names = factory.make({}).names
+        inv = {v: k for k, v in names.items()}
+        if cfg.DEAD_CLASS_NAME not in inv:
+            sys.exit(f"model {model_path} tidak punya kelas '{cfg.DEAD_CLASS_NAME}'")
+        truth = load_labels(args.labels, frames, inv[cfg.DEAD_CLASS_NAME])
+        truth_src = f"label {args.labels}"
+    else:
+        ref_params = dict(infer_params(cfg), imgsz=args.ref_imgsz, conf=args.ref_conf)
+        ref_params.pop("classes", None)
+        truth = [dead_boxes(d, cfg) for d in reference_dets(cfg, factory, frames, ref_params, not args.no_cache)]
+        truth_src = f"referensi {describe(ref_params)}"
+    print(
+        f"[SWEEP] {len(frames)} frame, model={model_path}, truth={truth_src}, "
+        f"dead box={sum(len(t) for t in truth)} di {sum(1 for t in truth if t)} frame",
+        flush=True,
+    )
+
+    rows = []
+    combos = grid(args, infer_params(cfg))
+    for i, params in enumerate(combos, 1):
+        row = {"params": describe(params)}
+        try:
+            dets, times = run_combo(factory.make(params), frames, args.warmup)
+            row.update(score(truth, [dead_boxes(d, cfg) for d in dets], args.match_iou))
+            row.update(
+                p50_ms=round(statistics.median(times), 2),
+                p95_ms=round(sorted(times)[int(0.95 * (len(times) - 1))], 2),
+                fps=round(1000.0 / max(statistics.mean(times), 1e-9), 1),
+            )
+        except Exception as e:
+            row["error"] = str(e)
+        rows.append(row)
+        print(f"[SWEEP] {i}/{len(combos)} {row['params']}: "
+              + (row.get("error") or f"{row['p50_ms']}ms recall={row['recall']:.3f}"), flush=True)
+
+    ok = [r for r in rows if "error" not in r]
+    for r in ok:
+        r["pareto"] = not any(
+            o is not r and o["p50_ms"] <= r["p50_ms"] and o["recall"] >= r["recall"]
+            and (o["p50_ms"] < r["p50_ms"] or o["recall"] > r["recall"])
+            for o in ok
+        )
+    ok.sort(key=lambda r: r["p50_ms"])
+
+    print()
+    print(f"{'':1} {'p50ms':>7} {'p95ms':>7} {'fps':>6} {'recall':>7} {'frameR':>7} {'prec':>6}  params")
+    for r in ok:
+        print(
+            f"{'*' if r['pareto'] else ' '} {r['p50_ms']:7.2f} {r['p95_ms']:7.2f} {r['fps']:6.1f} "
+            f"{r['recall']:7.3f} {r['frame_recall']:7.3f} {r['precision']:6.3f}  {r['params']}"
+        )
+    for r in rows:
+        if "error" in r:
+            print(f"  ERROR {r['params']}: {r['error']}")
+
+    if args.out:
+        keys = ["params", "p50_ms", "p95_ms", "fps", "recall", "frame_recall", "precision",
+                "dead_truth", "dead_pred", "pareto", "error"]
+        with open(args.out, "w", newline="", encoding="utf-8") as f:
+            w = csv.DictWriter(f, fieldnames=keys, extrasaction="ignore")
+            w.writeheader()
+            w.writerows(rows)
+        print(f"[SWEEP] -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,14 +2,22 @@ import time
 import threading
 import queue
 import requests
-from typing import Optional
+from typing import Callable, Dict, Hashable, Optional
 from config import AppConfig
 
 class TelegramSender:
-    def __init__(self, cfg: AppConfig, queue_size: int = 5):
+    def __init__(self, cfg: AppConfig, queue_size: int = 5, key_cooldown_sec: float = 0.0,
+                 cooldown_getter: Optional[Callable[[], float]] = None):
         self.cfg = cfg
+        # jeda antar kirim dibaca tiap kirim (live config); default TG_COOLDOWN_SEC saat dibuat
+        self.cooldown_getter = cooldown_getter or (lambda: cfg.TG_COOLDOWN_SEC)
         self.q: "queue.Queue[tuple[str, bytes, str]]" = queue.Queue(maxsize=queue_size)
         self.last_send_ts = 0.0
+        # rate limit per key (device) saat satu sender dipakai banyak device; 0 = nonaktif
+        self.key_cooldown_sec = key_cooldown_sec
+        self.last_key_ts: Dict[Hashable, float] = {}
+        self.dropped: Dict[Hashable, int] = {}
+        self._key_lock = threading.Lock()
         self.stop_event = threading.Event()
         self.thread: Optional[threading.Thread] = None
 
@@ -22,14 +30,28 @@ class TelegramSender:
     def stop(self):
         self.stop_event.set()
 
-    def enqueue_photo(self, jpg_bytes: bytes, caption: str) -> bool:
+    def queued(self) -> int:
+        return self.q.qsize()
+
+    def enqueue_photo(self, jpg_bytes: bytes, caption: str, key: Optional[Hashable] = None) -> bool:
         if not self.cfg.telegram_enabled():
             return False
-        try:
-            self.q.put_nowait(("photo", jpg_bytes, caption))
+        limited = key is not None and self.key_cooldown_sec > 0
+        now = time.time()
+        with self._key_lock:
+            if limited and now - self.last_key_ts.get(key, 0.0) < self.key_cooldown_sec:
+                self.dropped[key] = self.dropped.get(key, 0) + 1
+                return False
+            try:
+                self.q.put_nowait(("photo", jpg_bytes, caption))
+            except queue.Full:
+                # antrean penuh: cooldown tidak distempel, foto berikutnya device ini tetap boleh masuk
+                if key is not None:
+                    self.dropped[key] = self.dropped.get(key, 0) + 1
+                return False
+            if limited:
+                self.last_key_ts[key] = now
             return True
-        except queue.Full:
-            return False
 
     def _run(self):
         while not self.stop_event.is_set():
@@ -39,12 +61,12 @@ class TelegramSender:
                 continue
 
             now = time.time()
-            wait = (self.last_send_ts + self.cfg.TG_COOLDOWN_SEC) - now
+            wait = (self.last_send_ts + self.cooldown_getter()) - now
             if wait > 0:
                 time.sleep(wait)
 
             try:
-                url = f"https://api.telegram.org/bot{self.cfg.TG_BOT_TOKEN}/sendPhoto"
+                url = f"{self.cfg.TG_API_BASE}/bot{self.cfg.TG_BOT_TOKEN}/sendPhoto"
                 requests.post(
                     url,
                     data={"chat_id": self.cfg.TG_CHAT_ID, "caption": caption},
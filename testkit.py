@@ -0,0 +1,397 @@
+# testkit.py
+"""
+Perlengkapan test/benchmark tanpa hardware: semua jalur asli (VideoWorker, LiveConfig,
+DetectionUploader, TelegramSender) bisa dijalankan di PC Linux biasa.
+
+  SyntheticCapture -> pengganti cv2.VideoCapture: frame deterministik (seed + nomor frame),
+                      fps bisa diatur (0 = secepatnya), berhenti setelah max_frames
+  FakeBackend      -> detector palsu: box terjadwal per fase (detik atau jumlah frame),
+                      latency model bisa disimulasikan
+  FakeDb           -> API db_client (threshold, config, set_current, rollup, state event) di SQLite;
+                      FakeDb.installed() menukar fungsi db_client di semua modul pemakainya
+  TelegramStub     -> HTTP server lokal ala Bot API (sendPhoto); arahkan TG_API_BASE ke .base_url
+
+Contoh:
+  with FakeDb(thresholds={1: (10, 20, 30)}).installed() as db, TelegramStub() as tg:
+      cfg = replace(AppConfig(), TG_API_BASE=tg.base_url, TG_BOT_TOKEN="x", TG_CHAT_ID="1")
+      ...
+      db.current(1)  -> (0, 0, 0) setelah MALNUTRISI
+      tg.photos      -> [{"chat_id": "1", "caption": ..., "photo_bytes": ...}]
+
+Dipakai soak_test.py dan bench_pipeline.py.
+"""
+import json
+import time
+import sqlite3
+import threading
+from contextlib import contextmanager
+from email import message_from_bytes
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from config import AppConfig
+from inference import Detection
+
+# (class_name, conf, (x1, y1, x2, y2) relatif 0..1 terhadap ukuran frame)
+Box = Tuple[str, float, Tuple[float, float, float, float]]
+# (panjang fase, box di fase itu); panjang dalam detik atau jumlah frame (FakeBackend.unit)
+Phase = Tuple[float, Sequence[Box]]
+
+HEALTHY = ("healthy", 0.9, (0.1, 0.1, 0.4, 0.5))
+
+
+def dead_box(dead_class_name: str = "dead", conf: float = 0.8) -> Box:
+    return dead_class_name, conf, (0.5, 0.2, 0.8, 0.7)
+
+
+def cycle_script(dead_class_name: str = "dead", phase_len: float = 20.0) -> List[Phase]:
+    """normal -> dead (memicu MALNUTRISI) -> kosong (no_plant) -> normal; semua cabang state machine jalan."""
+    return [
+        (phase_len, [HEALTHY]),
+        (phase_len, [HEALTHY, dead_box(dead_class_name)]),
+        (phase_len, []),
+        (phase_len, [HEALTHY]),
+    ]
+
+
+# ===================== KAMERA =====================
+class SyntheticCapture:
+    """
+    Pengganti cv2.VideoCapture: frame baru tiap read() (seperti kamera asli), di-pace ke fps.
+    Isi frame hanya bergantung pada seed + nomor frame (deterministik antar run).
+    Setelah max_frames, read() -> (False, None) dan .exhausted = True.
+    """
+    def __init__(self, width: int, height: int, fps: float, seed: int = 0,
+                 max_frames: int = 0, channels: int = 3):
+        self.fps = fps
+        self.max_frames = max_frames
+        rng = np.random.default_rng(seed)
+        self.base = rng.integers(0, 255, (height, width, channels), dtype=np.uint8)
+        self.n = 0
+        self.exhausted = False
+        # perf_counter tiap read() sukses (interval per frame); hanya kalau max_frames (soak: tak terbatas)
+        self.read_ts: List[float] = []
+        self._next_ts = time.monotonic()
+
+    def isOpened(self) -> bool:
+        return True
+
+    def read(self):
+        if self.max_frames and self.n >= self.max_frames:
+            self.exhausted = True
+            return False, None
+        if self.fps > 0:
+            self._next_ts += 1.0 / self.fps
+            rest = self._next_ts - time.monotonic()
+            if rest > 0:
+                time.sleep(rest)
+            else:
+                self._next_ts = time.monotonic()
+        frame = self.base.copy()
+        h, w = frame.shape[:2]
+        x = (self.n * 7) % max(1, w - 100)
+        cv2.rectangle(frame, (x, h // 3), (x + 100, h // 3 + 100), (0, 200, 0), -1)
+        self.n += 1
+        if self.max_frames:
+            self.read_ts.append(time.perf_counter())
+        return True, frame
+
+    def release(self):
+        pass
+
+
+# ===================== MODEL =====================
+class FakeBackend:
+    """
+    Detector palsu dengan interface backend (.names, .path, predict, predict_batch).
+    script: daftar fase (panjang, box), diulang terus.
+    unit="sec"   -> fase berganti menurut waktu (seperti kamera asli)
+    unit="frame" -> fase berganti tiap N predict (deterministik, untuk CI)
+    latency_ms   -> sleep per predict (simulasi waktu inferensi); dengan imgsz (load_controller)
+                    diskalakan (imgsz / 640)^2 seperti biaya model sungguhan
+    """
+    path = "fake"
+    supports_imgsz = True
+
+    def __init__(self, cfg: AppConfig, phase_sec: float = 20.0, script: Optional[Sequence[Phase]] = None,
+                 unit: str = "sec", latency_ms: float = 0.0):
+        self.script = list(script) if script is not None else cycle_script(cfg.DEAD_CLASS_NAME, phase_sec)
+        self.unit = unit
+        self.latency_ms = latency_ms
+        self.names = {0: "healthy", 1: cfg.DEAD_CLASS_NAME}
+        self._ids = {v: k for k, v in self.names.items()}
+        self._period = sum(p[0] for p in self.script)
+        self.calls = 0
+        self.t0 = time.monotonic()
+
+    def _boxes(self) -> Sequence[Box]:
+        pos = (time.monotonic() - self.t0) if self.unit == "sec" else self.calls
+        pos %= self._period
+        for length, boxes in self.script:
+            if pos < length:
+                return boxes
+            pos -= length
+        return self.script[-1][1]
+
+    def predict(self, frame, imgsz: Optional[int] = None) -> List[Detection]:
+        boxes = self._boxes()
+        self.calls += 1
+        if self.latency_ms > 0:
+            scale = (imgsz / 640.0) ** 2 if imgsz else 1.0
+            time.sleep(self.latency_ms * scale / 1000.0)
+        h, w = frame.shape[:2]
+        return [
+            Detection(self._ids.setdefault(name, len(self._ids)), name, conf,
+                      (x1 * w, y1 * h, x2 * w, y2 * h))
+            for name, conf, (x1, y1, x2, y2) in boxes
+        ]
+
+    def predict_batch(self, frames):
+        return [self.predict(f) for f in frames]
+
+
+# ===================== DATABASE =====================
+FAKE_DB_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS configurations (
+      id INTEGER PRIMARY KEY AUTOINCREMENT,
+      device_id INTEGER NOT NULL,
+      is_active INTEGER NOT NULL DEFAULT 1,
+      deleted_at TEXT NULL,
+      data_configuration TEXT NOT NULL,
+      updated_at REAL NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS detection_rollups (
+      device_id INTEGER NOT NULL, bucket_ts TEXT NOT NULL, period_sec INTEGER NOT NULL,
+      frames INTEGER, dead_frames INTEGER, malnutrisi_frames INTEGER,
+      best_dead_conf REAL, last_state TEXT, counts TEXT,
+      PRIMARY KEY (device_id, bucket_ts, period_sec)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS detection_state_events (
+      device_id INTEGER NOT NULL, event_ts TEXT NOT NULL, state TEXT NOT NULL,
+      hits INTEGER, conf_best REAL,
+      PRIMARY KEY (device_id, event_ts, state)
+    )
+    """,
+)
+
+# modul yang meng-import fungsi db_client langsung (from db_client import ...)
+DB_CLIENT_USERS = ("db_client", "video_worker", "live_config", "db_uploader", "io_service", "actuator")
+DB_FUNCS = (
+    "get_threshold", "get_config_version", "get_data_configuration", "set_current",
+    "ensure_detection_tables", "insert_rollups", "insert_state_events",
+)
+
+
+def _ts(v) -> str:
+    return v.isoformat(sep=" ") if hasattr(v, "isoformat") else str(v)
+
+
+class FakeDb:
+    """
+    Pengganti MySQL di SQLite (default in-memory). Semantik sama dengan query db_client:
+    config aktif = baris is_active=1, deleted_at NULL, id terbesar; upsert rollup/event idempoten.
+    latency_ms -> sleep per query (simulasi DB jauh / lambat).
+    """
+    def __init__(self, path: str = ":memory:", thresholds: Optional[Dict[int, Tuple[int, int, int]]] = None,
+                 latency_ms: float = 0.0):
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.latency_ms = latency_ms
+        self.calls: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        with self._lock:
+            for ddl in FAKE_DB_SCHEMA:
+                self.conn.execute(ddl)
+        for device_id, (n, p, k) in (thresholds or {}).items():
+            self.set_configuration(device_id, {"device_configuration": {"threshold": {"n": n, "p": p, "k": k}}})
+
+    @contextmanager
+    def _query(self, name: str):
+        if self.latency_ms > 0:
+            time.sleep(self.latency_ms / 1000.0)
+        with self._lock:
+            self.calls[name] = self.calls.get(name, 0) + 1
+            yield self.conn
+            self.conn.commit()
+
+    # ---------- setup / inspeksi (dipakai test) ----------
+    def set_configuration(self, device_id: int, data: Dict):
+        """Config aktif baru untuk device (seperti admin menyimpan dari web)."""
+        with self._query("set_configuration") as c:
+            c.execute("UPDATE configurations SET is_active = 0 WHERE device_id = ?", (device_id,))
+            c.execute(
+                "INSERT INTO configurations (device_id, data_configuration, updated_at) VALUES (?, ?, ?)",
+                (device_id, json.dumps(data), time.time()),
+            )
+
+    def _active(self, c, device_id: int):
+        return c.execute(
+            "SELECT id, data_configuration, updated_at FROM configurations "
+            "WHERE device_id = ? AND is_active = 1 AND deleted_at IS NULL ORDER BY id DESC LIMIT 1",
+            (device_id,),
+        ).fetchone()
+
+    def current(self, device_id: int) -> Optional[Tuple[int, int, int]]:
+        cur = self.get_data_configuration(None, device_id).get("device_configuration", {}).get("current")
+        return (cur["n"], cur["p"], cur["k"]) if cur else None
+
+    def rows(self, table: str) -> List[Dict]:
+        with self._query("rows") as c:
+            return [dict(r) for r in c.execute(f"SELECT * FROM {table}")]
+
+    # ---------- API db_client ----------
+    def get_threshold(self, cfg: AppConfig, device_id: int) -> Dict[str, int]:
+        th = self.get_data_configuration(cfg, device_id).get("device_configuration", {}).get("threshold")
+        if th is None:
+            raise RuntimeError("Threshold tidak ditemukan (cek configurations.is_active=1).")
+        return {key: int(th.get(key) or 0) for key in ("n", "p", "k")}
+
+    def get_config_version(self, cfg: AppConfig, device_id: int) -> Optional[Tuple[int, float]]:
+        with self._query("get_config_version") as c:
+            row = self._active(c, device_id)
+        return (int(row["id"]), float(row["updated_at"])) if row else None
+
+    def get_data_configuration(self, cfg: AppConfig, device_id: int) -> Dict:
+        with self._query("get_data_configuration") as c:
+            row = self._active(c, device_id)
+        return json.loads(row["data_configuration"]) if row else {}
+
+    def set_current(self, cfg: AppConfig, device_id: int, n: int, p: int, k: int) -> int:
+        with self._query("set_current") as c:
+            row = self._active(c, device_id)
+            if row is None:
+                return 0
+            data = json.loads(row["data_configuration"])
+            data.setdefault("device_configuration", {})["current"] = {"n": n, "p": p, "k": k}
+            c.execute(
+                "UPDATE configurations SET data_configuration = ?, updated_at = ? WHERE id = ?",
+                (json.dumps(data), time.time(), row["id"]),
+            )
+            return 1
+
+    def ensure_detection_tables(self, cfg: AppConfig):
+        pass  # sudah dibuat di __init__
+
+    def insert_rollups(self, cfg: AppConfig, rows: List[Tuple]) -> int:
+        if not rows:
+            return 0
+        with self._query("insert_rollups") as c:
+            c.executemany(
+                "INSERT OR REPLACE INTO detection_rollups VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [(r[0], _ts(r[1]), *r[2:]) for r in rows],
+            )
+        return len(rows)
+
+    def insert_state_events(self, cfg: AppConfig, rows: List[Tuple]) -> int:
+        if not rows:
+            return 0
+        with self._query("insert_state_events") as c:
+            c.executemany(
+                "INSERT OR REPLACE INTO detection_state_events VALUES (?, ?, ?, ?, ?)",
+                [(r[0], _ts(r[1]), *r[2:]) for r in rows],
+            )
+        return len(rows)
+
+    @contextmanager
+    def installed(self):
+        """Tukar fungsi db_client (dan salinan `from db_client import ...`) dengan FakeDb; dikembalikan saat keluar."""
+        import importlib
+
+        saved = []
+        for mod_name in DB_CLIENT_USERS:
+            mod = importlib.import_module(mod_name)
+            for fn in DB_FUNCS:
+                if hasattr(mod, fn):
+                    saved.append((mod, fn, getattr(mod, fn)))
+                    setattr(mod, fn, getattr(self, fn))
+        try:
+            yield self
+        finally:
+            for mod, fn, orig in saved:
+                setattr(mod, fn, orig)
+
+    def close(self):
+        self.conn.close()
+
+
+# ===================== TELEGRAM =====================
+class TelegramStub:
+    """
+    Bot API palsu di 127.0.0.1 (port acak). Menerima /bot<token>/<method>, mencatat sendPhoto
+    ke .photos, membalas {"ok": true}. status=429/500 untuk menguji jalur error.
+    """
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, status: int = 200, latency_ms: float = 0.0):
+        self.status = status
+        self.latency_ms = latency_ms
+        self.requests: List[Dict] = []
+        self.photos: List[Dict] = []
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, fmt, *args):
+                pass
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                stub._record(self.path, self.headers.get("Content-Type", ""), body)
+                if stub.latency_ms > 0:
+                    time.sleep(stub.latency_ms / 1000.0)
+                ok = stub.status == 200
+                payload = json.dumps({"ok": ok} if ok else {"ok": False, "error_code": stub.status}).encode()
+                self.send_response(stub.status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _record(self, path: str, content_type: str, body: bytes):
+        parts = path.strip("/").split("/")
+        req = {"token": parts[0][3:] if parts and parts[0].startswith("bot") else "",
+               "method": parts[-1] if len(parts) > 1 else "", "ts": time.time()}
+        if content_type.startswith("multipart/"):
+            msg = message_from_bytes(b"Content-Type: " + content_type.encode() + b"\r\n\r\n" + body, policy=HTTP)
+            for part in msg.iter_parts():
+                name = part.get_param("name", header="content-disposition")
+                data = part.get_payload(decode=True) or b""
+                if part.get_filename():
+                    req[f"{name}_bytes"] = len(data)
+                else:
+                    req[name] = data.decode("utf-8", "replace")
+        with self._lock:
+            self.requests.append(req)
+            if req["method"] == "sendPhoto":
+                self.photos.append(req)
+
+    def start(self) -> "TelegramStub":
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self) -> "TelegramStub":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,6 @@
+# tests/conftest.py
+# modul aplikasi flat di root repo (tanpa package) -> root masuk sys.path supaya `pytest` jalan dari mana saja
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,36 @@
+# tests/test_bench_pipeline.py
+import os
+
+import pytest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+bench_pipeline = pytest.importorskip("bench_pipeline")  # PyQt5 + cv2
+
+LATENCY_MS = 10.0
+# budget longgar (runner CI bisa lambat); regresi besar di sekitar model tetap ketahuan
+P95_BUDGET_MS = LATENCY_MS + 40.0
+
+
+def run(*extra) -> dict:
+    # 300 frame (30 warmup) / fase 60 -> normal, dead, normal, dead, normal
+    args = bench_pipeline.build_parser().parse_args([
+        "--frames", "270", "--width", "640", "--height", "480", "--phase-frames", "60",
+        "--latency-ms", str(LATENCY_MS), *extra,
+    ])
+    return bench_pipeline.bench(args)
+
+
+@pytest.mark.parametrize("extra", [(), ("--rec", "--hist", "--stream"), ("--replicas", "3")],
+                         ids=["plain", "rec-hist-stream", "pool3"])
+def test_trigger_recover_and_budget(extra):
+    r = run(*extra)
+
+    # tiap fase dead -> satu MALNUTRISI (set current=0 + foto), tiap fase normal sesudahnya -> RECOVER
+    assert r["states"] == ["malnutrisi", "recover", "malnutrisi", "recover"]
+    assert r["db_calls"]["set_current"] == 4
+    assert r["tg_photos"] == 2
+    assert r["current"] == (11, 21, 31)  # recover: threshold FakeDb (10, 20, 30) + 1
+
+    assert r["frames"] >= 250
+    assert r["p95_ms"] <= P95_BUDGET_MS, r
@@ -0,0 +1,177 @@
+# tests/test_gst_pipeline.py
+from dataclasses import replace
+
+import pytest
+
+from gst_pipeline import CaptureSpec, build_pipeline, build_shm_reader, crop_geometry, variants
+
+BASE = CaptureSpec()
+
+
+def elements(pipeline: str):
+    return [e.strip() for e in pipeline.split(" ! ")]
+
+
+# ---------- sumber ----------
+def test_csi_source():
+    p = build_pipeline(replace(BASE, sensor_id=1, fps=60))
+    assert p.startswith("nvarguscamerasrc sensor-id=1 ! ")
+    assert "video/x-raw(memory:NVMM), width=1920, height=1080, framerate=60/1, format=NV12" in p
+    assert elements(p)[-1] == "appsink name=model drop=true max-buffers=1 sync=false"
+
+
+def test_v4l2_raw_source():
+    p = build_pipeline(replace(BASE, source="v4l2", device="/dev/video2", width=1280, height=720))
+    assert p.startswith("v4l2src device=/dev/video2 ! video/x-raw, width=1280, height=720, framerate=30/1 ! ")
+    assert "jpegdec" not in p
+
+
+def test_v4l2_mjpeg_source():
+    p = build_pipeline(replace(BASE, source="v4l2", mjpeg=True, width=1280, height=720))
+    els = elements(p)
+    assert els[1] == "image/jpeg, width=1280, height=720, framerate=30/1"
+    assert els[2] == "jpegdec"
+
+
+def test_file_source_quotes_path():
+    p = build_pipeline(replace(BASE, source="file", path="rec/a b.mp4"))
+    assert p.startswith('filesrc location="rec/a b.mp4" ! decodebin ! videoconvert')
+
+
+def test_test_source():
+    p = build_pipeline(replace(BASE, source="test", width=640, height=480))
+    assert p.startswith("videotestsrc is-live=true pattern=ball ! video/x-raw, width=640, height=480")
+
+
+@pytest.mark.parametrize("kw, msg", [
+    ({"source": "rtsp"}, "source tidak dikenal"),
+    ({"fmt": "RGB"}, "format tidak didukung"),
+    ({"source": "file"}, "butuh path"),
+])
+def test_invalid_spec(kw, msg):
+    with pytest.raises(ValueError, match=msg):
+        build_pipeline(replace(BASE, **kw))
+
+
+# ---------- format ----------
+def test_csi_bgrx_skips_videoconvert():
+    p = build_pipeline(replace(BASE, fmt="BGRx", out_size=(640, 360)))
+    assert "videoconvert" not in p
+    assert elements(p)[-2] == "video/x-raw, format=BGRx, width=640, height=360"
+
+
+def test_csi_bgr_converts_on_cpu():
+    els = elements(build_pipeline(BASE))
+    assert els[-4:-1] == ["video/x-raw, format=BGRx", "videoconvert", "video/x-raw, format=BGR"]
+
+
+# ---------- flip / crop / scale ----------
+def test_csi_flip_in_nvvidconv():
+    assert "nvvidconv flip-method=4" in build_pipeline(replace(BASE, flip_method=4))
+
+
+def test_csi_crop_after_flip():
+    p = build_pipeline(replace(BASE, flip_method=4, crop=(320, 180, 1280, 720)))
+    els = elements(p)
+    i = els.index("nvvidconv flip-method=4")
+    assert els[i + 1] == "video/x-raw(memory:NVMM), format=NV12"
+    assert els[i + 2] == "nvvidconv left=320 top=180 right=1600 bottom=900"
+
+
+def test_crop_geometry_clamps_to_frame():
+    assert crop_geometry(BASE) == (0, 0, 1920, 1080)
+    assert crop_geometry(replace(BASE, crop=(1800, 1000, 640, 480))) == (1800, 1000, 120, 80)
+    assert crop_geometry(replace(BASE, crop=(-5, -5, 4000, 4000))) == (0, 0, 1920, 1080)
+
+
+def test_crop_geometry_rotated_csi_swaps_axes():
+    # flip-method 1/3/5/7 = rotasi 90/270 -> crop di frame 1080x1920
+    assert crop_geometry(replace(BASE, flip_method=1, crop=(0, 0, 4000, 4000))) == (0, 0, 1080, 1920)
+    # rotasi tidak berlaku untuk sumber non-csi
+    assert crop_geometry(replace(BASE, source="test", flip_method=1)) == (0, 0, 1920, 1080)
+
+
+def test_generic_mirror_crop_scale_order():
+    spec = replace(BASE, source="test", width=1280, height=720, mirror=True, crop=(100, 50, 640, 480),
+                   out_size=(321, 241))
+    els = elements(build_pipeline(spec))
+    i = els.index("videoflip method=horizontal-flip")
+    assert els[i + 1] == "videocrop left=100 top=50 right=540 bottom=190"
+    assert els[i + 2] == "videoscale"
+    # ukuran ganjil dibulatkan ke genap
+    assert els[i + 3] == "video/x-raw, format=BGR, width=320, height=240"
+
+
+def test_generic_without_out_size_keeps_crop_size():
+    els = elements(build_pipeline(replace(BASE, source="test")))
+    assert els[-2] == "video/x-raw, format=BGR"
+    assert not any(e.startswith("videoflip") or e.startswith("videocrop") for e in els)
+
+
+# ---------- dual stream ----------
+def _branches(pipeline: str):
+    head, _, rest = pipeline.partition(" tee name=t ")
+    return head, [b.strip() for b in rest.split("t. ! ") if b.strip()]
+
+
+def test_csi_dual_branches():
+    spec = replace(BASE, fmt="BGRx", flip_method=4, out_size=(640, 360), display_size=(960, 540))
+    head, (model, display) = _branches(build_pipeline(spec))
+    assert head.endswith("nvvidconv flip-method=4 ! video/x-raw(memory:NVMM), format=NV12 !")
+    assert elements(model) == [
+        "queue max-size-buffers=1 leaky=downstream", "nvvidconv",
+        "video/x-raw, format=BGRx, width=640, height=360", "appsink name=model drop=true max-buffers=1 sync=false",
+    ]
+    d = elements(display)
+    assert d[:3] == ["queue max-size-buffers=1 leaky=downstream", "nvvidconv",
+                     "video/x-raw, format=BGRx, width=960, height=540"]
+    assert d[3] == ("shmsink socket-path=/tmp/aikentang_display shm-size=8294400 "
+                    "wait-for-connection=false sync=false")
+
+
+def test_generic_dual_branches():
+    spec = replace(BASE, source="v4l2", mjpeg=True, width=1280, height=720, out_size=(640, 360),
+                   display_size=(961, 541), shm_path="/tmp/x")
+    head, (model, display) = _branches(build_pipeline(spec))
+    assert head.endswith("jpegdec ! videoconvert !")
+    assert elements(model)[1:] == ["videoscale", "video/x-raw, format=BGR, width=640, height=360",
+                                   "appsink name=model drop=true max-buffers=1 sync=false"]
+    assert elements(display)[1:4] == ["videoscale", "videoconvert", "video/x-raw, format=BGRx, width=960, height=540"]
+    assert "socket-path=/tmp/x" in display
+
+
+def test_single_stream_has_no_tee():
+    for name, spec in variants():
+        if not spec.dual:
+            assert "tee" not in build_pipeline(spec), name
+
+
+def test_shm_reader_matches_display_branch():
+    spec = replace(BASE, fps=25, display_size=(961, 541), shm_path="/tmp/x")
+    assert elements(build_shm_reader(spec)) == [
+        "shmsrc socket-path=/tmp/x is-live=true do-timestamp=true",
+        "video/x-raw, format=BGRx, width=960, height=540, framerate=25/1",
+        "appsink name=display drop=true max-buffers=1 sync=false",
+    ]
+
+
+# ---------- varian bawaan ----------
+@pytest.mark.parametrize("name, spec", variants(), ids=[n for n, _ in variants()])
+def test_variants_build(name, spec):
+    p = build_pipeline(spec)
+    assert p.count("appsink name=model") == 1
+    assert p.count("shmsink") == (1 if spec.dual else 0)
+
+
+def test_variants_parse_with_gstreamer():
+    # opsional: host dengan PyGObject; elemen Jetson (nvarguscamerasrc) dilewati di non-Jetson
+    gi = pytest.importorskip("gi")
+    gi.require_version("Gst", "1.0")
+    from gi.repository import Gst
+
+    Gst.init(None)
+    for name, spec in variants():
+        if spec.source == "csi" and Gst.ElementFactory.find("nvarguscamerasrc") is None:
+            continue
+        for p in [build_pipeline(spec)] + ([build_shm_reader(spec)] if spec.dual else []):
+            Gst.parse_launch(p)
@@ -0,0 +1,128 @@
+# tests/test_worker_pool.py
+import threading
+import time
+from functools import partial
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from worker_pool import WorkerPool, parse_cores
+
+MODES = ["thread", "process"]
+
+
+class JitterBackend:
+    """Replika palsu: latency berubah per frame (frame belakangan sering selesai duluan)."""
+    names = {0: "dead"}
+    path = "fake.pt"
+    params = {}
+    supports_imgsz = True
+
+    # mode thread saja: jumlah predict yang sedang jalan (lintas replika)
+    lock = threading.Lock()
+    running = 0
+    max_running = 0
+
+    def __init__(self, index: int):
+        self.index = index
+
+    def _sleep(self, frame_id: int):
+        time.sleep(((frame_id * 7) % 5) * 0.004)
+
+    def predict(self, frame, imgsz=None):
+        frame_id = int(frame[0, 0])
+        cls = JitterBackend
+        with cls.lock:
+            cls.running += 1
+            cls.max_running = max(cls.max_running, cls.running)
+        try:
+            self._sleep(frame_id)
+        finally:
+            with cls.lock:
+                cls.running -= 1
+        return [(frame_id, imgsz, self.index)]
+
+    def predict_batch(self, frames):
+        self._sleep(len(frames))
+        return [[(int(f[0, 0]), None, self.index)] for f in frames]
+
+
+def frame(i: int):
+    return np.full((4, 4), i, dtype=np.int32)
+
+
+@pytest.fixture(params=MODES)
+def make_pool(request):
+    pools = []
+
+    def make(n=3, **kw):
+        pool = WorkerPool([partial(JitterBackend, i) for i in range(n)], mode=request.param, **kw)
+        pools.append(pool)
+        return pool
+
+    yield make
+    for pool in pools:
+        pool.close()
+
+
+def test_submit_drain_keeps_order(make_pool):
+    pool = make_pool(3)
+    out = []
+    for i in range(30):
+        out += pool.submit(frame(i), tag=i)
+    out += pool.drain()
+
+    assert [tag for tag, _, _ in out] == list(range(30))
+    assert all(dets[0][0] == tag for tag, dets, _ in out)
+    assert {dets[0][2] for _, dets, _ in out} == {0, 1, 2}  # round-robin ke semua replika
+    assert pool.pending == 0 and pool.ready() == []
+
+
+def test_submit_passes_imgsz(make_pool):
+    pool = make_pool(2)
+    out = pool.submit(frame(1), tag="a", imgsz=320) + pool.drain()
+    assert out[0][1] == [(1, 320, 0)]
+    assert pool.predict(frame(2), imgsz=416)[0][:2] == (2, 416)
+
+
+def test_max_inflight_bound(make_pool):
+    pool = make_pool(4, max_inflight=2)
+    JitterBackend.max_running = 0
+    got = []
+    for i in range(20):
+        got += pool.submit(frame(i), tag=i)
+        assert pool.pending <= 2
+    got += pool.drain()
+    assert [t for t, _, _ in got] == list(range(20))
+    if pool.mode == "thread":
+        assert JitterBackend.max_running <= 2
+
+
+def test_predict_batch_split_and_order(make_pool):
+    pool = make_pool(3)
+    out = pool.predict_batch([frame(i) for i in range(10)])
+    assert [dets[0][0] for dets in out] == list(range(10))
+    # potongan berurutan ceil(10/3)=4 per replika: [0..3], [4..7], [8, 9]
+    replicas = [dets[0][2] for dets in out]
+    assert replicas[:4] == [replicas[0]] * 4
+    assert replicas[4:8] == [replicas[4]] * 4
+    assert replicas[8:] == [replicas[8]] * 2
+    assert len({replicas[0], replicas[4], replicas[8]}) == 3
+
+    small = pool.predict_batch([frame(7), frame(8)])
+    assert [dets[0][0] for dets in small] == [7, 8]
+    assert pool.predict_batch([]) == []
+
+
+def test_warmup_hits_every_replica(make_pool):
+    pool = make_pool(3)
+    pool.warmup(frame(0))  # tidak error, semua replika menjawab
+    assert pool.names == {0: "dead"} and pool.path == "fake.pt" and pool.supports_imgsz
+
+
+def test_parse_cores():
+    assert parse_cores("", 2) == [None, None]
+    assert parse_cores("0-1;2,3", 3) == [[0, 1], [2, 3], [0, 1]]
+    auto = parse_cores("auto", 2)
+    assert len(auto) == 2 and all(auto)
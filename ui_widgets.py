@@ -1,4 +1,6 @@
 # ui_widgets.py
+import time
+
 from PyQt5 import QtWidgets, QtGui, QtCore
 
 
@@ -34,17 +36,109 @@ class ResponsiveVideoLabel(QtWidgets.QLabel):
         self.setPixmap(scaled)
 
 
+# ===== StatusPanel: style + teks per state dibuat sekali (halaman QStackedWidget per state) =====
+# state -> (bg badge, warna, font badge px, font detail px, weight detail)
+STATE_STYLES = {
+    "stopped": ("#ffffff", "#111827", 26, 18, 800),
+    "normal": ("#ffffff", "#14532d", 32, 20, 800),
+    "malnutrisi": ("#ffffff", "#7f1d1d", 30, 20, 900),
+    "loading": ("#fef9c3", "#713f12", 26, 18, 800),
+    "no_plant": ("#dbeafe", "#1e3a8a", 24, 18, 800),
+}
+
+# state -> (teks badge, teks detail); "{step}" diisi set_loading()
+STATE_TEXTS = {
+    "stopped": (
+        "⏹️  MODEL BERHENTI",
+        "DETEKSI DIMATIKAN\n\n"
+        "• Kamera & inferensi YOLO tidak berjalan\n"
+        "• Tidak ada update status ke DB\n"
+        "• Tidak ada notifikasi Telegram\n\n"
+        "Tekan START untuk menjalankan kembali",
+    ),
+    "normal": (
+        "✅  NORMAL",
+        "TANAMAN AMAN\n\n"
+        "• Monitoring kamera aktif\n"
+        "• Sistem nutrisi berjalan normal\n"
+        "• Tidak ada malnutrisi terdeteksi",
+    ),
+    "malnutrisi": (
+        "⚠️  MALNUTRISI",
+        "TERDETEKSI MALNUTRISI\n\n"
+        "Segera lakukan tindakan:\n"
+        "1. Cek pompa air (hidupkan)\n"
+        "2. Cek pompa nutrisi (hidupkan)\n"
+        "3. Periksa aliran air ke tanaman\n\n"
+        "Notifikasi Telegram telah dikirim",
+    ),
+    "loading": (
+        "⏳  MEMUAT MODEL",
+        "SISTEM SEDANG DISIAPKAN\n\n"
+        "• {step}\n"
+        "• Kamera akan aktif setelah model siap",
+    ),
+    # badge tetap fixed height, tapi teks panjang aman karena wordWrap aktif
+    "no_plant": (
+        "ℹ️  TIDAK ADA TANAMAN\nTERDETEKSI",
+        "TIDAK ADA OBJEK TANAMAN\n\n"
+        "Kemungkinan penyebab:\n"
+        "• Kamera tidak mengarah ke tanaman\n"
+        "• Tanaman di luar frame\n"
+        "• Pencahayaan terlalu gelap/terlalu terang\n"
+        "• Model belum mengenali kelas tanaman pada kondisi ini",
+    ),
+}
+
+# (key dict stats dari VideoWorker.stats_signal, label)
+STAT_FIELDS = (
+    ("fps", "FPS"),
+    ("infer_ms", "Inferensi"),
+    ("frame_ms", "Waktu/frame"),
+    ("hits", "Dead hits"),
+    ("last_alert", "Alert terakhir"),
+    ("load", "Level beban"),
+)
+
+
+def _panel_stylesheet() -> str:
+    # line-height di Qt stylesheet tidak selalu konsisten, jadi fokus ke padding + fixed height
+    rules = [
+        "QFrame#rightPanel { background: #ffffff; border: 1px solid #e5e7eb; border-radius: 18px; }",
+        "QLabel#statusTitle { font-size: 20px; font-weight: 900; color: #111827; }",
+        "QLabel#statusBadge { font-weight: 900; padding: 14px; border-radius: 16px; }",
+        "QFrame#statsBox { background: #f8fafc; border: 1px solid #e5e7eb; border-radius: 12px; }",
+        "QLabel[role=\"statKey\"] { font-size: 13px; color: #64748b; }",
+        "QLabel[role=\"statVal\"] { font-size: 15px; font-weight: 700; color: #0f172a; }",
+    ]
+    for state, (bg, fg, badge_px, detail_px, weight) in STATE_STYLES.items():
+        rules.append(
+            f'QLabel#statusBadge[state="{state}"] {{ font-size: {badge_px}px; background: {bg}; color: {fg}; }}'
+        )
+        rules.append(
+            f'QLabel#statusDetail[state="{state}"] {{ font-size: {detail_px}px; font-weight: {weight}; color: {fg}; }}'
+        )
+    return "\n".join(rules)
+
+
+PANEL_STYLESHEET = _panel_stylesheet()
+
+
 class StatusPanel(QtWidgets.QFrame):
+    """
+    Tiap state punya badge + detail sendiri (QStackedWidget), di-style sekali saat dibuat lewat
+    dynamic property "state" + satu stylesheet panel. Ganti state = setCurrentIndex: tanpa
+    setStyleSheet/re-polish dan tanpa reflow teks; state yang sama tidak menyentuh apa-apa.
+    Area stats diisi update_stats() (sudah di-throttle di worker): hanya setText yang teksnya berubah.
+    """
     def __init__(self):
         super().__init__()
         self.setObjectName("rightPanel")
-        self.setStyleSheet("""
-            QFrame#rightPanel {
-                background: #ffffff;
-                border: 1px solid #e5e7eb;
-                border-radius: 18px;
-            }
-        """)
+        self.setStyleSheet(PANEL_STYLESHEET)
+        self._state = None
+        self._index = {}
+        self.badges = {}
+        self.details = {}
 
         layout = QtWidgets.QVBoxLayout(self)
         layout.setContentsMargins(24, 24, 24, 24)
@@ -52,108 +146,116 @@ class StatusPanel(QtWidgets.QFrame):
 
         # ===== TITLE =====
         self.title = QtWidgets.QLabel("STATUS TANAMAN")
+        self.title.setObjectName("statusTitle")
         self.title.setAlignment(QtCore.Qt.AlignCenter)
-        self.title.setStyleSheet("font-size:20px; font-weight:900; color:#111827;")
         self.title.setSizePolicy(QtWidgets.QSizePolicy.Preferred, QtWidgets.QSizePolicy.Fixed)
         layout.addWidget(self.title)
 
-        # ===== BADGE (FIXED HEIGHT) =====
-        self.badge = QtWidgets.QLabel("")
-        self.badge.setAlignment(QtCore.Qt.AlignCenter)
-        self.badge.setWordWrap(True)  # penting untuk teks panjang / multiline
-        self.badge.setMinimumHeight(110)
-        self.badge.setMaximumHeight(110)  # kunci tinggi supaya tidak berubah-ubah
-        self.badge.setSizePolicy(QtWidgets.QSizePolicy.Expanding, QtWidgets.QSizePolicy.Fixed)
-        layout.addWidget(self.badge)
-
-        # ===== DETAIL (SCROLLABLE, NEVER CUT OFF) =====
-        self.detail = QtWidgets.QLabel("")
-        self.detail.setWordWrap(True)
-        self.detail.setAlignment(QtCore.Qt.AlignTop | QtCore.Qt.AlignLeft)
-        self.detail.setTextInteractionFlags(QtCore.Qt.TextSelectableByMouse)
-
-        self.detail_scroll = QtWidgets.QScrollArea()
-        self.detail_scroll.setWidgetResizable(True)
-        self.detail_scroll.setFrameShape(QtWidgets.QFrame.NoFrame)
-        self.detail_scroll.setHorizontalScrollBarPolicy(QtCore.Qt.ScrollBarAlwaysOff)
-        self.detail_scroll.setWidget(self.detail)
-        self.detail_scroll.setSizePolicy(QtWidgets.QSizePolicy.Expanding, QtWidgets.QSizePolicy.Expanding)
-        self.detail_scroll.setMinimumHeight(220)  # biar “tidak ada tanaman” nyaman dibaca
-
-        layout.addWidget(self.detail_scroll)
+        # ===== BADGE (FIXED HEIGHT) + DETAIL (SCROLLABLE, NEVER CUT OFF), SATU HALAMAN PER STATE =====
+        self.badge_stack = QtWidgets.QStackedWidget()
+        self.badge_stack.setFixedHeight(110)  # kunci tinggi supaya tidak berubah-ubah
+        self.badge_stack.setSizePolicy(QtWidgets.QSizePolicy.Expanding, QtWidgets.QSizePolicy.Fixed)
+        self.detail_stack = QtWidgets.QStackedWidget()
+        self.detail_stack.setSizePolicy(QtWidgets.QSizePolicy.Expanding, QtWidgets.QSizePolicy.Expanding)
+        self.detail_stack.setMinimumHeight(220)  # biar “tidak ada tanaman” nyaman dibaca
+
+        for state, (badge_text, detail_text) in STATE_TEXTS.items():
+            badge = QtWidgets.QLabel(badge_text)
+            badge.setObjectName("statusBadge")
+            badge.setProperty("state", state)
+            badge.setAlignment(QtCore.Qt.AlignCenter)
+            badge.setWordWrap(True)  # penting untuk teks panjang / multiline
+
+            detail = QtWidgets.QLabel(detail_text.format(step="Memuat model YOLO"))
+            detail.setObjectName("statusDetail")
+            detail.setProperty("state", state)
+            detail.setWordWrap(True)
+            detail.setAlignment(QtCore.Qt.AlignTop | QtCore.Qt.AlignLeft)
+            detail.setTextInteractionFlags(QtCore.Qt.TextSelectableByMouse)
+
+            scroll = QtWidgets.QScrollArea()
+            scroll.setWidgetResizable(True)
+            scroll.setFrameShape(QtWidgets.QFrame.NoFrame)
+            scroll.setHorizontalScrollBarPolicy(QtCore.Qt.ScrollBarAlwaysOff)
+            scroll.setWidget(detail)
+
+            self._index[state] = self.badge_stack.addWidget(badge)
+            self.detail_stack.addWidget(scroll)
+            self.badges[state] = badge
+            self.details[state] = detail
+
+        layout.addWidget(self.badge_stack)
+        layout.addWidget(self.detail_stack)
+
+        # ===== LIVE STATS (FIXED HEIGHT, STYLE TIDAK PERNAH BERUBAH) =====
+        stats_box = QtWidgets.QFrame()
+        stats_box.setObjectName("statsBox")
+        grid = QtWidgets.QGridLayout(stats_box)
+        grid.setContentsMargins(12, 10, 12, 10)
+        grid.setHorizontalSpacing(12)
+        grid.setVerticalSpacing(4)
+        self.stat_values = {}
+        for row, (key, label) in enumerate(STAT_FIELDS):
+            k = QtWidgets.QLabel(label)
+            k.setProperty("role", "statKey")
+            v = QtWidgets.QLabel("-")
+            v.setProperty("role", "statVal")
+            v.setAlignment(QtCore.Qt.AlignRight | QtCore.Qt.AlignVCenter)
+            grid.addWidget(k, row, 0)
+            grid.addWidget(v, row, 1)
+            self.stat_values[key] = v
+        stats_box.setSizePolicy(QtWidgets.QSizePolicy.Expanding, QtWidgets.QSizePolicy.Fixed)
+        layout.addWidget(stats_box)
 
         self.set_stopped()
 
-    # ===== Helpers: apply style without changing geometry =====
-    def _set_badge_style(self, font_px: int, bg: str, fg: str):
-        # line-height di Qt stylesheet tidak selalu konsisten, jadi fokus ke padding + fixed height
-        self.badge.setStyleSheet(f"""
-            QLabel {{
-                font-size: {font_px}px;
-                font-weight: 900;
-                padding: 14px;
-                border-radius: 16px;
-                background: {bg};
-                color: {fg};
-            }}
-        """)
-
-    def _set_detail_style(self, font_px: int, fg: str, weight: int = 800):
-        self.detail.setStyleSheet(f"""
-            QLabel {{
-                font-size: {font_px}px;
-                font-weight: {weight};
-                color: {fg};
-            }}
-        """)
+    # ===== Helpers =====
+    def _apply_state(self, state: str):
+        if state == self._state:
+            return
+        self._state = state
+        i = self._index[state]
+        self.badge_stack.setCurrentIndex(i)
+        self.detail_stack.setCurrentIndex(i)
+
+    def _set_stat(self, key: str, text: str):
+        label = self.stat_values[key]
+        if label.text() != text:
+            label.setText(text)
+
+    # ===== Live stats =====
+    def update_stats(self, stats: dict):
+        self._set_stat("fps", f"{stats.get('fps', 0):.1f}")
+        self._set_stat("infer_ms", f"{stats.get('infer_ms', 0):.0f} ms")
+        self._set_stat("frame_ms", f"{stats.get('frame_ms', 0):.0f} ms")
+        self._set_stat("hits", f"{stats.get('dead_hits', 0)} / {stats.get('hits_required', 0)}")
+        ts = stats.get("last_alert_ts") or 0
+        self._set_stat("last_alert", time.strftime("%H:%M:%S", time.localtime(ts)) if ts else "-")
+        level, levels = stats.get("load_level", 0), stats.get("load_levels", 1)
+        self._set_stat("load", f"{level}/{levels - 1}" if levels > 1 else "-")
+
+    def clear_stats(self):
+        for key in self.stat_values:
+            self._set_stat(key, "-")
 
     # ===== States =====
     def set_stopped(self):
-        self.badge.setText("⏹️  MODEL BERHENTI")
-        self._set_badge_style(font_px=26, bg="#ffffff", fg="#111827")
-        self._set_detail_style(font_px=18, fg="#111827", weight=800)
-        self.detail.setText(
-            "DETEKSI DIMATIKAN\n\n"
-            "• Kamera & inferensi YOLO tidak berjalan\n"
-            "• Tidak ada update status ke DB\n"
-            "• Tidak ada notifikasi Telegram\n\n"
-            "Tekan START untuk menjalankan kembali"
-        )
+        self._apply_state("stopped")
+        self.clear_stats()
 
     def set_normal(self):
-        self.badge.setText("✅  NORMAL")
-        self._set_badge_style(font_px=32, bg="#ffffff", fg="#14532d")
-        self._set_detail_style(font_px=20, fg="#14532d", weight=800)
-        self.detail.setText(
-            "TANAMAN AMAN\n\n"
-            "• Monitoring kamera aktif\n"
-            "• Sistem nutrisi berjalan normal\n"
-            "• Tidak ada malnutrisi terdeteksi"
-        )
+        self._apply_state("normal")
 
     def set_malnutrisi(self):
-        self.badge.setText("⚠️  MALNUTRISI")
-        self._set_badge_style(font_px=30, bg="#ffffff", fg="#7f1d1d")
-        self._set_detail_style(font_px=20, fg="#7f1d1d", weight=900)
-        self.detail.setText(
-            "TERDETEKSI MALNUTRISI\n\n"
-            "Segera lakukan tindakan:\n"
-            "1. Cek pompa air (hidupkan)\n"
-            "2. Cek pompa nutrisi (hidupkan)\n"
-            "3. Periksa aliran air ke tanaman\n\n"
-            "Notifikasi Telegram telah dikirim"
-        )
+        self._apply_state("malnutrisi")
+
+    def set_loading(self, step: str = ""):
+        # hanya halaman loading yang teksnya berubah (langkah load model)
+        detail = self.details["loading"]
+        text = STATE_TEXTS["loading"][1].format(step=step or "Memuat model YOLO")
+        if detail.text() != text:
+            detail.setText(text)
+        self._apply_state("loading")
 
     def set_no_plant(self):
-        # badge tetap fixed height, tapi teks panjang aman karena wordWrap aktif
-        self.badge.setText("ℹ️  TIDAK ADA TANAMAN\nTERDETEKSI")
-        self._set_badge_style(font_px=24, bg="#dbeafe", fg="#1e3a8a")
-        self._set_detail_style(font_px=18, fg="#1e3a8a", weight=800)
-        self.detail.setText(
-            "TIDAK ADA OBJEK TANAMAN\n\n"
-            "Kemungkinan penyebab:\n"
-            "• Kamera tidak mengarah ke tanaman\n"
-            "• Tanaman di luar frame\n"
-            "• Pencahayaan terlalu gelap/terlalu terang\n"
-            "• Model belum mengenali kelas tanaman pada kondisi ini"
-        )
+        self._apply_state("no_plant")
@@ -1,87 +1,43 @@
 # video_worker.py
 import time
-import os
+import threading
+from dataclasses import replace
+from functools import partial
 import cv2
+from typing import Optional
 from PyQt5 import QtCore, QtGui
-from ultralytics import YOLO
 
-from config import AppConfig
+from config import AppConfig, model_path_for_age
 from db_client import get_threshold, set_current
 from telegram_sender import TelegramSender
-
-
-def load_model_for_age(cfg: AppConfig, umur_hari: int) -> YOLO:
-    if umur_hari <= cfg.MODEL_AGE_SWITCH_DAYS:
-        path = cfg.PATH_MODEL_1 if os.path.exists(cfg.PATH_MODEL_1) else "yolov8n.pt"
-    else:
-        path = cfg.PATH_MODEL_2 if os.path.exists(cfg.PATH_MODEL_2) else "yolov8s.pt"
-    return YOLO(path)
+from event_recorder import EventRecorder
+from detection_history import DetectionHistory
+from db_uploader import DetectionUploader
+from live_config import LiveConfig
+from io_service import IoService
+from detection_bus import DetectionBusPublisher
+from actuator import ActuatorDispatcher
+from inference import YoloBackend, draw_detections, draw_label_box, overlay_label
+from frame_bus import FrameBusPublisher
+from stream_server import StreamHub
+from frame_pool import FramePool
+from preprocess import FramePreprocessor, compose_flip_method, fit_size, parse_crop
+from gst_pipeline import CaptureSpec, DualCapture, build_pipeline, crop_geometry, open_capture
+from metrics import METRICS
+from profiler import LoopProfiler
+from load_controller import LoadController
+
+
+def load_model_for_age(cfg: AppConfig, umur_hari: int):
+    # import di sini: mode inference server tidak perlu torch/ultralytics di proses GUI
+    from ultralytics import YOLO
+
+    return YOLO(model_path_for_age(cfg, umur_hari))
 
 
 def build_csi_gstreamer_pipeline(width=1920, height=1080, fps=30, flip_method=0) -> str:
-    return (
-        "nvarguscamerasrc ! "
-        f"video/x-raw(memory:NVMM), width={width}, height={height}, framerate={fps}/1, format=NV12 ! "
-        f"nvvidconv flip-method={flip_method} ! "
-        "video/x-raw, format=BGRx ! "
-        "videoconvert ! "
-        "video/x-raw, format=BGR ! "
-        "appsink drop=true max-buffers=1 sync=false"
-    )
-
-
-def _draw_label_box(img, xyxy, label, conf):
-    """
-    Rules:
-      - label == 'malnutrisi'  -> bounding box RED
-      - else                  -> bounding box GREEN
-
-    Font made bigger as requested.
-    """
-    x1, y1, x2, y2 = [int(v) for v in xyxy]
-
-    # colors (BGR)
-    if label.lower() == "malnutrisi":
-        color = (0, 0, 255)   # red
-    else:
-        color = (0, 255, 0)   # green
-
-    # thicker box
-    box_thickness = 4
-    cv2.rectangle(img, (x1, y1), (x2, y2), color, box_thickness)
-
-    # bigger font
-    font = cv2.FONT_HERSHEY_SIMPLEX
-    font_scale = 1.2
-    text_thickness = 3
-
-    text = f"{label.upper()} {conf:.2f}"
-    (tw, th), baseline = cv2.getTextSize(text, font, font_scale, text_thickness)
-
-    # label background box
-    pad_x, pad_y = 8, 6
-    y_text_top = max(0, y1 - th - baseline - (pad_y * 2))
-    x_text_left = max(0, x1)
-
-    cv2.rectangle(
-        img,
-        (x_text_left, y_text_top),
-        (x_text_left + tw + (pad_x * 2), y_text_top + th + baseline + (pad_y * 2)),
-        color,
-        -1,
-    )
-
-    # text in black for contrast
-    cv2.putText(
-        img,
-        text,
-        (x_text_left + pad_x, y_text_top + th + pad_y),
-        font,
-        font_scale,
-        (0, 0, 0),
-        text_thickness,
-        cv2.LINE_AA,
-    )
+    # pipeline lama (full-res BGR); konfigurasi lengkap lihat gst_pipeline.CaptureSpec
+    return build_pipeline(CaptureSpec(width=width, height=height, fps=fps, flip_method=flip_method))
 
 
 class VideoWorker(QtCore.QThread):
@@ -91,11 +47,38 @@ class VideoWorker(QtCore.QThread):
     # UI status: "stopped" | "normal" | "malnutrisi" | "no_plant"
     status_signal = QtCore.pyqtSignal(str)
 
-    def __init__(self, cfg: AppConfig, model: YOLO, tg: TelegramSender):
+    # stats live (fps, latency, hits, alert terakhir), maksimal sekali tiap UI_STATS_SEC
+    stats_signal = QtCore.pyqtSignal(dict)
+
+    def __init__(
+        self,
+        cfg: AppConfig,
+        backend: YoloBackend,
+        tg: TelegramSender,
+        uploader: Optional[DetectionUploader] = None,
+        live_cfg: Optional[LiveConfig] = None,
+        stream_hub: Optional[StreamHub] = None,
+        headless: bool = False,
+        metrics_prefix: str = "video",
+        io: Optional[IoService] = None,
+        det_bus: Optional[DetectionBusPublisher] = None,
+        actuator: Optional[ActuatorDispatcher] = None,
+    ):
         super().__init__()
-        self.cfg = cfg
-        self.model = model
+        self.cfg = live_cfg.get() if live_cfg is not None else cfg
+        self.live_cfg = live_cfg
+        self.backend = backend
+        if hasattr(backend, "dead_conf"):
+            backend.dead_conf = self.cfg.DEAD_CONF  # cascade di-build dengan cfg loader (tanpa layer kalibrasi)
+        self.stream_hub = stream_hub
+        self.headless = headless  # tanpa GUI (multi-device): frame tidak dikonversi ke QImage
+        self.metrics_prefix = metrics_prefix
         self.tg = tg
+        # I/O non-blocking (DB lewat event loop); None = query DB sinkron di thread ini
+        self.io = io
+        # setpoint n/p/k langsung ke kontroler pompa (fallback DB di dispatcher); None = lewat DB saja
+        self.actuator = actuator
+        self.uploader = uploader if (uploader is not None and cfg.DB_UPLOAD_ENABLED) else None
 
         self.running = False
 
@@ -105,7 +88,13 @@ class VideoWorker(QtCore.QThread):
         self.last_dead_seen_ts = 0.0
         self.last_db_update_ts = 0.0
 
+        # buffer frame dipakai bergiliran (tanpa alokasi per frame); last_annotated_bgr
+        # hanya menunjuk ke salah satu buffer pool preprocessor, bukan salinan baru
         self.last_annotated_bgr = None
+        self.pre: Optional[FramePreprocessor] = None  # dibuat setelah kamera terbuka (mirror CSI di GStreamer)
+        self.rgb_pool = FramePool(cfg.MEM_MAX_UI_PENDING + 1)
+        # backpressure GUI: maksimal MEM_MAX_UI_PENDING QImage antre; sisanya di-drop
+        self._ui_slots = threading.Semaphore(max(1, cfg.MEM_MAX_UI_PENDING))
 
         # Camera settings
         self.cam_width = getattr(cfg, "CAM_WIDTH", 1920)
@@ -123,6 +112,48 @@ class VideoWorker(QtCore.QThread):
 
         self._last_status_sent = None
 
+        # akumulator stats_signal
+        self.last_alert_ts = 0.0
+        self._stats_t0 = time.perf_counter()
+        self._stats_frames = 0
+        self._stats_frame_ms = 0.0
+        self._stats_infer_n = 0
+        self._stats_infer_ms = 0.0
+
+        # Degradasi bertahap saat inferensi tertinggal (imgsz / frame skip / model fallback / FPS tampilan)
+        self.load = LoadController(cfg, backend, log=self._log, metrics_prefix=metrics_prefix)
+        self._last_dets = []        # box terakhir, digambar ulang di frame yang di-skip
+        self._last_frame_dets = []
+
+        # WorkerPool (backend dengan submit): frame di-pipeline ke beberapa replika, hasil diproses urut
+        self._pool = backend if hasattr(backend, "submit") else None
+        self._pool_last_t = 0.0
+
+        # Profiling on-demand (tombol GUI / SIGUSR1 -> profiler.request())
+        self.profiler = LoopProfiler(cfg, log=self._log, name=metrics_prefix if headless else "")
+
+        # Event recorder (pre/post-trigger clip)
+        self.recorder = EventRecorder(cfg, log=self._log) if cfg.REC_ENABLED else None
+
+        # Detection bus: record per inferensi untuk konsumen lokal (bisa dipakai bersama banyak device)
+        self.det_bus = det_bus
+
+        # Frame bus shared memory (dibuat saat frame pertama, ukuran ikut frame)
+        self.frame_bus = None
+
+        # Detection history (per-frame summary + rollup)
+        self.history = None
+        if cfg.HIST_ENABLED:
+            self.history = DetectionHistory(
+                cfg,
+                log=self._log,
+                # uploader bisa dipakai bersama banyak device -> device_id eksplisit
+                on_minute_rollup=(
+                    partial(self.uploader.enqueue_rollups, device_id=cfg.DEVICE_ID)
+                    if self.uploader is not None else None
+                ),
+            )
+
     def _log(self, msg: str):
         self.log_signal.emit(msg)
 
@@ -131,30 +162,173 @@ class VideoWorker(QtCore.QThread):
             self.status_signal.emit(status)
             self._last_status_sent = status
 
-    def _open_csi(self):
-        pipeline = build_csi_gstreamer_pipeline(
+    def _emit_frame(self, annotated):
+        METRICS.inc(f"{self.metrics_prefix}.frames")
+        if not self.load.allow_display(time.monotonic()):
+            METRICS.inc(f"{self.metrics_prefix}.display_skipped")
+            return
+        if self.stream_hub is not None:
+            self.stream_hub.publish(annotated)
+        if self.headless:
+            return
+        if not self._ui_slots.acquire(blocking=False):
+            # GUI belum selesai menggambar frame sebelumnya -> drop, jangan menumpuk di event queue
+            METRICS.inc(f"{self.metrics_prefix}.ui_dropped")
+            return
+        rgb = cv2.cvtColor(annotated, cv2.COLOR_BGR2RGB, dst=self.rgb_pool.next(annotated.shape))
+        h, w, ch = rgb.shape
+        img_qt = QtGui.QImage(rgb.data, w, h, ch * w, QtGui.QImage.Format_RGB888)
+        self.frame_updated.emit(img_qt)
+
+    def _observe_load(self, t_frame: float):
+        now = time.perf_counter()
+        frame_ms = (now - t_frame) * 1000.0
+        self.load.observe(frame_ms)
+        self._stats_frames += 1
+        self._stats_frame_ms += frame_ms
+        if now - self._stats_t0 >= self.cfg.UI_STATS_SEC:
+            self._emit_stats(now)
+
+    def _emit_stats(self, now: float):
+        n = max(1, self._stats_frames)
+        self.stats_signal.emit({
+            "fps": self._stats_frames / max(now - self._stats_t0, 1e-9),
+            "frame_ms": self._stats_frame_ms / n,
+            "infer_ms": self._stats_infer_ms / max(1, self._stats_infer_n),
+            "dead_hits": self.dead_hits,
+            "hits_required": self.cfg.DEAD_HITS_REQUIRED,
+            "last_alert_ts": self.last_alert_ts,
+            "load_level": self.load.level,
+            "load_levels": len(self.load.ladder),
+        })
+        self._stats_t0 = now
+        self._stats_frames = self._stats_infer_n = 0
+        self._stats_frame_ms = self._stats_infer_ms = 0.0
+
+    def frame_consumed(self):
+        """Dipanggil GUI setelah QImage dari frame_updated selesai dipakai (buffer boleh dipakai ulang)."""
+        self._ui_slots.release()
+
+    def _publish_frame(self, frame, ts: float):
+        bus = self.frame_bus
+        if bus is None or not bus.fits(frame):
+            if bus is not None:
+                bus.close()
+            self.frame_bus = FrameBusPublisher(self.cfg.FRAME_BUS_NAME, frame.shape, self.cfg.FRAME_BUS_SLOTS)
+            self._log(f"[BUS] frame bus '{self.cfg.FRAME_BUS_NAME}' {frame.shape} x{self.frame_bus.n_slots} slots")
+        self.frame_bus.publish(frame, ts)
+
+    def _publish_dets(self, ts: float, frame, dets, state: str, dead_detected: bool, best_dead_conf: float):
+        try:
+            self.det_bus.publish(
+                self.cfg.DEVICE_ID, ts, state, dets, dead_detected, best_dead_conf, self.dead_hits,
+                frame.shape[1], frame.shape[0],
+            )
+        except Exception as e:
+            self._log(f"[DETBUS] ERROR publish: {e}")
+
+    def _refresh_config(self):
+        # swap referensi AppConfig (frozen) -> atomik, tanpa restart kamera/model
+        cfg = self.live_cfg.get()
+        if cfg is not self.cfg:
+            self.cfg = cfg
+            if hasattr(self.backend, "dead_conf"):
+                self.backend.dead_conf = cfg.DEAD_CONF  # cascade: box di bawah DEAD_CONF tidak dikonfirmasi
+            self._log(
+                f"[CFG] applied: CONF={cfg.DEAD_CONF}, HITS={cfg.DEAD_HITS_REQUIRED}, "
+                f"RECOVER={cfg.RECOVER_AFTER_SEC}s, DB_CD={cfg.DB_COOLDOWN_SEC}s"
+            )
+        th = self.live_cfg.threshold
+        if th is not None and th != self.threshold:
+            self.threshold = dict(th)
+
+    def _on_threshold(self, threshold, error):
+        if error is not None:
+            self._log(f"[DB] ERROR load threshold: {error}")
+            return
+        self.threshold = threshold
+        self._log(f"[DB] Threshold loaded: {self.threshold}")
+
+    def _set_current(self, n: int, p: int, k: int, reason: str, what: str, err_what: str,
+                     t_detect: float, now: float):
+        """
+        last_db_update_ts (DB_COOLDOWN_SEC) hanya maju kalau update benar-benar berhasil: sinkron langsung,
+        lewat I/O dari callback setelah write selesai; aktuator saat perintah diterima (dispatcher fallback DB).
+        """
+        cfg = self.cfg
+        if self.actuator is not None:
+            # langsung ke kontroler pompa; DB ditulis oleh dispatcher kalau aktuasi gagal
+            if self.actuator.command(cfg, cfg.DEVICE_ID, n, p, k, reason, t_detect):
+                self.last_db_update_ts = now
+            return
+        if self.io is not None:
+            def done(affected, error):
+                if error is not None:
+                    self._log(f"[DB] ERROR {err_what}: {error}")
+                else:
+                    self.last_db_update_ts = max(self.last_db_update_ts, now)
+                    self._log(f"[DB] {what} (affected={affected})")
+
+            if not self.io.set_current(cfg, cfg.DEVICE_ID, n, p, k, on_done=done):
+                self._log(f"[DB] ERROR {err_what}: antrean I/O penuh")
+            return
+        try:
+            affected = set_current(cfg, cfg.DEVICE_ID, n, p, k)
+            self.last_db_update_ts = now
+            self._log(f"[DB] {what} (affected={affected})")
+        except Exception as e:
+            self._log(f"[DB] ERROR {err_what}: {e}")
+
+    def _capture_spec(self) -> CaptureSpec:
+        cfg = self.cfg
+        csi = cfg.CAM_SOURCE == "csi"
+        spec = CaptureSpec(
+            source=cfg.CAM_SOURCE,
             width=self.cam_width,
             height=self.cam_height,
             fps=self.cam_fps,
-            flip_method=self.csi_flip_method,
+            sensor_id=cfg.CAM_SENSOR_ID,
+            device=cfg.CAM_DEVICE,
+            path=cfg.CAM_FILE,
+            mjpeg=cfg.CAM_MJPEG,
+            # mirror digabung ke flip-method nvvidconv -> tidak ada cv2.flip di CPU
+            flip_method=compose_flip_method(self.csi_flip_method, self.mirror) if csi else 0,
+            mirror=self.mirror and not csi,
+            crop=parse_crop(cfg.CAM_CROP),
+            fmt=cfg.CAM_FORMAT,
+            shm_path=cfg.CAM_SHM_PATH,
         )
-        cap = cv2.VideoCapture(pipeline, cv2.CAP_GSTREAMER)
-        return cap if cap.isOpened() else None
+        # crop + scale ke ukuran display dikerjakan pipeline; dual -> appsink ukuran model
+        _, _, cw, ch = crop_geometry(spec)
+        display = fit_size(cw, ch, cfg.DISPLAY_MAX_WIDTH, longest=False)
+        model = fit_size(cw, ch, cfg.PRE_MODEL_SIZE, longest=True)
+        if cfg.CAM_DUAL_STREAM and model != display:
+            return replace(spec, out_size=model, display_size=display)
+        return replace(spec, out_size=display if display != (cw, ch) else None)
+
+    def _open_gst(self):
+        spec = self._capture_spec()
+        try:
+            return open_capture(spec), spec
+        except ValueError as e:
+            self._log(f"[CAM] ERROR pipeline: {e}")
+            return None, spec
 
     def _open_usb(self):
         cap = cv2.VideoCapture(int(self.usb_index), cv2.CAP_V4L2)
         return cap if cap.isOpened() else None
 
     def _open_camera(self):
-        cap = self._open_csi()
+        cap, spec = self._open_gst()
         if cap is not None:
             self._log(
-                f"[CAM] CSI opened: {self.cam_width}x{self.cam_height}@{self.cam_fps} "
-                f"(flip={self.csi_flip_method})"
+                f"[CAM] {spec.source.upper()} opened: {self.cam_width}x{self.cam_height}@{self.cam_fps} "
+                f"(flip={spec.flip_method}, mirror={self.mirror}, fmt={spec.fmt}, out={spec.out_size}, "
+                f"dual={spec.display_size})"
             )
-            return cap, "csi"
+            return cap, "csi" if spec.source == "csi" else "gst"
 
-        self._log("[CAM] CSI open failed.")
+        self._log(f"[CAM] {spec.source.upper()} open failed.")
         if self.use_usb_fallback:
             cap = self._open_usb()
             if cap is not None:
@@ -163,6 +337,15 @@ class VideoWorker(QtCore.QThread):
             self._log("[CAM] USB fallback failed too.")
         return None, "none"
 
+    def _make_preprocessor(self, cam_type: str):
+        inflight = self._pool.max_inflight if self._pool is not None else 0
+        if cam_type in ("csi", "gst"):
+            # mirror/crop/scale display sudah di pipeline GStreamer; sisa: input model (+ BGRx -> BGR)
+            self.pre = FramePreprocessor(model_size=self.cfg.PRE_MODEL_SIZE, pool_size=self.cfg.MEM_FRAME_POOL,
+                                         inflight=inflight)
+        else:
+            self.pre = FramePreprocessor.from_config(self.cfg, mirror=self.mirror, inflight=inflight)
+
     def _restart_argus(self):
         try:
             import subprocess
@@ -173,14 +356,14 @@ class VideoWorker(QtCore.QThread):
             self._log(f"[CAM] Restart nvargus-daemon failed: {e}")
 
     def run(self):
-        # Load DB thresholds
-        try:
-            self.threshold = get_threshold(self.cfg, self.cfg.DEVICE_ID)
-            self._log(f"[DB] Threshold loaded: {self.threshold}")
-        except Exception as e:
-            self._log(f"[DB] ERROR load threshold: {e}")
-
-        self._log(f"[MODEL] classes: {self.model.names}")
+        # Load DB thresholds (lewat I/O loop: kamera tidak menunggu DB)
+        if self.io is None or not self.io.get_threshold(self.cfg, self.cfg.DEVICE_ID, on_done=self._on_threshold):
+            try:
+                self._on_threshold(get_threshold(self.cfg, self.cfg.DEVICE_ID), None)
+            except Exception as e:
+                self._on_threshold(None, e)
+
+        self._log(f"[MODEL] {self.backend.path or type(self.backend).__name__} classes: {self.backend.names}")
         self._log(
             f"[CFG] DEAD='{self.cfg.DEAD_CLASS_NAME}', CONF={self.cfg.DEAD_CONF}, HITS={self.cfg.DEAD_HITS_REQUIRED}, "
             f"RECOVER={self.cfg.RECOVER_AFTER_SEC}s, DB_CD={self.cfg.DB_COOLDOWN_SEC}s, "
@@ -193,11 +376,29 @@ class VideoWorker(QtCore.QThread):
             self._emit_status("no_plant")
             return
 
+        self._make_preprocessor(cam_type)
         self.running = True
+        self.profiler.attach()
         self._emit_status("normal")
         self.read_fail_count = 0
 
+        if self.recorder is not None:
+            self.recorder.start()
+            self._log(
+                f"[REC] enabled: pre={self.cfg.REC_PRE_SEC}s post={self.cfg.REC_POST_SEC}s "
+                f"@{self.cfg.REC_FPS}fps -> {self.cfg.REC_DIR} ({self.cfg.REC_FORMAT})"
+            )
+        if self.history is not None:
+            self.history.start()
+            self._log(f"[HIST] enabled -> {self.cfg.HIST_DIR} (flush={self.cfg.HIST_FLUSH_SEC}s)")
+        if self.uploader is not None and self.history is None:
+            self._log("[DB] upload enabled tapi HIST_ENABLED=0 -> hanya state event yang dikirim")
+
         while self.running:
+            self.profiler.poll()
+            if self.live_cfg is not None:
+                self._refresh_config()
+
             ret, frame = cap.read()
             if (not ret) or (frame is None):
                 self.read_fail_count += 1
@@ -213,135 +414,209 @@ class VideoWorker(QtCore.QThread):
                     if cap is None:
                         self._log("[CAM] Reopen failed. Stopping worker.")
                         break
+                    self._make_preprocessor(cam_type)
                     self.read_fail_count = 0
 
                 time.sleep(0.03)
                 continue
 
             self.read_fail_count = 0
-
-            if self.mirror:
-                frame = cv2.flip(frame, 1)
-
-            # YOLO inference
-            results = self.model.predict(frame, verbose=False)
-            r0 = results[0]
-
-            # Annotated as a copy of frame
-            annotated = frame.copy()
-
-            # ---- no plant ----
-            has_boxes = (r0.boxes is not None) and (len(r0.boxes) > 0)
-            if not has_boxes:
-                self._emit_status("no_plant")
-                self.dead_hits = max(0, self.dead_hits - 1)
-
-                self.last_annotated_bgr = annotated
-                rgb = cv2.cvtColor(annotated, cv2.COLOR_BGR2RGB)
-                h, w, ch = rgb.shape
-                img_qt = QtGui.QImage(rgb.data, w, h, ch * w, QtGui.QImage.Format_RGB888)
-                self.frame_updated.emit(img_qt)
-                time.sleep(0.01)
+            t_frame = time.perf_counter()
+
+            # crop/resize/mirror satu pass ke buffer pool (display) + input model ukuran sendiri
+            pf = self.pre.process(frame, cap.model_frame if isinstance(cap, DualCapture) else None)
+            frame = pf.display
+
+            if self.cfg.FRAME_BUS_NAME:
+                try:
+                    self._publish_frame(frame, time.time())
+                except Exception as e:
+                    self._log(f"[BUS] ERROR publish: {e}")
+
+            if not self.load.should_infer():
+                # frame skip (beban tinggi): box terakhir digambar ulang, state machine tidak disentuh
+                draw_detections(frame, self._last_dets, self.cfg.DEAD_CLASS_NAME)
+                self.last_annotated_bgr = frame
+                if self.recorder is not None:
+                    self.recorder.push(frame, self._last_frame_dets)
+                self._emit_frame(frame)
+                self._observe_load(t_frame)
                 continue
 
-            # ---- draw boxes + dead detection ----
-            cls_ids = r0.boxes.cls.cpu().numpy().astype(int)
-            confs = r0.boxes.conf.cpu().numpy()
-            xyxys = r0.boxes.xyxy.cpu().numpy()
-
-            dead_detected = False
-            best_dead_conf = 0.0
+            # YOLO inference (koordinat dipetakan ke frame display)
+            if self.load.pipelined:
+                # WorkerPool: frame ke replika berikutnya tanpa menunggu; hasil yang siap diproses urut frame
+                self._handle_pool_results(self.load.submit(pf.model_input, (frame, pf, t_frame)))
+                continue
+            if self._pool is not None and self._pool.pending:
+                # pindah ke backend serial (model fallback): habiskan frame yang masih di pool dulu
+                self._handle_pool_results(self._pool.drain())
+
+            t_infer = time.perf_counter()
+            dets = pf.to_display(self.load.predict(pf.model_input))
+            self._stats_infer_ms += (time.perf_counter() - t_infer) * 1000.0
+            self._stats_infer_n += 1
+            self._on_detections(frame, dets, t_frame)
+
+        if self._pool is not None:
+            try:
+                self._pool.drain()  # hasil frame terakhir dibuang; pool dipakai lagi worker berikutnya
+            except Exception as e:
+                self._log(f"[POOL] ERROR drain: {e}")
+        self.profiler.detach()
+        try:
+            cap.release()
+        except Exception:
+            pass
+        if self.recorder is not None:
+            self.recorder.stop()
+        if self.history is not None:
+            self.history.stop()
+        if self.frame_bus is not None:
+            self.frame_bus.close()
+            self.frame_bus = None
+        self._log(f"[CAM] Released ({cam_type}).")
+        self._emit_status("stopped")
 
-            for cid, cf, xyxy in zip(cls_ids, confs, xyxys):
-                name = self.model.names.get(int(cid), str(cid))
-                cf = float(cf)
+    def _handle_pool_results(self, results):
+        for (frame, pf, t_frame), dets, infer_ms in results:
+            self._stats_infer_ms += infer_ms
+            self._stats_infer_n += 1
+            # beban diukur dari jarak antar hasil (throughput), bukan latency frame di pipeline
+            t_load = max(t_frame, self._pool_last_t)
+            self._on_detections(frame, pf.to_display(dets), t_frame, t_load)
+            self._pool_last_t = time.perf_counter()
 
-                overlay_label = name
-                if name == self.cfg.DEAD_CLASS_NAME:
-                    overlay_label = "malnutrisi"
+    def _on_detections(self, frame, dets, t_frame: float, t_load: Optional[float] = None):
+        """State machine + output untuk satu frame yang sudah diinferensi (dets di koordinat display)."""
+        self._last_dets = dets
 
-                _draw_label_box(annotated, xyxy, overlay_label, cf)
+        # buffer display milik worker (pool) -> langsung digambari, tanpa copy
+        annotated = frame
 
-                if name == self.cfg.DEAD_CLASS_NAME and cf >= self.cfg.DEAD_CONF:
-                    dead_detected = True
-                    best_dead_conf = max(best_dead_conf, cf)
+        # ---- no plant ----
+        if not dets:
+            self._emit_status("no_plant")
+            self.dead_hits = max(0, self.dead_hits - 1)
 
             self.last_annotated_bgr = annotated
+            if self.recorder is not None:
+                self.recorder.push(annotated, [])
+            if self.history is not None:
+                self.history.append(time.time(), {}, 0.0, False, "no_plant")
+            if self.det_bus is not None:
+                self._publish_dets(time.time(), frame, [], "no_plant", False, 0.0)
+            self._last_frame_dets = []
+            self._emit_frame(annotated)
+            self._observe_load(t_frame if t_load is None else t_load)
+            time.sleep(0.01)
+            return
 
-            now = time.time()
-            if dead_detected:
-                self.last_dead_seen_ts = now
-
-            # debounce hits
-            if dead_detected:
-                self.dead_hits += 1
-            else:
-                self.dead_hits = max(0, self.dead_hits - 1)
-
-            # NORMAL -> MALNUTRISI trigger
-            if (not self.dead_state) and (self.dead_hits >= self.cfg.DEAD_HITS_REQUIRED):
-                self.dead_state = True
-                self._emit_status("malnutrisi")
+        # ---- draw boxes + dead detection ----
+        dead_detected = False
+        best_dead_conf = 0.0
+        frame_dets = []
+        class_counts = {}
+
+        for det in dets:
+            name, cf, xyxy = det.name, det.conf, det.xyxy
+
+            draw_label_box(annotated, xyxy, overlay_label(det, self.cfg.DEAD_CLASS_NAME), cf)
+            class_counts[name] = class_counts.get(name, 0) + 1
+            frame_dets.append({
+                "name": name,
+                "conf": round(cf, 3),
+                "xyxy": [round(float(v), 1) for v in xyxy],
+                **({} if det.confirmed else {"confirmed": False}),
+            })
+
+            # dead yang ditolak / belum dicek model konfirmasi (cascade) tidak dihitung hit
+            if name == self.cfg.DEAD_CLASS_NAME and det.confirmed and cf >= self.cfg.DEAD_CONF:
+                dead_detected = True
+                best_dead_conf = max(best_dead_conf, cf)
+
+        self.last_annotated_bgr = annotated
+        self._last_frame_dets = frame_dets
+        if self.recorder is not None:
+            self.recorder.push(annotated, frame_dets)
+
+        now = time.time()
+        if dead_detected:
+            self.last_dead_seen_ts = now
+
+        # debounce hits
+        if dead_detected:
+            self.dead_hits += 1
+        else:
+            self.dead_hits = max(0, self.dead_hits - 1)
+
+        # NORMAL -> MALNUTRISI trigger
+        if (not self.dead_state) and (self.dead_hits >= self.cfg.DEAD_HITS_REQUIRED):
+            self.dead_state = True
+            self.last_alert_ts = now
+            self._emit_status("malnutrisi")
+
+            if self.recorder is not None:
+                self.recorder.trigger("malnutrisi", {"hits": self.dead_hits, "conf_best": round(best_dead_conf, 3)})
+            if self.uploader is not None:
+                self.uploader.enqueue_state_event(
+                    now, "malnutrisi", self.dead_hits, best_dead_conf, device_id=self.cfg.DEVICE_ID
+                )
+
+            if (now - self.last_db_update_ts) >= self.cfg.DB_COOLDOWN_SEC:
+                self._set_current(0, 0, 0, "malnutrisi", "MALNUTRISI(trigger by DEAD) -> set current=0",
+                                  "set current=0", t_frame, now)
+
+            if self.cfg.telegram_enabled() and self.last_annotated_bgr is not None:
+                ts = time.strftime("%Y-%m-%d %H:%M:%S")
+                caption = (
+                    f"⚠️ DETEKSI MALNUTRISI\n"
+                    f"Waktu: {ts}\n"
+                    f"Device ID: {self.cfg.DEVICE_ID}\n"
+                    f"hits: {self.dead_hits}\n"
+                    f"conf_best: {best_dead_conf:.2f}\n"
+                    f"Action: set current=0"
+                )
+                ok, buf = cv2.imencode(".jpg", self.last_annotated_bgr, [int(cv2.IMWRITE_JPEG_QUALITY), 85])
+                if ok:
+                    queued = self.tg.enqueue_photo(buf.tobytes(), caption, key=self.cfg.DEVICE_ID)
+                    self._log("[TG] queued snapshot" if queued else "[TG] queue full, skip")
+
+        # plants exist + not in malnutrisi state => normal
+        if not self.dead_state:
+            self._emit_status("normal")
+
+        # MALNUTRISI -> RECOVER trigger
+        if self.dead_state:
+            no_dead_sec = now - self.last_dead_seen_ts
+            if no_dead_sec >= self.cfg.RECOVER_AFTER_SEC:
+                n = int(self.threshold.get("n", 0)) + 1
+                p = int(self.threshold.get("p", 0)) + 1
+                k = int(self.threshold.get("k", 0)) + 1
 
                 if (now - self.last_db_update_ts) >= self.cfg.DB_COOLDOWN_SEC:
-                    try:
-                        affected = set_current(self.cfg, self.cfg.DEVICE_ID, 0, 0, 0)
-                        self._log(f"[DB] MALNUTRISI(trigger by DEAD) -> set current=0 (affected={affected})")
-                        self.last_db_update_ts = now
-                    except Exception as e:
-                        self._log(f"[DB] ERROR set current=0: {e}")
-
-                if self.cfg.telegram_enabled() and self.last_annotated_bgr is not None:
-                    ts = time.strftime("%Y-%m-%d %H:%M:%S")
-                    caption = (
-                        f"⚠️ DETEKSI MALNUTRISI\n"
-                        f"Waktu: {ts}\n"
-                        f"Device ID: {self.cfg.DEVICE_ID}\n"
-                        f"hits: {self.dead_hits}\n"
-                        f"conf_best: {best_dead_conf:.2f}\n"
-                        f"Action: set current=0"
-                    )
-                    ok, buf = cv2.imencode(".jpg", self.last_annotated_bgr, [int(cv2.IMWRITE_JPEG_QUALITY), 85])
-                    if ok:
-                        queued = self.tg.enqueue_photo(buf.tobytes(), caption)
-                        self._log("[TG] queued snapshot" if queued else "[TG] queue full, skip")
-
-            # plants exist + not in malnutrisi state => normal
-            if not self.dead_state:
+                    self._set_current(n, p, k, "recover", f"RECOVER -> set current=threshold+1 ({n},{p},{k})",
+                                      "set current=threshold+1", t_frame, now)
+
+                self.dead_state = False
+                self.dead_hits = 0
                 self._emit_status("normal")
+                if self.uploader is not None:
+                    self.uploader.enqueue_state_event(now, "recover", device_id=self.cfg.DEVICE_ID)
 
-            # MALNUTRISI -> RECOVER trigger
-            if self.dead_state:
-                no_dead_sec = now - self.last_dead_seen_ts
-                if no_dead_sec >= self.cfg.RECOVER_AFTER_SEC:
-                    n = int(self.threshold.get("n", 0)) + 1
-                    p = int(self.threshold.get("p", 0)) + 1
-                    k = int(self.threshold.get("k", 0)) + 1
-
-                    if (now - self.last_db_update_ts) >= self.cfg.DB_COOLDOWN_SEC:
-                        try:
-                            affected = set_current(self.cfg, self.cfg.DEVICE_ID, n, p, k)
-                            self._log(f"[DB] RECOVER -> set current=threshold+1 ({n},{p},{k}) (affected={affected})")
-                            self.last_db_update_ts = now
-                        except Exception as e:
-                            self._log(f"[DB] ERROR set current=threshold+1: {e}")
-
-                    self.dead_state = False
-                    self.dead_hits = 0
-                    self._emit_status("normal")
-
-            # send frame to UI
-            rgb = cv2.cvtColor(annotated, cv2.COLOR_BGR2RGB)
-            h, w, ch = rgb.shape
-            img_qt = QtGui.QImage(rgb.data, w, h, ch * w, QtGui.QImage.Format_RGB888)
-            self.frame_updated.emit(img_qt)
+        if self.history is not None:
+            self.history.append(
+                now, class_counts, best_dead_conf, dead_detected,
+                "malnutrisi" if self.dead_state else "normal",
+            )
+        if self.det_bus is not None:
+            self._publish_dets(
+                now, frame, dets, "malnutrisi" if self.dead_state else "normal", dead_detected, best_dead_conf
+            )
 
-        try:
-            cap.release()
-        except Exception:
-            pass
-        self._log(f"[CAM] Released ({cam_type}).")
-        self._emit_status("stopped")
+        # send frame to UI (+ remote stream)
+        self._emit_frame(annotated)
+        self._observe_load(t_frame if t_load is None else t_load)
 
     def stop(self):
         self.running = False
@@ -0,0 +1,403 @@
+# worker_pool.py
+"""
+Pool N replika model untuk throughput di atas satu instance (CPU banyak core / beberapa GPU).
+
+Mode (POOL_MODE):
+  thread  -> replika = thread di proses yang sama + affinity core (Linux: per thread). Batas intra-op
+             torch.set_num_threads hanya per thread di build OpenMP; di build lain global per proses
+             (semua replika build_pool memakai nilai yang sama, jadi tidak saling menimpa beda nilai)
+  process -> replika = proses terpisah (spawn); isolasi penuh, frame dikirim lewat pipe (pickle, 1 salinan).
+             Pipe di sisi replika dikuras thread sendiri, jadi submit() tidak menunggu predict yang sedang jalan.
+Tiap replika di-pin ke potongan core sendiri (POOL_CORES) dan/atau device sendiri (POOL_DEVICES, diputar).
+
+Dispatch round-robin. Pool punya interface backend yang sama (.names, .path, .params, predict,
+predict_batch), ditambah:
+  submit(frame, tag) -> kirim tanpa menunggu; return hasil yang sudah selesai [(tag, dets, infer_ms)]
+                        URUT sesuai submit. Maksimal max_inflight frame di jalan; lebih dari itu submit()
+                        menunggu frame tertua selesai.
+  ready() / drain()  -> hasil yang sudah selesai (tanpa menunggu) / semua (menunggu)
+submit/ready/drain dipanggil dari satu thread (VideoWorker); predict/predict_batch boleh dari mana saja.
+predict_batch() membagi batch jadi potongan berurutan per replika lalu disambung lagi sesuai urutan input.
+
+Metrik: <prefix>.inflight, <prefix>.jobs, <prefix>.r<i>.jobs, <prefix>.infer_ms
+
+Contoh (CPU saja, tanpa model):
+  from functools import partial
+  from testkit import FakeBackend
+  pool = WorkerPool([partial(FakeBackend, cfg, unit="frame", latency_ms=50)] * 4)
+"""
+import os
+import queue
+import time
+import threading
+import itertools
+from collections import deque
+from concurrent.futures import Future
+from functools import partial
+from typing import Callable, Deque, Dict, List, Optional, Sequence, Tuple
+
+from config import AppConfig
+from metrics import METRICS
+
+MODES = ("thread", "process")
+
+Factory = Callable[[], object]  # -> backend (process mode: harus bisa di-pickle)
+
+
+def parse_cores(value: str, replicas: int) -> List[Optional[List[int]]]:
+    """
+    'auto'      -> core yang boleh dipakai proses ini dibagi rata berurutan
+    ''          -> tanpa pinning
+    '0-3;4-7'   -> eksplisit per replika (diputar kalau replika lebih banyak)
+    """
+    value = (value or "").strip().lower()
+    if not value:
+        return [None] * replicas
+    if value == "auto":
+        if not hasattr(os, "sched_getaffinity"):
+            return [None] * replicas
+        cores = sorted(os.sched_getaffinity(0))
+        per = max(1, len(cores) // replicas)
+        return [cores[(i * per) % len(cores):(i * per) % len(cores) + per] for i in range(replicas)]
+    groups = []
+    for part in value.split(";"):
+        ids: List[int] = []
+        for item in part.split(","):
+            item = item.strip()
+            if "-" in item:
+                lo, hi = item.split("-")
+                ids += list(range(int(lo), int(hi) + 1))
+            elif item:
+                ids.append(int(item))
+        groups.append(ids)
+    return [groups[i % len(groups)] for i in range(replicas)]
+
+
+def _pin(cores: Optional[List[int]], threads: int):
+    """
+    Dipanggil di thread / proses replika sebelum model di-load. Affinity = thread pemanggil;
+    torch.set_num_threads bisa global per proses (build non-OpenMP) -> di mode thread bukan isolasi.
+    """
+    if cores and hasattr(os, "sched_setaffinity"):
+        try:
+            os.sched_setaffinity(0, cores)  # Linux: 0 = thread pemanggil
+        except OSError:
+            pass
+    if threads > 0:
+        try:
+            import torch
+            torch.set_num_threads(threads)
+        except Exception:
+            pass
+
+
+def _describe(backend) -> Dict:
+    return {
+        "names": dict(backend.names),
+        "path": getattr(backend, "path", ""),
+        "params": dict(getattr(backend, "params", {}) or {}),
+        "supports_imgsz": bool(getattr(backend, "supports_imgsz", False)),
+    }
+
+
+def _run_job(backend, kind: str, payload, kw: Dict) -> Tuple[object, float]:
+    t0 = time.perf_counter()
+    if kind == "batch":
+        result = backend.predict_batch(payload)
+    else:
+        result = backend.predict(payload, **kw)
+    return result, (time.perf_counter() - t0) * 1000.0
+
+
+# ===================== REPLIKA =====================
+class _ThreadReplica:
+    def __init__(self, index: int, factory: Factory, cores: Optional[List[int]], threads: int):
+        self.index = index
+        self.factory = factory
+        self.cores = cores
+        self.threads = threads
+        self.jobs: "queue.Queue" = queue.Queue()
+        self.ready: Future = Future()  # -> _describe(backend)
+        self.thread = threading.Thread(target=self._run, name=f"pool-r{index}", daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def send(self, fut: Future, kind: str, payload, kw: Dict):
+        self.jobs.put((fut, kind, payload, kw))
+
+    def close(self, timeout: float = 5.0):
+        self.jobs.put(None)
+        self.thread.join(timeout=timeout)
+
+    def _run(self):
+        _pin(self.cores, self.threads)
+        try:
+            backend = self.factory()
+            self.ready.set_result(_describe(backend))
+        except Exception as e:
+            self.ready.set_exception(e)
+            return
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                return
+            fut, kind, payload, kw = job
+            if not fut.set_running_or_notify_cancel():
+                continue
+            try:
+                fut.set_result(_run_job(backend, kind, payload, kw))
+            except Exception as e:
+                fut.set_exception(e)
+
+
+def _process_main(factory: Factory, conn, cores: Optional[List[int]], threads: int):
+    _pin(cores, threads)
+    try:
+        backend = factory()
+    except Exception as e:
+        conn.send(("error", f"{type(e).__name__}: {e}"))
+        return
+    conn.send(("ready", _describe(backend)))
+
+    jobs: "queue.Queue" = queue.Queue()
+
+    def receive():
+        # pipe dikuras terus supaya send() di parent tidak blok selama predict berjalan
+        while True:
+            try:
+                msg = conn.recv()
+            except (EOFError, OSError):
+                msg = None
+            jobs.put(msg)
+            if msg is None:
+                return
+
+    threading.Thread(target=receive, daemon=True).start()
+    while True:
+        msg = jobs.get()
+        if msg is None:
+            return
+        job_id, kind, payload, kw = msg
+        try:
+            result, ms = _run_job(backend, kind, payload, kw)
+            conn.send((job_id, result, ms, None))
+        except Exception as e:
+            conn.send((job_id, None, 0.0, f"{type(e).__name__}: {e}"))
+
+
+class _ProcessReplica:
+    def __init__(self, index: int, factory: Factory, cores: Optional[List[int]], threads: int):
+        import multiprocessing as mp
+
+        ctx = mp.get_context("spawn")  # fork + CUDA / thread torch tidak aman
+        self.index = index
+        self.conn, child = ctx.Pipe()
+        self.proc = ctx.Process(target=_process_main, args=(factory, child, cores, threads),
+                                name=f"pool-r{index}", daemon=True)
+        self._child = child
+        self.ready: Future = Future()
+        self._pending: Dict[int, Future] = {}
+        self._ids = itertools.count()
+        self._send_lock = threading.Lock()
+        self._reader = threading.Thread(target=self._read, name=f"pool-r{index}-rx", daemon=True)
+
+    def start(self):
+        self.proc.start()
+        self._child.close()
+        self._reader.start()
+
+    def send(self, fut: Future, kind: str, payload, kw: Dict):
+        if not fut.set_running_or_notify_cancel():
+            return
+        with self._send_lock:
+            job_id = next(self._ids)
+            self._pending[job_id] = fut
+            try:
+                self.conn.send((job_id, kind, payload, kw))
+            except Exception as e:
+                self._pending.pop(job_id, None)
+                fut.set_exception(e)
+
+    def close(self, timeout: float = 5.0):
+        try:
+            with self._send_lock:
+                self.conn.send(None)
+        except Exception:
+            pass
+        self.proc.join(timeout=timeout)
+        if self.proc.is_alive():
+            self.proc.terminate()
+        self._reader.join(timeout=timeout)
+
+    def _read(self):
+        while True:
+            try:
+                msg = self.conn.recv()
+            except (EOFError, OSError):
+                break
+            if msg[0] == "ready":
+                self.ready.set_result(msg[1])
+            elif msg[0] == "error":
+                self.ready.set_exception(RuntimeError(msg[1]))
+            else:
+                job_id, result, ms, err = msg
+                fut = self._pending.pop(job_id, None)
+                if fut is None:
+                    continue
+                if err is None:
+                    fut.set_result((result, ms))
+                else:
+                    fut.set_exception(RuntimeError(err))
+        # proses replika mati / ditutup: semua yang menunggu digagalkan
+        err = RuntimeError(f"replika {self.index} berhenti (exitcode={self.proc.exitcode})")
+        if not self.ready.done():
+            self.ready.set_exception(err)
+        with self._send_lock:
+            pending, self._pending = self._pending, {}
+        for fut in pending.values():
+            fut.set_exception(err)
+
+
+# ===================== POOL =====================
+class WorkerPool:
+    """N replika backend, dispatch round-robin, hasil dirakit ulang sesuai urutan kirim."""
+
+    def __init__(
+        self,
+        factories: Sequence[Factory],
+        mode: str = "thread",
+        cores: Optional[Sequence[Optional[List[int]]]] = None,
+        threads: int = 0,
+        max_inflight: int = 0,
+        log: Optional[Callable[[str], None]] = None,
+        metrics_prefix: str = "pool",
+    ):
+        if mode not in MODES:
+            raise ValueError(f"POOL_MODE tidak dikenal: {mode} (pilih {MODES})")
+        if not factories:
+            raise ValueError("WorkerPool butuh minimal 1 replika")
+        self._log = log or (lambda msg: None)
+        self.prefix = metrics_prefix
+        self.mode = mode
+        n = len(factories)
+        cores = list(cores) if cores is not None else [None] * n
+        cls = _ThreadReplica if mode == "thread" else _ProcessReplica
+        self.replicas = [
+            cls(i, f, cores[i], threads or (len(cores[i]) if cores[i] else 0))
+            for i, f in enumerate(factories)
+        ]
+        self.max_inflight = max_inflight if max_inflight > 0 else n
+        self._rr = itertools.count()
+        self._order: Deque[Tuple[object, Future]] = deque()
+
+        # semua replika load paralel
+        t0 = time.perf_counter()
+        for r in self.replicas:
+            r.start()
+        try:
+            infos = [r.ready.result() for r in self.replicas]
+        except Exception:
+            self.close()
+            raise
+        self.names = infos[0]["names"]
+        self.path = infos[0]["path"]
+        self.params = infos[0]["params"]
+        self.supports_imgsz = all(i["supports_imgsz"] for i in infos)
+        self._log(
+            f"[POOL] {n} replika {mode} siap ({(time.perf_counter() - t0) * 1000:.0f}ms), "
+            f"max_inflight={self.max_inflight}, cores={[c if c else '-' for c in cores]}"
+        )
+
+    @property
+    def pending(self) -> int:
+        return len(self._order)
+
+    def _dispatch(self, kind: str, payload, kw: Dict, index: Optional[int] = None) -> Future:
+        i = next(self._rr) % len(self.replicas) if index is None else index
+        fut: Future = Future()
+        fut.add_done_callback(partial(self._count, i))
+        self.replicas[i].send(fut, kind, payload, kw)
+        return fut
+
+    def _count(self, index: int, fut: Future):
+        METRICS.inc(f"{self.prefix}.jobs")
+        METRICS.inc(f"{self.prefix}.r{index}.jobs")
+        if not fut.cancelled() and fut.exception() is None:
+            METRICS.set(f"{self.prefix}.infer_ms", round(fut.result()[1], 1))
+
+    # ---------- interface backend ----------
+    def predict(self, frame, imgsz: Optional[int] = None):
+        return self._dispatch("predict", frame, {"imgsz": imgsz} if imgsz else {}).result()[0]
+
+    def predict_batch(self, frames: Sequence) -> List:
+        frames = list(frames)
+        if not frames:
+            return []
+        n = min(len(self.replicas), len(frames))
+        size = -(-len(frames) // n)
+        futs = [self._dispatch("batch", frames[i:i + size], {}) for i in range(0, len(frames), size)]
+        out: List = []
+        for f in futs:
+            out += f.result()[0]
+        return out
+
+    def warmup(self, frame):
+        """Inferensi pertama di SEMUA replika (predict biasa hanya kena satu replika)."""
+        for f in [self._dispatch("predict", frame, {}, index=i) for i in range(len(self.replicas))]:
+            f.result()
+
+    # ---------- pipelining ----------
+    def submit(self, frame, tag=None, imgsz: Optional[int] = None) -> List[Tuple[object, object, float]]:
+        done = []
+        while len(self._order) >= self.max_inflight:
+            done += self._pop(block=True)
+        self._order.append((tag, self._dispatch("predict", frame, {"imgsz": imgsz} if imgsz else {})))
+        METRICS.set(f"{self.prefix}.inflight", len(self._order))
+        return done + self._pop(block=False)
+
+    def ready(self) -> List[Tuple[object, object, float]]:
+        return self._pop(block=False)
+
+    def drain(self) -> List[Tuple[object, object, float]]:
+        done = []
+        while self._order:
+            done += self._pop(block=True)
+        return done
+
+    def _pop(self, block: bool) -> List[Tuple[object, object, float]]:
+        # hanya dari depan antrean -> urutan keluar = urutan submit
+        out = []
+        while self._order and (self._order[0][1].done() or (block and not out)):
+            tag, fut = self._order.popleft()
+            dets, ms = fut.result()
+            out.append((tag, dets, ms))
+        METRICS.set(f"{self.prefix}.inflight", len(self._order))
+        return out
+
+    def close(self):
+        for r in self.replicas:
+            r.close()
+
+
+def build_pool(cfg: AppConfig, path: str, params: Optional[Dict] = None, log=None,
+               factory: Optional[Callable[..., object]] = None) -> WorkerPool:
+    """
+    Pool POOL_REPLICAS replika model `path`. factory(path, params) -> backend; default inference.load_backend.
+    POOL_DEVICES -> params["device"] per replika (tidak masuk .params pool, jadi key result cache tetap sama).
+    """
+    if factory is None:
+        from inference import load_backend as factory
+
+    n = max(1, cfg.POOL_REPLICAS)
+    devices = [d.strip() for d in cfg.POOL_DEVICES.split(",") if d.strip()]
+    base = dict(params or {})
+    factories = [
+        partial(factory, path, dict(base, device=devices[i % len(devices)]) if devices else base)
+        for i in range(n)
+    ]
+    cores = parse_cores(cfg.POOL_CORES, n)
+    threads = 0 if any(cores) else max(1, (os.cpu_count() or n) // n)
+    pool = WorkerPool(factories, cfg.POOL_MODE, cores, threads, cfg.POOL_MAX_INFLIGHT, log=log)
+    pool.params = base
+    return pool